@@ -0,0 +1,63 @@
+"""
+Compose Validator Benchmark
+Times validate_compose on synthetic compose files with many services.
+
+Usage: python benchmarks/bench_compose_validator.py [--services N ...]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src import compose_validator
+from src.compose_validator import get_compose_rules, validate_compose
+
+
+def make_compose(services: int) -> str:
+    """Build a compose file with N services mixing passing and failing settings."""
+    lines = ["version: '3.8'", '', 'x-limits: &limits', '  deploy:', '    resources:',
+             '      limits:', "        cpus: '0.5'", '        memory: 256M', '', 'services:']
+    for n in range(services):
+        lines += [f'  svc{n}:', f'    image: registry.local/svc{n}:1.{n}']
+        if n % 2 == 0:
+            lines += ['    <<: *limits']
+        if n % 3 == 0:
+            lines += ['    networks:', '      - backend']
+        if n % 11 == 0:
+            lines += ['    privileged: true']
+        lines += ['    environment:', f'      SERVICE_NAME: svc{n}', '      DB_URL: ${DB_URL}']
+        if n % 4:
+            lines += ['    healthcheck:', '      test: ["CMD", "true"]', '      interval: 30s']
+    lines += ['', 'networks:', '  backend:', '    driver: bridge']
+    return '\n'.join(lines) + '\n'
+
+
+def bench(content: str, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        validate_compose(content)
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--services', type=int, nargs='*', default=[10, 100, 500, 2000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    get_compose_rules()
+    print(f"loader: {compose_validator.ComposeLoader.__name__}")
+    print(f"{'services':>9} {'bytes':>9} {'ms':>9} {'services/s':>11}")
+    for count in args.services:
+        content = make_compose(count)
+        elapsed = bench(content, args.repeat)
+        print(f"{count:>9} {len(content):>9} {elapsed:>9.2f} {count / (elapsed / 1000):>11.0f}")
+
+
+if __name__ == '__main__':
+    main()
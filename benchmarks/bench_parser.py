@@ -0,0 +1,43 @@
+"""
+Dockerfile Parser Benchmark
+Times the streaming tokenizer against the previous index-loop parser.
+
+Usage: python benchmarks/bench_parser.py [--instructions N ...]
+"""
+
+import argparse
+import io
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_rule_engine import bench, make_dockerfile
+from fuzz_parser import legacy_parse
+from src.syntax_validator import parse_dockerfile, parse_lines
+
+
+def with_heredocs(content: str) -> str:
+    """Append RUN heredoc blocks to exercise body scanning."""
+    block = 'RUN <<EOF\nset -e\napt-get update\n# inside the script\napt-get install -y curl\nEOF\n'
+    return content + block * (content.count('\n') // 50)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--instructions', type=int, nargs='*', default=[100, 1000, 10000, 100000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'instructions':>12} {'bytes':>10} {'legacy ms':>10} {'parse ms':>9} {'stream ms':>10} {'MB/s':>7}")
+    for count in args.instructions:
+        content = with_heredocs(make_dockerfile(count))
+        legacy = bench(legacy_parse, content, args.repeat)
+        parse = bench(parse_dockerfile, content, args.repeat)
+        stream = bench(lambda text: parse_lines(io.StringIO(text)), content, args.repeat)
+        throughput = len(content) / (parse / 1000) / 1e6
+        print(f"{count:>12} {len(content):>10} {legacy:>10.2f} {parse:>9.2f} {stream:>10.2f} {throughput:>7.1f}")
+
+
+if __name__ == '__main__':
+    main()
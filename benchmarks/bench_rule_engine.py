@@ -0,0 +1,187 @@
+"""
+Rule Engine Benchmark
+Times single-pass validation against the same rules run as one pass each, and
+the declarative-rule matcher (literal prefilter) against one regex search per rule.
+
+Exits non-zero when the single pass is slower than the per-rule passes, when
+time per instruction grows with file size, when re-validating one edited
+line of an open document is not faster than a full validation, or when the
+matcher loses to per-rule search.
+
+Usage: python benchmarks/bench_rule_engine.py [--instructions N ...] [--pattern-rules N ...]
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.incremental_validator import DocumentSession, TextEdit
+from src.rule_engine import PatternMatcher, PatternRule, get_rule_set, validate_dockerfile
+
+# Noise allowance for the pass/fail checks, which skip files under 1000
+# instructions (timings of about a millisecond are mostly noise)
+TOLERANCE = 1.15
+# Time per instruction at the largest size may exceed the smallest (>= 1000) by this factor
+SCALING_LIMIT = 2.0
+from src.syntax_validator import parse_dockerfile, validate_syntax
+
+# Deny-list style RUN patterns, the shape user rules in rules.yaml take
+RUN_PATTERNS = [
+    r'\bcurl\b[^|;&]*\|\s*(ba)?sh\b', r'\bwget\b[^|;&]*\|\s*(ba)?sh\b', r'\bchmod\s+(-R\s+)?777\b',
+    r'\bsudo\b', r'\bapt-get\s+(dist-)?upgrade\b', r'\bapk\s+upgrade\b', r'\byum\s+update\b',
+    r'--allow-unauthenticated\b', r'--no-check-certificate\b', r'\bssh-keyscan\b',
+    r'\beval\s', r'\bnc\s+-l', r'\bpip\s+install\s+--upgrade\s+pip\b', r'\brm\s+-rf\s+/\s*($|&&)',
+]
+
+
+def make_dockerfile(instructions: int) -> str:
+    """Build a synthetic multi-stage Dockerfile with roughly N instructions."""
+    lines = ['# syntax=docker/dockerfile:1', 'FROM python:3.12-slim AS builder', 'WORKDIR /app']
+    stage = 0
+    while len(lines) < instructions:
+        n = len(lines)
+        if n % 500 == 0:
+            stage += 1
+            lines.append(f'FROM builder AS stage{stage}')
+        elif n % 7 == 0:
+            lines.append(f'RUN pip install --no-cache-dir package{n} \\')
+            lines.append(f'    && echo "layer {n}" > /tmp/layer{n}')
+        elif n % 5 == 0:
+            lines.append(f'# comment mentioning EXPOSE {n}')
+        elif n % 3 == 0:
+            lines.append(f'ENV VAR_{n}=value{n}')
+        else:
+            lines.append(f'COPY src/module{n}.py ./src/')
+    lines += ['RUN adduser -D app', 'USER app', 'EXPOSE 8000',
+              'HEALTHCHECK CMD wget -q -O- http://localhost:8000 || exit 1',
+              'CMD ["python", "app.py"]']
+    return '\n'.join(lines) + '\n'
+
+
+def per_rule_validate(content: str):
+    """The same visitors, each walking every instruction on its own."""
+    parsed = parse_dockerfile(content)
+    validate_syntax(content, parsed)
+    rule_set = get_rule_set()
+    results = []
+    for factory in rule_set.visitor_factories():
+        visitor = factory()
+        for instruction in parsed.instructions:
+            if instruction.instruction in visitor.instructions:
+                visitor.visit(instruction)
+        results.extend(visitor.results())
+    rule_set.collect(results)
+
+
+def single_pass_validate(content: str):
+    parsed = parse_dockerfile(content)
+    validate_syntax(content, parsed)
+    validate_dockerfile(content, parsed=parsed)
+
+
+def edit_session(session: DocumentSession):
+    """Replace one RUN line in the middle of the document (same line count)."""
+    middle = len(session.lines) // 2
+    session.apply(TextEdit(middle, middle, [f'RUN echo "edited {time.perf_counter()}"']))
+
+
+def make_pattern_rules(count: int):
+    """N declarative RUN rules cycling through RUN_PATTERNS with distinct literals."""
+    rules = []
+    for n in range(count):
+        pattern = RUN_PATTERNS[n % len(RUN_PATTERNS)]
+        if n >= len(RUN_PATTERNS):
+            pattern = f'{pattern}|\\bforbidden{n}\\b'
+        rules.append(PatternRule(f'BENCH-{n}', f'bench {n}', 'WARNING', frozenset({'RUN'}), pattern,
+                                 n % 2 == 0, None, 0, 'matched', 'ok'))
+    return rules
+
+
+def per_rule_search(rules, instructions) -> int:
+    """One regex search per rule and instruction."""
+    compiled = [(rule.instructions, re.compile(rule.pattern, re.IGNORECASE if rule.ignore_case else 0))
+                for rule in rules]
+    return sum(
+        1 for instruction in instructions for names, pattern in compiled
+        if instruction.instruction in names and pattern.search(instruction.arguments)
+    )
+
+
+def prefiltered_match(matcher: PatternMatcher, instructions) -> int:
+    """The engine's matcher: regex searches only where a required literal occurs."""
+    subscribed = matcher.instructions
+    return sum(
+        len(matcher.matching_rules(instruction)) for instruction in instructions
+        if instruction.instruction in subscribed
+    )
+
+
+def bench(func, content, repeat: int) -> float:
+    """Return best-of-repeat wall time in milliseconds."""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(content)
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--instructions', type=int, nargs='*', default=[100, 1000, 10000, 100000])
+    parser.add_argument('--pattern-rules', type=int, nargs='*', default=[2, 8, 32, 128])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    failures = []
+    get_rule_set()
+    print(f"{'instructions':>12} {'bytes':>10} {'per-rule ms':>12} {'single ms':>10} {'us/instr':>9} "
+          f"{'MB/s':>8} {'edit ms':>8}")
+    per_instruction = {}
+    for count in args.instructions:
+        content = make_dockerfile(count)
+        per_rule = bench(per_rule_validate, content, args.repeat)
+        single = bench(single_pass_validate, content, args.repeat)
+        per_instruction[count] = single * 1000 / count
+        throughput = len(content) / (single / 1000) / 1e6
+        session = DocumentSession(content, get_rule_set())
+        edit = bench(edit_session, session, args.repeat)
+        print(f"{count:>12} {len(content):>10} {per_rule:>12.2f} {single:>10.2f} "
+              f"{per_instruction[count]:>9.2f} {throughput:>8.1f} {edit:>8.2f}")
+        if count >= 1000 and single > per_rule * TOLERANCE:
+            failures.append(f"{count} instructions: single pass {single:.2f} ms, per-rule passes {per_rule:.2f} ms")
+        if count >= 1000 and edit >= single:
+            failures.append(f"{count} instructions: one-line edit {edit:.2f} ms, full validation {single:.2f} ms")
+    sizes = sorted(count for count in per_instruction if count >= 1000)
+    if len(sizes) > 1 and per_instruction[sizes[-1]] > per_instruction[sizes[0]] * SCALING_LIMIT:
+        failures.append(f"not linear: {per_instruction[sizes[0]]:.2f} us/instruction at {sizes[0]}, "
+                        f"{per_instruction[sizes[-1]]:.2f} at {sizes[-1]}")
+
+    # Declarative rules: literal prefilter against one regex search per rule
+    offending = '\n'.join(['RUN curl -fsSL https://example.com/install.sh | sh',
+                           'RUN sudo apt-get dist-upgrade -y', 'RUN chmod -R 777 /app'] * 50)
+    instructions = parse_dockerfile(make_dockerfile(10000) + offending).instructions
+    print(f"\n{'pattern rules':>13} {'matches':>8} {'per-rule ms':>12} {'matcher ms':>11} {'speedup':>8}")
+    for count in args.pattern_rules:
+        rules = make_pattern_rules(count)
+        matcher = PatternMatcher(rules)
+        matches = prefiltered_match(matcher, instructions)
+        if matches != per_rule_search(rules, instructions):
+            failures.append(f"{count} pattern rules: matcher disagrees with per-rule search")
+        per_rule = bench(lambda _: per_rule_search(rules, instructions), None, args.repeat)
+        prefiltered = bench(lambda _: prefiltered_match(matcher, instructions), None, args.repeat)
+        print(f"{count:>13} {matches:>8} {per_rule:>12.2f} {prefiltered:>11.2f} {per_rule / prefiltered:>7.1f}x")
+        if prefiltered > per_rule * TOLERANCE:
+            failures.append(f"{count} pattern rules: matcher {prefiltered:.2f} ms, per-rule search {per_rule:.2f} ms")
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,240 @@
+"""
+Dockerfile Parser Fuzzer
+Checks the streaming parser against the seed corpus, structural invariants and the previous parser,
+that validation and stage/size analysis never raise on any of those inputs, and that incremental
+re-validation after random edits matches a full validation.
+
+Usage: python benchmarks/fuzz_parser.py [--iterations N] [--seed S] [--update]
+
+Seeds live in benchmarks/parser_corpus/*.Dockerfile with the expected parse
+next to each one (*.json); --update rewrites the expectations.
+"""
+
+import argparse
+import glob
+import io
+import json
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.image_size import estimate_image_size
+from src.incremental_validator import DocumentSession, TextEdit
+from src.rule_engine import get_rule_set, validate_dockerfile
+from src.stage_graph import analyze_stages
+from src.syntax_validator import (
+    DockerfileTokenizer, Instruction, VALID_INSTRUCTIONS, parse_dockerfile, parse_lines, validate_syntax
+)
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'parser_corpus')
+
+
+def legacy_parse(content: str):
+    """The index-loop parser this tokenizer replaced (no directives or heredocs)."""
+    instructions = []
+    lines = content.split('\n')
+    i = 0
+    while i < len(lines):
+        line_number = i + 1
+        line = lines[i].strip()
+        i += 1
+        if not line or line.startswith('#'):
+            continue
+        parts = []
+        while line.endswith('\\') and i < len(lines):
+            parts.append(line[:-1].strip())
+            line = lines[i].strip()
+            i += 1
+            while line.startswith('#') and i < len(lines):
+                line = lines[i].strip()
+                i += 1
+        parts.append(line.rstrip('\\').strip())
+        line = ' '.join(part for part in parts if part)
+        parts = line.split(None, 1)
+        if not parts:
+            continue
+        instructions.append((line_number, parts[0].upper(), parts[1] if len(parts) > 1 else '', i))
+    return instructions
+
+
+def record(instruction: Instruction) -> dict:
+    return {
+        'line': instruction.line_number,
+        'end_line': instruction.end_line,
+        'instruction': instruction.instruction,
+        'arguments': instruction.arguments,
+        'json_args': list(instruction.json_args) if instruction.json_args is not None else None,
+        'heredocs': [
+            {'delimiter': h.delimiter, 'content': h.content, 'line': h.line_number,
+             'end_line': h.end_line, 'terminated': h.terminated}
+            for h in instruction.heredocs
+        ]
+    }
+
+
+def snapshot(content: str) -> dict:
+    parsed = parse_dockerfile(content)
+    return {
+        'directives': parsed.directives,
+        'errors': parsed.errors,
+        'instructions': [record(x) for x in parsed.instructions]
+    }
+
+
+def check_corpus(update: bool) -> int:
+    """Compare every seed against its expected parse."""
+    failures = 0
+    for path in sorted(glob.glob(os.path.join(CORPUS_DIR, '*.Dockerfile'))):
+        with open(path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        expected_path = path[:-len('.Dockerfile')] + '.json'
+        actual = snapshot(content)
+        if update or not os.path.exists(expected_path):
+            with open(expected_path, 'w', encoding='utf-8') as f:
+                json.dump(actual, f, indent=2)
+                f.write('\n')
+            continue
+        with open(expected_path, 'r', encoding='utf-8') as f:
+            expected = json.load(f)
+        if actual != expected:
+            failures += 1
+            print(f"corpus mismatch: {os.path.basename(path)}")
+        failures += check_invariants(content, os.path.basename(path))
+        failures += check_analysis(content, os.path.basename(path))
+    return failures
+
+
+def check_invariants(content: str, label: str) -> int:
+    """String, stream and line-at-a-time parses agree and spans are well formed."""
+    parsed = parse_dockerfile(content)
+    streamed = parse_lines(io.StringIO(content))
+    if (parsed.instructions, parsed.errors, parsed.directives) != (
+            streamed.instructions, streamed.errors, streamed.directives):
+        print(f"stream mismatch: {label}")
+        return 1
+
+    tokenizer = DockerfileTokenizer()
+    fed = [x for x in map(tokenizer.feed, content.split('\n')) if x is not None]
+    closed = tokenizer.close()
+    if closed is not None:
+        fed.append(closed)
+    if fed != parsed.instructions:
+        print(f"feed mismatch: {label}")
+        return 1
+
+    previous_end = 0
+    for x in parsed.instructions:
+        spans = [(h.line_number, h.end_line) for h in x.heredocs]
+        if not previous_end < x.line_number <= x.end_line or any(
+                not (x.line_number < a and b <= x.end_line) for a, b in spans if b >= a):
+            print(f"bad span: {label} line {x.line_number}")
+            return 1
+        previous_end = x.end_line
+    return 0
+
+
+def check_analysis(content: str, label: str) -> int:
+    """Validation, stage analysis and the size estimate accept any parse."""
+    try:
+        validate_dockerfile(content)
+        instructions = parse_dockerfile(content).instructions
+        analyze_stages(instructions)
+        estimate_image_size(instructions)
+    except Exception as e:
+        print(f"analysis error: {label}: {type(e).__name__}: {e}")
+        return 1
+    return 0
+
+
+def check_incremental(content: str, rng: random.Random, label: str, edits: int = 3) -> int:
+    """Results after random line edits equal a full validation of the edited text."""
+    rule_set = get_rule_set()
+    session = DocumentSession(content, rule_set)
+    for _ in range(edits):
+        start = rng.randint(1, len(session.lines) + 1)
+        end = rng.randint(start - 1, min(len(session.lines), start + 2))
+        session.apply(TextEdit(start, end, random_construct(rng).split('\n')[:rng.randint(0, 3)]))
+        edited = session.content
+        full = rule_set.validate(edited, timed=False)
+        cached = session.validation_result
+        if [vars(r) for r in full.results] != [vars(r) for r in cached.results] or (
+                session.syntax_result.errors != validate_syntax(edited).errors):
+            print(f"incremental mismatch: {label}: {edited!r}")
+            return 1
+    return 0
+
+
+WORDS = ['apt-get', 'install', '-y', 'curl', '&&', 'echo', '"a b"', "'c'", '$HOME', '/app', '--flag=1', 'x=y', '#x']
+
+
+def random_instruction(rng: random.Random) -> list:
+    """One instruction in the grammar both parsers agree on."""
+    name = rng.choice(sorted(VALID_INSTRUCTIONS) + ['bogus', 'run', 'From'])
+    lines = [name + ''.join(' ' + rng.choice(WORDS) for _ in range(rng.randint(0, 4)))]
+    for _ in range(rng.choice([0, 0, 0, 1, 2, 3])):
+        lines[-1] += rng.choice([' \\', '\\', ' \\  '])
+        if rng.random() < 0.2:
+            lines.append(rng.choice(['# comment inside', '#', '  # indented']))
+        # A continued line starting with '#' would be a comment, not content
+        words = [rng.choice(WORDS[:-1])] + [rng.choice(WORDS) for _ in range(rng.randint(0, 2))]
+        lines.append(rng.choice(['', '    ', '\t']) + ' '.join(words))
+    return lines
+
+
+def random_dockerfile(rng: random.Random) -> str:
+    lines = []
+    for _ in range(rng.randint(0, 20)):
+        roll = rng.random()
+        if roll < 0.1:
+            lines.append('')
+        elif roll < 0.2:
+            lines.append(rng.choice(['# comment', '# syntax=docker/dockerfile:1', '   # spaced']))
+        else:
+            lines.extend(random_instruction(rng))
+    return '\n'.join(lines) + rng.choice(['', '\n'])
+
+
+def random_construct(rng: random.Random) -> str:
+    """Heredocs, directives and exec form mixed into random content."""
+    fragments = [
+        '# escape=`', '# syntax=docker/dockerfile:1.7', 'RUN <<EOF', 'EOF', 'COPY <<-A <<"B" /x/', '\tA', 'B',
+        'RUN cat <<EOF > /f \\', '  && true', 'CMD ["a", "b"]', 'RUN dir `', 'ENTRYPOINT [broken', '',
+        '# comment', 'FROM alpine', 'RUN echo $((1<<2))', 'RUN cat <<<here',
+        'FROM python:3.12-slim AS build', 'COPY --from=build /a /a', 'COPY --from=1 /a /a', 'FROM build',
+        'COPY requirements.txt .', 'COPY . .', 'RUN pip install -r requirements.txt', 'RUN apt-get update',
+        'RUN apt-get install -y curl', 'ENV PIP_NO_CACHE_DIR=1', 'ENV API_TOKEN=Zx8kQ2mLp9Vr4Tn7Ws1Yb6Hc3Jd5Fg0A'
+    ]
+    return '\n'.join(rng.choice(fragments) for _ in range(rng.randint(0, 25)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--iterations', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--update', action='store_true', help='Rewrite corpus expectations')
+    args = parser.parse_args()
+
+    failures = check_corpus(args.update)
+    rng = random.Random(args.seed)
+    for iteration in range(args.iterations):
+        content = random_dockerfile(rng)
+        expected = legacy_parse(content)
+        actual = [(x.line_number, x.instruction, x.arguments, x.end_line)
+                  for x in parse_dockerfile(content).instructions]
+        if actual != expected:
+            failures += 1
+            print(f"legacy mismatch at iteration {iteration}: {content!r}")
+        failures += check_invariants(content, f"iteration {iteration}")
+        construct = random_construct(rng)
+        failures += check_invariants(construct, f"construct {iteration}")
+        failures += check_analysis(construct, f"construct {iteration}")
+        failures += check_incremental(construct, rng, f"construct {iteration}")
+
+    print(f"{args.iterations} iterations, {failures} failures")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
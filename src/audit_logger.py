@@ -1,22 +1,279 @@
 """
 Audit Logger Module
 Comprehensive audit logging for all operations.
+
+Entries are serialized on the caller's thread and queued; a background
+writer appends them in batches (one O_APPEND write per batch, so lines from
+several processes never interleave), fsyncs according to the configured
+policy, and rotates the log by size and time, gzipping rotated segments.
 """
 
+import atexit
+import glob
+import gzip
 import json
 import os
+import queue
+import shutil
+import threading
+import time
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
+
+from src.config_loader import load_config
+
+try:
+    import fcntl
+except ImportError:  # not on Windows; rotation then relies on the single-process case
+    fcntl = None
+
+
+FSYNC_POLICIES = ('always', 'interval', 'never')
+FULL_POLICIES = ('drop', 'block')
+
+
+class AuditWriter:
+    """Background batching writer for one JSON lines log file."""
+
+    def __init__(self, log_file: str, queue_size: int = 10000, on_full: str = 'drop',
+                 block_timeout: float = 1.0, batch_size: int = 512, fsync: str = 'interval',
+                 fsync_interval: float = 5.0, max_bytes: int = 10 * 1024 * 1024,
+                 rotate_interval: float = 86400, backup_count: int = 10, compress: bool = True):
+        """
+        Initialize the writer (its thread starts with the first entry).
+
+        Args:
+            log_file: Path of the active log
+            queue_size: Entries buffered before on_full applies
+            on_full: 'drop' (count and skip) or 'block' (wait up to block_timeout, then drop)
+            block_timeout: Seconds a 'block' caller waits for room
+            batch_size: Maximum entries per write
+            fsync: 'always' (every batch), 'interval' or 'never'
+            fsync_interval: Seconds between fsyncs for the 'interval' policy
+            max_bytes: Rotate before the log would exceed this size (0 = no size limit)
+            rotate_interval: Rotate when a write falls in a new interval of this many seconds (0 = never)
+            backup_count: Rotated segments kept
+            compress: Gzip rotated segments
+
+        Raises:
+            ValueError: For an unknown fsync or on_full policy
+        """
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {FSYNC_POLICIES}, got '{fsync}'")
+        if on_full not in FULL_POLICIES:
+            raise ValueError(f"on_full must be one of {FULL_POLICIES}, got '{on_full}'")
+        self.log_file = log_file
+        self.on_full = on_full
+        self.block_timeout = block_timeout
+        self.batch_size = batch_size
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.max_bytes = max_bytes
+        self.rotate_interval = rotate_interval
+        self.backup_count = backup_count
+        self.compress = compress
+        self.queue_size = queue_size
+        self.written = 0
+        self.dropped = 0
+        self.rotations = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._thread_pid: Optional[int] = None
+        self._fd: Optional[int] = None
+        self._last_fsync = time.monotonic()
+        self._unreported_drops = 0
+        os.makedirs(os.path.dirname(log_file) or '.', exist_ok=True)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        # Queued entries belong to the parent, which writes them itself
+        self._queue = queue.Queue(maxsize=self.queue_size)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._fd = None
+
+    def write(self, line: str):
+        """
+        Queue one serialized line (without newline).
+
+        Never raises: when the queue stays full the entry is dropped and counted.
+        """
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(line)
+            return
+        except queue.Full:
+            if self.on_full == 'block':
+                try:
+                    self._queue.put(line, timeout=self.block_timeout)
+                    return
+                except queue.Full:
+                    pass
+        with self._lock:
+            self.dropped += 1
+            self._unreported_drops += 1
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """
+        Wait until everything queued so far is written.
+
+        Returns:
+            True if the writer caught up within timeout
+        """
+        if self._thread is None or not self._thread.is_alive():
+            return self._queue.empty()
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for monitoring."""
+        return {
+            'queued': self._queue.qsize(),
+            'written': self.written,
+            'dropped': self.dropped,
+            'rotations': self.rotations
+        }
+
+    def _ensure_started(self):
+        if self._thread_pid == os.getpid() and self._thread is not None:
+            return
+        with self._lock:
+            if self._thread_pid == os.getpid() and self._thread is not None:
+                return
+            self._thread_pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+            self._thread.start()
+        atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            lines: List[str] = []
+            events: List[threading.Event] = []
+            while True:
+                if isinstance(item, threading.Event):
+                    events.append(item)
+                else:
+                    lines.append(item)
+                if len(lines) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            with self._lock:
+                drops, self._unreported_drops = self._unreported_drops, 0
+            if drops:
+                lines.append(json.dumps({
+                    'timestamp': datetime.now().isoformat(),
+                    'event_type': 'audit_dropped',
+                    'count': drops
+                }))
+            try:
+                if lines:
+                    self._write_batch(lines)
+            except OSError:
+                with self._lock:
+                    self.dropped += len(lines)  # disk trouble must not stop the writer
+            for event in events:
+                event.set()
+
+    def _write_batch(self, lines: List[str]):
+        data = ('\n'.join(lines) + '\n').encode('utf-8')
+        fd = self._open()
+        if self._should_rotate(fd, len(data)):
+            self._rotate()
+            fd = self._open()
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+        self.written += len(lines)
+        now = time.monotonic()
+        if self.fsync == 'always' or (self.fsync == 'interval' and now - self._last_fsync >= self.fsync_interval):
+            os.fsync(fd)
+            self._last_fsync = now
+
+    def _open(self) -> int:
+        """Descriptor of the current log, reopened after another process rotated it."""
+        if self._fd is not None:
+            try:
+                if os.stat(self.log_file).st_ino == os.fstat(self._fd).st_ino:
+                    return self._fd
+            except FileNotFoundError:
+                pass
+            os.close(self._fd)
+        self._fd = os.open(self.log_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        return self._fd
+
+    def _should_rotate(self, fd: int, incoming: int) -> bool:
+        stat = os.fstat(fd)
+        if not stat.st_size:
+            return False
+        if self.max_bytes and stat.st_size + incoming > self.max_bytes:
+            return True
+        if self.rotate_interval:
+            return int(stat.st_mtime // self.rotate_interval) != int(time.time() // self.rotate_interval)
+        return False
+
+    def _rotate(self):
+        """Rename the current log aside (once across processes), compress it and prune old segments."""
+        lock_fd = os.open(f"{self.log_file}.lock", os.O_WRONLY | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(lock_fd, fcntl.LOCK_EX)
+            if os.stat(self.log_file).st_ino != os.fstat(self._fd).st_ino:
+                return  # another process rotated while we waited
+            # Timestamped names sort oldest first, which _prune relies on
+            segment = f"{self.log_file}.{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}"
+            os.replace(self.log_file, segment)
+            self.rotations += 1
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_fd, fcntl.LOCK_UN)
+            os.close(lock_fd)
+        if self.compress:
+            self._compress(segment)
+        self._prune()
+
+    def _compress(self, segment: str):
+        tmp_file = f"{segment}.gz.tmp"
+        with open(segment, 'rb') as src, gzip.open(tmp_file, 'wb') as dst:
+            shutil.copyfileobj(src, dst)
+        os.replace(tmp_file, f"{segment}.gz")
+        os.remove(segment)
+
+    def _prune(self):
+        segments = sorted(
+            path for path in glob.glob(f"{glob.escape(self.log_file)}.*")
+            if not path.endswith(('.lock', '.tmp'))
+        )
+        for path in segments[:max(0, len(segments) - self.backup_count)]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass  # pruned by another process
 
 
 class AuditLogger:
     """Audit logger for tracking all operations."""
-    
-    def __init__(self, log_file: str = 'logs/audit.log'):
-        """Initialize audit logger."""
+
+    def __init__(self, log_file: str = 'logs/audit.log', writer: AuditWriter = None):
+        """
+        Initialize audit logger.
+
+        Args:
+            log_file: Audit log path (used when no writer is given)
+            writer: Background writer; defaults to AuditWriter(log_file)
+        """
         self.log_file = log_file
-        os.makedirs(os.path.dirname(log_file), exist_ok=True)
-    
+        self.writer = writer or AuditWriter(log_file)
+
     def log_generation(self, input_data: Dict, output: str, metadata: Dict):
         """Log Dockerfile generation."""
         entry = {
@@ -33,7 +290,7 @@ class AuditLogger:
             'metadata': metadata
         }
         self._write_log(entry)
-    
+
     def log_validation(self, result: Dict, metadata: Dict):
         """Log validation result."""
         entry = {
@@ -43,7 +300,7 @@ class AuditLogger:
             'metadata': metadata
         }
         self._write_log(entry)
-    
+
     def log_error(self, error: str, context: Dict):
         """Log error."""
         entry = {
@@ -53,11 +310,15 @@ class AuditLogger:
             'context': context
         }
         self._write_log(entry)
-    
+
     def _write_log(self, entry: Dict[str, Any]):
-        """Write log entry to file."""
-        with open(self.log_file, 'a') as f:
-            f.write(json.dumps(entry) + '\n')
+        """Queue log entry for the background writer."""
+        # Serialized here so later changes to caller-owned metadata cannot leak in
+        self.writer.write(json.dumps(entry, default=str))
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until queued entries are written."""
+        return self.writer.flush(timeout)
 
 
 # Global audit logger instance
@@ -68,5 +329,20 @@ def get_audit_logger() -> AuditLogger:
     """Get global audit logger instance."""
     global _audit_logger
     if _audit_logger is None:
-        _audit_logger = AuditLogger()
+        settings = load_config().get('logging', {})
+        audit = settings.get('audit', {})
+        log_file = settings.get('audit_file', 'logs/audit.log')
+        _audit_logger = AuditLogger(log_file, AuditWriter(
+            log_file,
+            queue_size=audit.get('queue_size', 10000),
+            on_full=audit.get('on_full', 'drop'),
+            block_timeout=audit.get('block_timeout', 1.0),
+            batch_size=audit.get('batch_size', 512),
+            fsync=audit.get('fsync', 'interval'),
+            fsync_interval=audit.get('fsync_interval', 5.0),
+            max_bytes=audit.get('max_bytes', 10 * 1024 * 1024),
+            rotate_interval=audit.get('rotate_interval', 86400),
+            backup_count=audit.get('backup_count', 10),
+            compress=audit.get('compress', True)
+        ))
     return _audit_logger
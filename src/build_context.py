@@ -0,0 +1,363 @@
+"""
+Build Context Module
+Measures the Docker build context and generates a minimal .dockerignore.
+"""
+
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from src.input_processor import scan_directory
+from src.syntax_validator import Instruction, parse_dockerfile
+
+
+# Excluded when the Dockerfile copies the whole context
+DEFAULT_EXCLUDES = [
+    '.git', '.hg', '.svn',
+    '**/node_modules', '**/__pycache__', '**/*.pyc', '.venv', 'venv', 'env',
+    '.tox', '.nox', '.pytest_cache', '.mypy_cache', '.ruff_cache', 'htmlcov', '.coverage', 'coverage',
+    'dist', 'build', 'target', '.gradle',
+    '.idea', '.vscode', '**/.DS_Store', '**/*.log', '**/*.swp',
+    '.env', '.env.*',
+    'Dockerfile*', '.dockerignore', 'docker-compose*.yml', 'compose*.yml'
+]
+
+# Re-excluded below the paths an allowlist keeps
+NESTED_EXCLUDES = ['**/node_modules', '**/__pycache__', '**/*.pyc', '**/.DS_Store', '**/.git']
+
+GLOB_CHARS = re.compile(r'[*?\[\\]')
+
+ROOT_FILES = '.'
+
+
+def clean_pattern(pattern: str) -> str:
+    """Normalize a path pattern the way Docker does (no ./, leading or trailing slashes)."""
+    parts = []
+    for part in pattern.strip().replace('\\', '/').split('/'):
+        if part in ('', '.'):
+            continue
+        if part == '..':
+            if parts:
+                parts.pop()
+            continue
+        parts.append(part)
+    return '/'.join(parts) or '.'
+
+
+def _translate(pattern: str) -> str:
+    """Regex for one cleaned dockerignore pattern (Go filepath.Match plus `**`)."""
+    regex = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if pattern.startswith('**', i):
+            i += 2
+            if pattern.startswith('/', i):
+                regex.append('(?:.*/)?')
+                i += 1
+            else:
+                regex.append('.*')
+            continue
+        if char == '*':
+            regex.append('[^/]*')
+        elif char == '?':
+            regex.append('[^/]')
+        elif char == '[':
+            end = pattern.find(']', i + 1)
+            if end == -1:
+                regex.append(re.escape(char))
+            else:
+                body = pattern[i + 1:end]
+                if body[:1] in ('!', '^'):
+                    body = '^' + body[1:]
+                regex.append(f'[{body}]')
+                i = end
+        elif char == '\\' and i + 1 < len(pattern):
+            i += 1
+            regex.append(re.escape(pattern[i]))
+        else:
+            regex.append(re.escape(char))
+        i += 1
+    return ''.join(regex)
+
+
+class GlobMatcher:
+    """
+    .dockerignore patterns compiled into a single regex.
+
+    A pattern also matches everything below a matching directory. The last
+    matching pattern wins, so `!` exceptions are compiled in reverse order
+    and the first alternative that matches decides.
+    """
+
+    def __init__(self, patterns: List[str]):
+        """
+        Compile patterns.
+
+        Args:
+            patterns: .dockerignore lines; comments and blank lines are ignored
+        """
+        self.patterns = []
+        for line in patterns:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            negated = line.startswith('!')
+            pattern = clean_pattern(line[1:] if negated else line)
+            self.patterns.append((negated, pattern))
+        self.exceptions = [pattern for negated, pattern in self.patterns if negated]
+
+        if not self.patterns:
+            self._regex = None
+        elif not self.exceptions:
+            alternatives = '|'.join(_translate(pattern) for _, pattern in self.patterns)
+            self._regex = re.compile(f'(?:{alternatives})(?:/.*)?$', re.DOTALL)
+        else:
+            alternatives = '|'.join(
+                f'(?P<p{index}>{_translate(pattern)}(?:/.*)?$)'
+                for index, (_, pattern) in reversed(list(enumerate(self.patterns)))
+            )
+            self._regex = re.compile(alternatives, re.DOTALL)
+
+    def __bool__(self) -> bool:
+        return self._regex is not None
+
+    def matches(self, path: str) -> bool:
+        """
+        Whether a context-relative path is excluded.
+
+        Args:
+            path: Path relative to the context root, '/'-separated
+
+        Returns:
+            True if the path is ignored
+        """
+        if self._regex is None:
+            return False
+        match = self._regex.match(path)
+        if match is None:
+            return False
+        if not self.exceptions:
+            return True
+        return not self.patterns[int(match.lastgroup[1:])][0]
+
+    def prunes(self, directory: str) -> bool:
+        """Whether a directory and everything below it is excluded."""
+        if not self.matches(directory):
+            return False
+        prefix = directory + '/'
+        for pattern in self.exceptions:
+            literal = GLOB_CHARS.split(pattern, 1)[0]
+            if literal.startswith(prefix) or prefix.startswith(literal):
+                return False  # an exception may re-include something below
+        return True
+
+
+@dataclass
+class DirectoryUsage:
+    """Context files and bytes of one top-level entry."""
+    name: str
+    files_before: int = 0
+    bytes_before: int = 0
+    files_after: int = 0
+    bytes_after: int = 0
+
+
+@dataclass
+class ContextReport:
+    """Build context size with the current and the generated .dockerignore."""
+    root: str
+    directories: List[DirectoryUsage]
+    dockerignore: List[str]
+    existing_dockerignore: Optional[List[str]]
+    sources: Optional[List[str]]  # None when the whole context is copied
+    unmatched: List[str] = field(default_factory=list)
+
+    @property
+    def files_before(self) -> int:
+        return sum(d.files_before for d in self.directories)
+
+    @property
+    def bytes_before(self) -> int:
+        return sum(d.bytes_before for d in self.directories)
+
+    @property
+    def files_after(self) -> int:
+        return sum(d.files_after for d in self.directories)
+
+    @property
+    def bytes_after(self) -> int:
+        return sum(d.bytes_after for d in self.directories)
+
+    def to_dict(self) -> Dict:
+        """Serialize for JSON output."""
+        return {
+            'root': self.root,
+            'bytes_before': self.bytes_before,
+            'bytes_after': self.bytes_after,
+            'files_before': self.files_before,
+            'files_after': self.files_after,
+            'sources': self.sources,
+            'unmatched_sources': self.unmatched,
+            'dockerignore': '\n'.join(self.dockerignore) + '\n',
+            'directories': [vars(d) for d in self.directories]
+        }
+
+
+def dockerfile_sources(instructions: List[Instruction]) -> Optional[List[str]]:
+    """
+    Build-context paths the Dockerfile's COPY/ADD instructions read.
+
+    Args:
+        instructions: Parsed instructions
+
+    Returns:
+        Cleaned source patterns, or None if the whole context is needed
+        (a `.` source or one built from variables)
+    """
+    sources = []
+    for instruction in instructions:
+        if instruction.instruction not in ('COPY', 'ADD') or instruction.heredocs:
+            continue
+        if instruction.json_args is not None:
+            words = list(instruction.json_args)
+        else:
+            words = instruction.arguments.split()
+        if any(w.startswith('--from=') for w in words):
+            continue
+        for source in [w for w in words if not w.startswith('--')][:-1]:
+            if '://' in source or source.startswith('git@'):
+                continue
+            source = clean_pattern(source)
+            if source == '.' or '$' in source:
+                return None
+            if source not in sources:
+                sources.append(source)
+    return sources
+
+
+def generate_dockerignore(sources: Optional[List[str]]) -> List[str]:
+    """
+    Minimal .dockerignore for the given Dockerfile sources.
+
+    Args:
+        sources: Result of dockerfile_sources
+
+    Returns:
+        .dockerignore lines: an allowlist of the sources, or common
+        build-output, VCS and dependency directories if everything is copied
+    """
+    header = ['# Generated by Docker Intelligence Generator']
+    if sources is None:
+        return header + DEFAULT_EXCLUDES
+    if not sources:
+        return header + ['*']
+    kept = GlobMatcher(sources)
+    nested = [p for p in NESTED_EXCLUDES if not any(kept.matches(part) for part in _literal_parts(p))]
+    return header + ['*'] + [f'!{source}' for source in sources] + nested
+
+
+def _literal_parts(pattern: str) -> List[str]:
+    """Plain path names in a pattern, e.g. 'node_modules' in '**/node_modules'."""
+    return [part for part in pattern.split('/') if not GLOB_CHARS.search(part)]
+
+
+def read_dockerignore(root: str) -> Optional[List[str]]:
+    """Lines of the context's .dockerignore, or None if there is none."""
+    path = os.path.join(root, '.dockerignore')
+    if not os.path.isfile(path):
+        return None
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        return f.read().splitlines()
+
+
+def analyze_context(root: str, dockerfile: str = None) -> ContextReport:
+    """
+    Measure the build context before and after the generated .dockerignore.
+
+    Args:
+        root: Build context directory
+        dockerfile: Dockerfile content (read from root/Dockerfile if omitted)
+
+    Returns:
+        ContextReport with bytes per top-level directory
+
+    Raises:
+        NotADirectoryError: If root is not a directory
+    """
+    if not os.path.isdir(root):
+        raise NotADirectoryError(f"Not a directory: {root}")
+    if dockerfile is None:
+        with open(os.path.join(root, 'Dockerfile'), 'r', encoding='utf-8') as f:
+            dockerfile = f.read()
+
+    sources = dockerfile_sources(parse_dockerfile(dockerfile).instructions)
+    existing = read_dockerignore(root)
+    generated = generate_dockerignore(sources)
+    before = GlobMatcher(existing or [])
+    after = GlobMatcher(generated)
+    wanted = [(source, GlobMatcher([source])) for source in sources or []]
+    found = set()
+
+    def skip(relative_path, entry):
+        if not entry.is_dir() or entry.is_symlink():
+            return False
+        path = relative_path.replace(os.sep, '/')
+        return bool(before) and before.prunes(path) and after.prunes(path)
+
+    directories: Dict[str, DirectoryUsage] = {}
+    for relative_path, entry in scan_directory(root, skip):
+        path = relative_path.replace(os.sep, '/')
+        top = path.split('/', 1)[0] if '/' in path else ROOT_FILES
+        usage = directories.get(top)
+        if usage is None:
+            usage = directories[top] = DirectoryUsage(top)
+        try:
+            size = entry.stat(follow_symlinks=False).st_size
+        except OSError:
+            continue
+        if not before.matches(path):
+            usage.files_before += 1
+            usage.bytes_before += size
+        if not after.matches(path):
+            usage.files_after += 1
+            usage.bytes_after += size
+            if len(found) < len(wanted):
+                found.update(source for source, matcher in wanted if matcher.matches(path))
+
+    return ContextReport(
+        root=root,
+        directories=sorted(directories.values(), key=lambda d: (-d.bytes_before, d.name)),
+        dockerignore=generated,
+        existing_dockerignore=existing,
+        sources=sources,
+        unmatched=[source for source, _ in wanted if source not in found]
+    )
+
+
+def format_bytes(size: float) -> str:
+    """Human-readable byte count."""
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024 or unit == 'GB':
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def format_context_report(report: ContextReport, limit: int = 15) -> str:
+    """Format a ContextReport for the CLI."""
+    text = "\n--- BUILD CONTEXT ---\n"
+    for usage in report.directories[:limit]:
+        name = usage.name if usage.name == ROOT_FILES else usage.name + '/'
+        text += f"  {name:<30} {format_bytes(usage.bytes_before):>10} -> {format_bytes(usage.bytes_after)}\n"
+    if len(report.directories) > limit:
+        text += f"  ... {len(report.directories) - limit} more\n"
+    saved = 1 - report.bytes_after / report.bytes_before if report.bytes_before else 0.0
+    current = 'current .dockerignore' if report.existing_dockerignore is not None else 'no .dockerignore'
+    text += (
+        f"Total: {report.files_before} files, {format_bytes(report.bytes_before)} ({current}) -> "
+        f"{report.files_after} files, {format_bytes(report.bytes_after)} ({saved:.0%} smaller)\n"
+    )
+    for source in report.unmatched:
+        text += f"⚠ COPY/ADD source '{source}' matches no file in the context\n"
+    return text
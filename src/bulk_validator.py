@@ -0,0 +1,286 @@
+"""
+Bulk Validator Module
+Discovers Dockerfiles and compose files under directory trees and validates them in parallel.
+"""
+
+import fnmatch
+import functools
+import os
+import re
+import time
+from dataclasses import dataclass, field
+from multiprocessing import Pool
+from typing import Iterable, Iterator, List, Optional
+
+from src.compose_validator import validate_compose
+from src.rule_engine import RuleResult, get_rule_set
+from src.secret_scanner import scan_secrets
+from src.syntax_validator import parse_dockerfile, validate_syntax
+
+
+DOCKERFILE_PATTERNS = ['dockerfile', '*.dockerfile', 'dockerfile.*']
+
+COMPOSE_PATTERN = re.compile(r'^(docker-)?compose(\.[\w-]+)*\.ya?ml$', re.IGNORECASE)
+
+SKIP_DIRS = {'node_modules', '__pycache__', 'venv', 'env', 'vendor', 'target', 'dist', 'build'}
+
+SEVERITY_LEVELS = {'WARNING': 1, 'ERROR': 2}
+
+
+@dataclass
+class FileReport:
+    """Validation outcome for one Dockerfile or compose file."""
+    path: str
+    passed: bool
+    failures: List[RuleResult] = field(default_factory=list)
+    syntax_errors: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+
+    def worst_severity(self) -> int:
+        """Highest severity level among failures (read errors count as ERROR)."""
+        if self.error or self.syntax_errors:
+            return SEVERITY_LEVELS['ERROR']
+        return max((SEVERITY_LEVELS.get(r.severity, 0) for r in self.failures), default=0)
+
+
+@dataclass
+class BulkSummary:
+    """Aggregate outcome of a bulk validation run."""
+    files: int = 0
+    passed: int = 0
+    failed: int = 0
+    errors: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def files_per_second(self) -> float:
+        return self.files / self.elapsed if self.elapsed > 0 else 0.0
+
+
+def is_dockerfile(name: str) -> bool:
+    """Check whether a file name looks like a Dockerfile variant."""
+    lowered = name.lower()
+    return any(fnmatch.fnmatchcase(lowered, pattern) for pattern in DOCKERFILE_PATTERNS)
+
+
+def is_compose_file(name: str) -> bool:
+    """Check whether a file name looks like a compose file."""
+    return bool(COMPOSE_PATTERN.match(name))
+
+
+def _discover(roots: Iterable[str], matches) -> Iterator[str]:
+    for root in roots:
+        if os.path.isfile(root):
+            yield root
+            continue
+        for dirpath, dirs, files in os.walk(root):
+            dirs[:] = [d for d in dirs if not d.startswith('.') and d not in SKIP_DIRS]
+            for name in files:
+                if matches(name):
+                    yield os.path.join(dirpath, name)
+
+
+def discover_dockerfiles(roots: Iterable[str]) -> Iterator[str]:
+    """
+    Find Dockerfiles, *.Dockerfile and Dockerfile.* variants under roots.
+
+    Args:
+        roots: Directories or individual files
+
+    Yields:
+        Paths of discovered Dockerfiles
+    """
+    return _discover(roots, is_dockerfile)
+
+
+def discover_compose_files(roots: Iterable[str]) -> Iterator[str]:
+    """
+    Find docker-compose*.yml and compose*.yaml files under roots.
+
+    Args:
+        roots: Directories or individual files
+
+    Yields:
+        Paths of discovered compose files
+    """
+    return _discover(roots, is_compose_file)
+
+
+_worker_rules_file = None
+
+
+def _init_worker(rules_file: Optional[str]):
+    """Compile the rule set once per worker process."""
+    global _worker_rules_file
+    _worker_rules_file = rules_file
+    get_rule_set(rules_file)
+
+
+def validate_file(path: str, rules_file: Optional[str] = None) -> FileReport:
+    """
+    Validate a single Dockerfile on disk.
+
+    Args:
+        path: Dockerfile path
+        rules_file: Rules YAML (defaults to config/rules.yaml)
+
+    Returns:
+        FileReport
+    """
+    try:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            content = f.read()
+    except OSError as e:
+        return FileReport(path, False, error=str(e))
+
+    rule_set = get_rule_set(rules_file or _worker_rules_file)
+    parsed = parse_dockerfile(content)
+    syntax_result = validate_syntax(content, parsed)
+    validation_result = rule_set.validate(content, parsed)
+
+    return FileReport(
+        path=path,
+        passed=validation_result.passed and syntax_result.valid,
+        failures=[r for r in validation_result.results if not r.passed],
+        syntax_errors=syntax_result.errors
+    )
+
+
+def validate_compose_file(path: str, rules_file: Optional[str] = None) -> FileReport:
+    """
+    Validate a single compose file on disk.
+
+    Args:
+        path: Compose file path
+        rules_file: Rules YAML (defaults to config/rules.yaml)
+
+    Returns:
+        FileReport
+    """
+    try:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            content = f.read()
+        validation_result = validate_compose(content, rules_file or _worker_rules_file)
+    except (OSError, ValueError) as e:
+        return FileReport(path, False, error=str(e))
+
+    return FileReport(
+        path=path,
+        passed=validation_result.passed,
+        failures=[r for r in validation_result.results if not r.passed]
+    )
+
+
+def scan_secrets_file(path: str, rules_file: Optional[str] = None) -> FileReport:
+    """
+    Scan a single file for hardcoded secrets.
+
+    Args:
+        path: File path
+        rules_file: Unused; accepted for a uniform validator signature
+
+    Returns:
+        FileReport with one failure per finding
+    """
+    try:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            content = f.read()
+    except OSError as e:
+        return FileReport(path, False, error=str(e))
+
+    failures = [
+        RuleResult(
+            rule_id=finding.rule,
+            passed=False,
+            message=f"{finding.message} at {finding.line}:{finding.column} ({finding.snippet})",
+            severity='ERROR',
+            line=finding.line
+        )
+        for finding in scan_secrets(content)
+    ]
+    return FileReport(path, not failures, failures)
+
+
+def _guarded(validator, path: str) -> FileReport:
+    """Run a validator on one file; any exception becomes that file's error instead of ending the run."""
+    try:
+        return validator(path)
+    except Exception as e:
+        return FileReport(path, False, error=f"{type(e).__name__}: {e}")
+
+
+def validate_paths(
+    paths: Iterable[str],
+    workers: int = None,
+    rules_file: str = None,
+    chunksize: int = 16,
+    validator=validate_file
+) -> Iterator[FileReport]:
+    """
+    Validate files across a process pool, yielding reports as they complete.
+
+    Args:
+        paths: File paths
+        workers: Worker processes (defaults to CPU count; 1 runs in-process)
+        rules_file: Rules YAML (defaults to config/rules.yaml)
+        chunksize: Paths handed to a worker at a time
+        validator: validate_file, validate_compose_file or scan_secrets_file
+
+    Yields:
+        FileReport per path, in completion order; a file whose validation
+        raises gets a report with `error` set
+    """
+    workers = workers or os.cpu_count() or 1
+    guarded = functools.partial(_guarded, validator)
+    if workers == 1:
+        _init_worker(rules_file)
+        for path in paths:
+            yield guarded(path)
+        return
+
+    with Pool(workers, initializer=_init_worker, initargs=(rules_file,)) as pool:
+        yield from pool.imap_unordered(guarded, paths, chunksize)
+
+
+def run_bulk(
+    roots: Iterable[str],
+    workers: int = None,
+    rules_file: str = None,
+    summary: BulkSummary = None,
+    kind: str = 'dockerfile'
+) -> Iterator[FileReport]:
+    """
+    Discover and validate files, updating summary as results stream in.
+
+    Args:
+        roots: Directories or files to scan
+        workers: Worker processes
+        rules_file: Rules YAML
+        summary: BulkSummary to fill in
+        kind: 'dockerfile', 'compose' or 'secrets' (secret scan of Dockerfiles)
+
+    Yields:
+        FileReport per discovered file
+    """
+    if kind == 'compose':
+        paths, validator = discover_compose_files(roots), validate_compose_file
+    elif kind == 'dockerfile':
+        paths, validator = discover_dockerfiles(roots), validate_file
+    elif kind == 'secrets':
+        paths, validator = discover_dockerfiles(roots), scan_secrets_file
+    else:
+        raise ValueError(f"Unknown kind: {kind}")
+
+    summary = summary if summary is not None else BulkSummary()
+    started = time.perf_counter()
+    for report in validate_paths(paths, workers, rules_file, validator=validator):
+        summary.files += 1
+        if report.error:
+            summary.errors += 1
+        elif report.passed:
+            summary.passed += 1
+        else:
+            summary.failed += 1
+        summary.elapsed = time.perf_counter() - started
+        yield report
+    summary.elapsed = time.perf_counter() - started
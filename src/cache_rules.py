@@ -0,0 +1,406 @@
+"""
+Cache Rules Module
+Build-cache lint rules (PERF-*) configured per stack from rules.yaml.
+"""
+
+import fnmatch
+import functools
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from src.rule_engine import RuleResult, RuleVisitor, get_rule_set
+from src.stage_graph import DEFAULT_COST, INSTRUCTION_COST
+from src.syntax_validator import Instruction
+
+
+CACHE_MOUNT = re.compile(r'(?:^|\s)--mount=\S*\btype=cache\b')
+LAYER_INSTRUCTIONS = frozenset({'RUN', 'COPY', 'ADD'})
+
+
+@dataclass(frozen=True)
+class StackInstall:
+    """Dependency install command and manifest files of one stack."""
+    stack: str
+    install: re.Pattern
+    manifests: Tuple[str, ...]
+
+
+@dataclass(frozen=True)
+class PackageManager:
+    """Package manager whose download cache should not end up in a layer."""
+    name: str
+    stack: str
+    install: re.Pattern
+    cache: Optional[re.Pattern]  # command or ENV that disables the cache
+    fix: str
+    cache_dir: str
+    update: Optional[re.Pattern] = None
+    no_cache_flag: Optional[str] = None  # inserted after the install command
+    cleanup: Optional[str] = None  # command that drops the cache in the same RUN
+
+
+@dataclass(frozen=True)
+class ConfiguredRule:
+    """Visitor factory bound to compiled rule options, with prompt guidance per stack."""
+    visitor_class: type
+    options: tuple
+    guidance: Dict[str, Tuple[str, ...]] = field(default_factory=dict)
+
+    def __call__(self) -> RuleVisitor:
+        return self.visitor_class(self.options)
+
+
+def _compile(rule_options: dict, key: str, name: str) -> Optional[re.Pattern]:
+    pattern = rule_options.get(key)
+    if pattern is None:
+        return None
+    try:
+        return re.compile(pattern, re.IGNORECASE)
+    except re.error as e:
+        raise ValueError(f"Cache rule option '{name}.{key}': invalid pattern: {e}")
+
+
+def _managers(options: dict) -> Tuple[PackageManager, ...]:
+    return tuple(
+        PackageManager(
+            name=name,
+            stack=settings.get('stack', 'os'),
+            install=_compile(settings, 'install', name),
+            cache=_compile(settings, 'cache', name),
+            fix=settings.get('fix', ''),
+            cache_dir=settings.get('cache_dir', ''),
+            update=_compile(settings, 'update', name),
+            no_cache_flag=settings.get('no_cache_flag'),
+            cleanup=settings.get('cleanup')
+        )
+        for name, settings in (options.get('managers') or {}).items()
+    )
+
+
+@functools.lru_cache(maxsize=32)
+def _any_of(patterns: Tuple[re.Pattern, ...]) -> re.Pattern:
+    """One pattern matching wherever any of `patterns` does, to skip instructions in one scan."""
+    return re.compile('|'.join(f'(?:{p.pattern})' for p in patterns) or r'(?!)', re.IGNORECASE)
+
+
+def _stage_label(instruction: Instruction, index: int) -> str:
+    words = [w for w in instruction.arguments.split() if not w.startswith('--')]
+    if len(words) >= 3 and words[1].upper() == 'AS':
+        return words[2]
+    return f"#{index}"
+
+
+def _copy_sources(instruction: Instruction) -> List[str]:
+    """Build-context sources of a COPY/ADD; empty for --from copies and heredocs."""
+    if instruction.heredocs:
+        return []
+    if instruction.json_args is not None:
+        words = list(instruction.json_args)
+    else:
+        words = instruction.arguments.split()
+    if any(w.startswith('--from=') for w in words):
+        return []
+    words = [w for w in words if not w.startswith('--')]
+    return [w for w in words[:-1] if '://' not in w]
+
+
+def _layer_cost(steps: List[Instruction]) -> Tuple[int, int, int]:
+    """(filesystem layers, RUN steps, cost units) of the given steps."""
+    layers = sum(1 for x in steps if x.instruction in LAYER_INSTRUCTIONS)
+    runs = sum(1 for x in steps if x.instruction == 'RUN')
+    cost = sum(INSTRUCTION_COST.get(x.instruction, DEFAULT_COST) for x in steps)
+    return layers, runs, cost
+
+
+def _pass(rule_id: str, message: str) -> RuleResult:
+    return RuleResult(rule_id, True, message, 'WARNING')
+
+
+class DependencyOrderRule(RuleVisitor):
+    """PERF-001: install dependencies before copying application sources."""
+    rule_id = 'PERF-001'
+    severity = 'WARNING'
+    instructions = frozenset({'FROM', 'RUN', 'COPY', 'ADD'})  # the steps that make layers
+
+    def __init__(self, stacks: Tuple[StackInstall, ...]):
+        self.stacks = stacks
+        self.stages = 0
+        self.findings = []  # (install line, hint)
+        self._start_stage('')
+
+    @classmethod
+    def configure(cls, options: dict) -> ConfiguredRule:
+        stacks = tuple(
+            StackInstall(
+                stack=name,
+                install=_compile(settings, 'install', name),
+                manifests=tuple(settings.get('manifests', ()))
+            )
+            for name, settings in (options.get('stacks') or {}).items()
+        )
+        guidance = {
+            stack.stack: (
+                f"Copy only {', '.join(stack.manifests[:3])} first and install dependencies "
+                "before copying the rest of the source, so source changes reuse the dependency layer",
+            )
+            for stack in stacks
+        }
+        return ConfiguredRule(cls, stacks, guidance)
+
+    def _start_stage(self, label: str):
+        self.stage = label
+        self.source_copy: Optional[Instruction] = None
+        self.steps: List[Instruction] = []  # steps from the first source copy on
+        self.manifests_copied = set()  # stacks whose manifests were copied before any source
+        self.installed = set()
+        self.late: List[Tuple[StackInstall, Instruction]] = []
+
+    def _close_stage(self):
+        if not self.late:
+            return
+        layers, runs, cost = _layer_cost(self.steps)
+        copy = self.source_copy
+        for stack, install in self.late:
+            self.findings.append((install.line_number, (
+                f"Line {copy.line_number}: COPY {copy.arguments} precedes the {stack.stack} "
+                f"dependency install at line {install.line_number}; a change to any copied file "
+                f"invalidates {layers} layers of stage '{self.stage}' (lines {copy.line_number}-"
+                f"{self.steps[-1].end_line}, {runs} RUN steps, {cost} cost units) including the install. "
+                f"Copy {', '.join(stack.manifests[:3])} and install first"
+            )))
+
+    def _copied_stacks(self, instruction: Instruction) -> Optional[set]:
+        """Stacks whose manifests a COPY/ADD brings in, or None if it copies other sources."""
+        stacks = set()
+        for source in _copy_sources(instruction):
+            base = source.rstrip('/').rsplit('/', 1)[-1]
+            matched = {s.stack for s in self.stacks if any(fnmatch.fnmatch(base, m) for m in s.manifests)}
+            if not matched:
+                return None
+            stacks |= matched
+        return stacks
+
+    def analyze(self, instruction: Instruction) -> Optional[frozenset]:
+        """Stacks a RUN installs or a COPY/ADD brings manifests of (None: it copies sources)."""
+        if instruction.instruction == 'RUN':
+            return frozenset(s.stack for s in self.stacks if s.install.search(instruction.arguments))
+        stacks = self._copied_stacks(instruction)
+        return None if stacks is None else frozenset(stacks)
+
+    def visit(self, instruction: Instruction):
+        name = instruction.instruction
+        if name == 'FROM':
+            self._close_stage()
+            self._start_stage(_stage_label(instruction, self.stages))
+            self.stages += 1
+            return
+        if self.source_copy is not None:
+            self.steps.append(instruction)
+            if name != 'RUN':
+                return
+        facts = self.facts(instruction)
+        if name != 'RUN':
+            if facts is None:
+                self.source_copy = instruction
+                self.steps.append(instruction)
+            else:
+                self.manifests_copied |= facts
+            return
+        for stack in self.stacks:
+            if stack.stack in self.installed or stack.stack not in facts:
+                continue
+            if self.source_copy is not None:
+                self.installed.add(stack.stack)
+                self.late.append((stack, instruction))
+            elif stack.stack in self.manifests_copied:
+                # Installs that only see manifests are cached across source changes
+                self.installed.add(stack.stack)
+
+    def result(self) -> RuleResult:
+        self._close_stage()
+        self.late = []
+        if not self.findings:
+            return _pass(self.rule_id, 'Dependencies installed before copying sources')
+        lines = ', '.join(str(line) for line, _ in self.findings)
+        return RuleResult(
+            self.rule_id, False,
+            f'Dependency install runs after copying sources (line {lines})',
+            self.severity, self.findings[0][0], hint='\n'.join(hint for _, hint in self.findings)
+        )
+
+
+class PackageCacheRule(RuleVisitor):
+    """PERF-002: package installs should use a cache mount or skip the download cache."""
+    rule_id = 'PERF-002'
+    severity = 'WARNING'
+    instructions = frozenset({'FROM', 'ENV', 'RUN'})
+
+    def __init__(self, managers: Tuple[PackageManager, ...]):
+        self.managers = managers
+        self.disabled = set()  # managers whose cache an ENV of this stage turned off
+        self.findings: List[Tuple[int, PackageManager]] = []
+        self.any_install = _any_of(tuple(m.install for m in managers))
+        self.any_cache = _any_of(tuple(m.cache for m in managers if m.cache is not None))
+
+    @classmethod
+    def configure(cls, options: dict) -> ConfiguredRule:
+        managers = _managers(options)
+        guidance: Dict[str, Tuple[str, ...]] = {}
+        for manager in managers:
+            advice = f"Run {manager.name} with RUN --mount=type=cache,target={manager.cache_dir}"
+            if manager.fix:
+                advice += f" or {manager.fix}"
+            guidance[manager.stack] = guidance.get(manager.stack, ()) + (advice,)
+        return ConfiguredRule(cls, managers, guidance)
+
+    def analyze(self, instruction: Instruction) -> Tuple[PackageManager, ...]:
+        """Managers whose cache an ENV turns off, or that a RUN installs with their cache on."""
+        arguments = instruction.arguments
+        if instruction.instruction == 'ENV':
+            if not self.any_cache.search(arguments):
+                return ()
+            return tuple(m for m in self.managers if m.cache is not None and m.cache.search(arguments))
+        if not self.any_install.search(arguments) or CACHE_MOUNT.search(arguments):
+            return ()
+        return tuple(
+            m for m in self.managers
+            if m.install.search(arguments) and (m.cache is None or not m.cache.search(arguments))
+        )
+
+    def visit(self, instruction: Instruction):
+        name = instruction.instruction
+        if name == 'FROM':
+            self.disabled = set()
+            return
+        managers = self.facts(instruction)
+        if name == 'ENV':
+            self.disabled.update(m.name for m in managers)
+            return
+        for manager in managers:
+            if manager.name not in self.disabled:
+                self.findings.append((instruction.line_number, manager))
+
+    def result(self) -> RuleResult:
+        if not self.findings:
+            return _pass(self.rule_id, 'Package installs avoid caching downloads in layers')
+        details = ', '.join(f'line {line}: {manager.name}' for line, manager in self.findings)
+        hints = []
+        for line, manager in self.findings:
+            fix = f"{manager.fix} or " if manager.fix else ''
+            hints.append(
+                f"Line {line}: {manager.name} keeps its download cache in the layer and re-downloads "
+                f"every package whenever the layer is rebuilt; use {fix}"
+                f"RUN --mount=type=cache,target={manager.cache_dir}"
+            )
+        return RuleResult(
+            self.rule_id, False,
+            f'{len(self.findings)} package install(s) without cache mount or no-cache option ({details})',
+            self.severity, self.findings[0][0], hint='\n'.join(hints)
+        )
+
+
+class PackageIndexRule(RuleVisitor):
+    """PERF-003: refresh package indexes in the same layer that installs packages."""
+    rule_id = 'PERF-003'
+    severity = 'WARNING'
+    instructions = frozenset({'FROM', 'RUN'})
+
+    def __init__(self, managers: Tuple[PackageManager, ...]):
+        self.managers = tuple(m for m in managers if m.update is not None)
+        self.updates: Dict[str, int] = {}  # manager -> line of a lone update in this stage
+        self.findings: Dict[Tuple[str, int], List[int]] = {}  # (manager, update line) -> install lines
+        self.any_command = _any_of(tuple(m.update for m in self.managers) + tuple(m.install for m in self.managers))
+
+    @classmethod
+    def configure(cls, options: dict) -> ConfiguredRule:
+        managers = _managers(options)
+        guidance: Dict[str, Tuple[str, ...]] = {}
+        for manager in managers:
+            if manager.update is None:
+                continue
+            guidance[manager.stack] = guidance.get(manager.stack, ()) + (
+                f"Run the {manager.name} index update and install in the same RUN instruction",
+            )
+        return ConfiguredRule(cls, managers, guidance)
+
+    def analyze(self, instruction: Instruction) -> Tuple[Tuple[str, bool], ...]:
+        """(manager, installs) for each manager a RUN installs with or updates the index of."""
+        arguments = instruction.arguments
+        if not self.any_command.search(arguments):
+            return ()
+        found = []
+        for manager in self.managers:
+            installs = bool(manager.install.search(arguments))
+            if installs or manager.update.search(arguments):
+                found.append((manager.name, installs))
+        return tuple(found)
+
+    def visit(self, instruction: Instruction):
+        if instruction.instruction == 'FROM':
+            self.updates = {}
+            return
+        for name, installs in self.facts(instruction):
+            if not installs:
+                self.updates[name] = instruction.line_number
+                self.findings[(name, instruction.line_number)] = []
+            elif name in self.updates:
+                self.findings[(name, self.updates[name])].append(instruction.line_number)
+
+    def result(self) -> RuleResult:
+        if not self.findings:
+            return _pass(self.rule_id, 'Package index updates share a layer with installs')
+        hints = []
+        for (name, line), installs in self.findings.items():
+            if installs:
+                hints.append(
+                    f"Line {line}: the {name} index update is cached as its own layer, so "
+                    f"{len(installs)} later install step(s) (line {', '.join(map(str, installs))}) keep "
+                    f"using the index from the first build until line {line} changes; "
+                    f"update and install in one RUN"
+                )
+            else:
+                hints.append(f"Line {line}: the {name} index update adds a layer no install in its stage uses")
+        first = min(line for _, line in self.findings)
+        return RuleResult(
+            self.rule_id, False,
+            f"Package index update in its own layer (line {', '.join(str(line) for _, line in self.findings)})",
+            self.severity, first, hint='\n'.join(hints)
+        )
+
+
+def configured_managers(rule_set=None) -> Tuple[PackageManager, ...]:
+    """
+    Package managers configured for the PERF-002 rule.
+
+    Args:
+        rule_set: CompiledRuleSet (defaults to the shared rule set)
+
+    Returns:
+        PackageManagers, empty if the rule is not configured
+    """
+    rule_set = rule_set or get_rule_set()
+    for rule in rule_set.rules:
+        if isinstance(rule.validator, ConfiguredRule) and rule.validator.visitor_class is PackageCacheRule:
+            return rule.validator.options
+    return ()
+
+
+def cache_guidance(stack: str, rule_set=None) -> List[str]:
+    """
+    Build-cache advice for prompts, taken from the configured PERF-* rules.
+
+    Args:
+        stack: Stack name (python, nodejs, java); OS package managers apply to all
+        rule_set: CompiledRuleSet (defaults to the shared rule set)
+
+    Returns:
+        Advice lines in rule order
+    """
+    rule_set = rule_set or get_rule_set()
+    lines = []
+    for rule in rule_set.rules:
+        if isinstance(rule.validator, ConfiguredRule):
+            guidance = rule.validator.guidance
+            lines.extend(guidance.get(stack.lower(), ()) + guidance.get('os', ()))
+    return lines
@@ -0,0 +1,219 @@
+"""
+Compose Validator Module
+Validates docker-compose files against compose rules (COMP-001..COMP-005).
+"""
+
+import os
+import re
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import yaml
+from yaml.nodes import MappingNode, Node, ScalarNode, SequenceNode
+
+from src.rule_engine import RuleResult, ValidationResult, load_rules, summarize_results
+
+try:
+    from yaml import CSafeLoader as ComposeLoader
+except ImportError:  # libyaml not available
+    from yaml import SafeLoader as ComposeLoader
+
+
+TRUE_VALUES = {'true', 'yes', 'on'}
+
+ENV_REFERENCE = re.compile(r'^\$\{?[A-Za-z_][A-Za-z0-9_]*(:?[-?][^}]*)?\}?$')
+
+
+@dataclass
+class ComposeRuleResult(RuleResult):
+    """Result of a compose rule check for one service."""
+    service: str = ''
+
+
+def _default_rules_file() -> str:
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    project_root = os.path.dirname(current_dir)
+    return os.path.join(project_root, 'config', 'rules.yaml')
+
+
+_compose_rules: Dict[str, Tuple[float, Dict[str, dict]]] = {}
+_compose_rules_lock = threading.Lock()
+
+
+def get_compose_rules(rules_file: str = None) -> Dict[str, dict]:
+    """
+    Get compose rule metadata by id, reloading when rules.yaml changes.
+
+    Args:
+        rules_file: Path to rules YAML (defaults to config/rules.yaml)
+
+    Returns:
+        Dictionary mapping rule id to its YAML definition
+    """
+    rules_file = os.path.abspath(rules_file or _default_rules_file())
+    mtime = os.stat(rules_file).st_mtime
+    cached = _compose_rules.get(rules_file)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    with _compose_rules_lock:
+        rules = {rule['id']: rule for rule in load_rules(rules_file, section='compose_rules')}
+        _compose_rules[rules_file] = (mtime, rules)
+        return rules
+
+
+def _line(node: Node) -> int:
+    return node.start_mark.line + 1
+
+
+def _mapping(node: Optional[Node]) -> Dict[str, Tuple[Node, Node]]:
+    """Map keys to (key node, value node), applying YAML merge keys."""
+    if not isinstance(node, MappingNode):
+        return {}
+    result = {}
+    merged = {}
+    for key, value in node.value:
+        if key.value == '<<':
+            sources = value.value if isinstance(value, SequenceNode) else [value]
+            for source in sources:
+                for name, pair in _mapping(source).items():
+                    merged.setdefault(name, pair)
+        else:
+            result[key.value] = (key, value)
+    for name, pair in merged.items():
+        result.setdefault(name, pair)
+    return result
+
+
+def _get(node: Optional[Node], *path: str) -> Optional[Node]:
+    """Follow a key path through mapping nodes."""
+    for key in path:
+        pair = _mapping(node).get(key)
+        if pair is None:
+            return None
+        node = pair[1]
+    return node
+
+
+def _is_true(node: Optional[Node]) -> bool:
+    return isinstance(node, ScalarNode) and node.value.lower() in TRUE_VALUES
+
+
+def _hardcoded_env(node: Node) -> List[str]:
+    """Names of environment entries with literal (non-reference) values."""
+    names = []
+    if isinstance(node, MappingNode):
+        for key, value in node.value:
+            if isinstance(value, ScalarNode) and value.value and not ENV_REFERENCE.match(value.value):
+                names.append(key.value)
+    elif isinstance(node, SequenceNode):
+        for item in node.value:
+            if not isinstance(item, ScalarNode) or '=' not in item.value:
+                continue
+            name, value = item.value.split('=', 1)
+            if value and not ENV_REFERENCE.match(value):
+                names.append(name)
+    return names
+
+
+def _check_service(name: str, key: Node, service: Node, rules: Dict[str, dict]) -> List[ComposeRuleResult]:
+    """Evaluate every compose rule against one service node."""
+    fields = _mapping(service)
+    service_line = _line(key)
+    results = []
+
+    def add(rule_id: str, passed: bool, message: str, line: int = None):
+        rule = rules.get(rule_id)
+        if rule is None:
+            return
+        results.append(ComposeRuleResult(
+            rule_id=rule_id,
+            passed=passed,
+            message=f"{name}: {message}",
+            severity=rule.get('severity', 'ERROR'),
+            line=line or service_line,
+            service=name
+        ))
+
+    # COMP-001: CPU and memory limits
+    limits = _mapping(_get(service, 'deploy', 'resources', 'limits'))
+    has_cpu = 'cpus' in limits or 'cpus' in fields
+    has_memory = 'memory' in limits or 'mem_limit' in fields
+    missing = [label for label, ok in (('cpus', has_cpu), ('memory', has_memory)) if not ok]
+    add('COMP-001', not missing,
+        'Resource limits set' if not missing else f"Missing resource limits: {', '.join(missing)}")
+
+    # COMP-002: custom networks, no host networking
+    network_mode = fields.get('network_mode')
+    if network_mode is not None and isinstance(network_mode[1], ScalarNode) and network_mode[1].value == 'host':
+        add('COMP-002', False, 'Uses host networking', _line(network_mode[0]))
+    elif 'networks' in fields:
+        add('COMP-002', True, 'Custom network configured')
+    else:
+        add('COMP-002', False, 'No custom network (uses default network)')
+
+    # COMP-003: privileged mode
+    privileged = fields.get('privileged')
+    if privileged is not None and _is_true(privileged[1]):
+        add('COMP-003', False, 'Runs in privileged mode', _line(privileged[0]))
+    else:
+        add('COMP-003', True, 'Not privileged')
+
+    # COMP-004: environment values belong in env_file
+    environment = fields.get('environment')
+    hardcoded = _hardcoded_env(environment[1]) if environment is not None else []
+    if hardcoded:
+        add('COMP-004', False, f"Hardcoded environment: {', '.join(hardcoded)} (use env_file)",
+            _line(environment[0]))
+    else:
+        add('COMP-004', True, 'No hardcoded environment values')
+
+    # COMP-005: healthcheck defined and not disabled
+    healthcheck = fields.get('healthcheck')
+    if healthcheck is None:
+        add('COMP-005', False, 'No healthcheck defined')
+    elif _is_true(_get(healthcheck[1], 'disable')):
+        add('COMP-005', False, 'Healthcheck disabled', _line(healthcheck[0]))
+    else:
+        add('COMP-005', True, 'Healthcheck defined')
+
+    return results
+
+
+def validate_compose(content: str, rules_file: str = None) -> ValidationResult:
+    """
+    Validate docker-compose content in a single pass over its services.
+
+    Args:
+        content: docker-compose YAML
+        rules_file: Path to rules YAML (defaults to config/rules.yaml)
+
+    Returns:
+        ValidationResult whose results are ComposeRuleResult per service and rule
+
+    Raises:
+        ValueError: If the content is not a compose mapping with services
+    """
+    try:
+        root = yaml.compose(content, Loader=ComposeLoader)
+    except yaml.YAMLError as e:
+        raise ValueError(f"Invalid YAML: {e}")
+
+    services = _get(root, 'services')
+    if not isinstance(services, MappingNode):
+        raise ValueError("Compose file has no services mapping")
+
+    rules = get_compose_rules(rules_file)
+    results = []
+    for key, service in services.value:
+        results.extend(_check_service(key.value, key, service, rules))
+
+    return summarize_results(results)
+
+
+def validate_compose_dict(compose: dict, rules_file: str = None) -> ValidationResult:
+    """Validate a compose structure, e.g. the output of build_compose."""
+    return validate_compose(
+        yaml.dump(compose, default_flow_style=False, sort_keys=False),
+        rules_file
+    )
@@ -39,6 +39,83 @@ def get_default_config() -> Dict[str, Any]:
             'max_retries': 3,
             'temperature': 0.1
         },
+        'prompt': {
+            'token_budget': 1024
+        },
+        'examples': {
+            'enabled': True,
+            'index_file': 'logs/example_index.jsonl',
+            'max_entries': 500,
+            'max_examples': 2
+        },
+        'incremental': {
+            'max_sessions': 256,
+            'idle_ttl': 600
+        },
+        'validation_cache': {
+            'max_bytes': 16777216
+        },
+        'rule_metrics': {
+            'enabled': True,
+            'sample_every': 10
+        },
+        'optimizer': {
+            'enabled': False,
+            'cache_mounts': False
+        },
+        'server': {
+            'host': '0.0.0.0',
+            'port': 5000,
+            'workers': 0,
+            'threads': 8,
+            'timeout': 300,
+            'graceful_timeout': 60,
+            'keepalive': 5,
+            'max_requests': 1000,
+            'max_requests_jitter': 100,
+            'preload': False,
+            'access_log': True,
+            'admission': {
+                'max_concurrent': 2,
+                'max_queue': 4,
+                'queue_timeout': 30,
+                'initial_estimate': 10
+            }
+        },
+        'jobs': {
+            'enabled': True,
+            'store': 'logs/jobs.db',
+            'workers': 1,
+            'poll_interval': 1.0,
+            'lease_seconds': 900,
+            'max_attempts': 3,
+            'max_pending': 100,
+            'ttl': 3600,
+            'max_subscribers': 1,
+            'events_max_seconds': 30,
+            'server_url': 'http://localhost:5000'
+        },
+        'tracing': {
+            'enabled': True,
+            'server_timing': True,
+            'log_file': ''
+        },
+        'pipeline': {
+            'workers': 8,
+            'health_check_ttl': 5,
+            'cancel_poll_interval': 0.5
+        },
+        'metrics': {
+            'enabled': True,
+            'file': 'logs/metrics.json',
+            'flush_interval': 30,
+            'shared': {
+                'file': 'logs/metrics.shm',
+                'slots': 32,
+                'series': 256,
+                'sync_interval': 1
+            }
+        },
         'rules': {
             'dockerfile': 'config/rules.yaml',
             'strict_mode': False
@@ -51,7 +128,19 @@ def get_default_config() -> Dict[str, Any]:
         'logging': {
             'level': 'INFO',
             'file': 'logs/app.log',
-            'audit_file': 'logs/audit.log'
+            'audit_file': 'logs/audit.log',
+            'audit': {
+                'queue_size': 10000,
+                'on_full': 'drop',
+                'block_timeout': 1.0,
+                'batch_size': 512,
+                'fsync': 'interval',
+                'fsync_interval': 5,
+                'max_bytes': 10485760,
+                'rotate_interval': 86400,
+                'backup_count': 10,
+                'compress': True
+            }
         }
     }
 
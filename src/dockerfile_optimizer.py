@@ -0,0 +1,489 @@
+"""
+Dockerfile Optimizer Module
+Rewrites parsed Dockerfiles for better layer caching and smaller layers.
+"""
+
+import difflib
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+from src.cache_rules import CACHE_MOUNT, PackageManager, configured_managers
+from src.image_size import SizeEstimate, estimate_image_size
+from src.rule_engine import ValidationResult, get_rule_set
+from src.syntax_validator import Instruction, parse_dockerfile, validate_syntax
+
+
+LEADING_FLAGS = re.compile(r'^((?:--\S+\s+)*)(.*)$', re.DOTALL)
+
+# Commands whose effect does not outlive their RUN; merging them into the
+# next RUN would change what that RUN sees
+STATEFUL_COMMAND = re.compile(r'^(cd|export|source|\.|set|shopt|ulimit|umask|alias)\s')
+
+# Only these may sit between a source COPY and the install moved above it
+REORDER_PASSTHROUGH = frozenset({'ENV', 'ARG', 'LABEL', 'EXPOSE'})
+
+# pip options whose value is not something to install (URLs and target paths may contain '/')
+PIP_VALUE_OPTIONS = frozenset({
+    '-i', '--index-url', '--extra-index-url', '--trusted-host', '-t', '--target', '--prefix', '--root',
+    '--platform', '--python-version', '--implementation', '--abi', '--only-binary', '--no-binary',
+    '--cache-dir', '--timeout', '--retries', '--progress-bar', '--upgrade-strategy', '--src',
+})
+LOCAL_ARCHIVES = ('.whl', '.tar.gz', '.zip')
+
+PIP_INSTALL = re.compile(r'^(?:\S*/)?(?:pip3?|python3?\s+-m\s+pip)\s+install\s')
+NPM_INSTALL = re.compile(r'^npm\s+(ci|install|i)(\s|$)')
+YARN_INSTALL = re.compile(r'^yarn(\s+install)?(\s+--\S+)*\s*$')
+POETRY_INSTALL = re.compile(r'^poetry\s+install\s.*--no-root\b')
+# Dependency resolution only; builds (mvn package, gradle build) are left alone
+JVM_DEPENDENCIES = re.compile(
+    r'^(?:\S*/)?(?:mvnw?\s.*\bdependency:(?:go-offline|resolve(?:-plugins)?)|gradlew?\s.*\bdependencies)\b'
+)
+
+
+@dataclass
+class Block:
+    """One instruction with the comment and blank lines above it."""
+    leading: List[str]
+    lines: List[str]
+    instruction: Optional[Instruction]
+    name: str
+    flags: List[str] = field(default_factory=list)
+    commands: List[str] = field(default_factory=list)  # top-level && chain of a shell-form RUN
+    changed: bool = False
+
+    @property
+    def line_number(self) -> int:
+        return self.instruction.line_number if self.instruction is not None else 0
+
+
+@dataclass
+class Change:
+    """One applied rewrite."""
+    line: int
+    kind: str
+    description: str
+
+
+@dataclass
+class OptimizationResult:
+    """Optimized Dockerfile with the rewrites applied and both validations."""
+    original: str
+    optimized: str
+    changes: List[Change]
+    before: ValidationResult
+    after: ValidationResult
+    size_before: SizeEstimate
+    size_after: SizeEstimate
+    syntax_errors: List[str]  # introduced by the rewrite
+
+    @property
+    def safe(self) -> bool:
+        """The rewrite adds no syntax errors and fails no rule the original passed."""
+        failed_before = {r.rule_id for r in self.before.results if not r.passed}
+        failed_after = {r.rule_id for r in self.after.results if not r.passed}
+        return not self.syntax_errors and failed_after <= failed_before
+
+    def diff(self, path: str = 'Dockerfile') -> str:
+        """Unified diff from the original to the optimized Dockerfile."""
+        return ''.join(difflib.unified_diff(
+            self.original.splitlines(keepends=True),
+            self.optimized.splitlines(keepends=True),
+            fromfile=f"a/{path}", tofile=f"b/{path}"
+        ))
+
+
+def split_commands(command: str) -> List[str]:
+    """
+    Split a shell command on top-level `&&`, respecting quotes and parentheses.
+
+    Args:
+        command: Shell-form RUN command
+
+    Returns:
+        Commands of the && chain
+    """
+    parts = []
+    current = []
+    quote = None
+    depth = 0
+    i = 0
+    while i < len(command):
+        char = command[i]
+        if quote:
+            if char == '\\' and quote == '"' and i + 1 < len(command):
+                current.append(command[i:i + 2])
+                i += 2
+                continue
+            if char == quote:
+                quote = None
+        elif char in '"\'':
+            quote = char
+        elif char in '({':
+            depth += 1
+        elif char in ')}':
+            depth -= 1
+        elif char == '&' and command.startswith('&&', i) and depth == 0:
+            parts.append(''.join(current).strip())
+            current = []
+            i += 2
+            continue
+        current.append(char)
+        i += 1
+    parts.append(''.join(current).strip())
+    return [part for part in parts if part]
+
+
+def _blocks(content: str) -> Tuple[List[Block], List[str], str]:
+    """Split content into instruction blocks, trailing lines and the escape character."""
+    parsed = parse_dockerfile(content)
+    lines = content.split('\n')
+    blocks = []
+    position = 0
+    for instruction in parsed.instructions:
+        start, end = instruction.line_number - 1, instruction.end_line
+        block = Block(lines[position:start], lines[start:end], instruction, instruction.instruction)
+        if instruction.instruction == 'RUN' and instruction.json_args is None and not instruction.heredocs:
+            flags, command = LEADING_FLAGS.match(instruction.arguments).groups()
+            block.flags = flags.split()
+            block.commands = split_commands(command)
+        blocks.append(block)
+        position = end
+    return blocks, lines[position:], parsed.directives.get('escape', '\\')
+
+
+def _render(block: Block, escape: str) -> List[str]:
+    """Source lines of a block, regenerated if it was rewritten."""
+    if not block.changed:
+        return block.leading + block.lines
+    if block.name != 'RUN' or not block.commands:
+        return block.leading + block.lines
+    head = ' '.join(['RUN'] + block.flags + [block.commands[0]])
+    rest = [f"    && {command}" for command in block.commands[1:]]
+    lines = [head] + rest
+    return block.leading + [line + f" {escape}" for line in lines[:-1]] + lines[-1:]
+
+
+def starts_comment(command: str) -> bool:
+    """
+    Whether a shell command contains an unquoted `#` that starts a comment.
+
+    Anything appended after such a command (another `&&` step) would be
+    commented out, so its RUN is never rewritten.
+
+    Args:
+        command: One command of a RUN's && chain
+
+    Returns:
+        True if the rest of the line after some `#` is a comment
+    """
+    quote = None
+    i = 0
+    while i < len(command):
+        char = command[i]
+        if quote:
+            if char == '\\' and quote == '"':
+                i += 1
+            elif char == quote:
+                quote = None
+        elif char == '\\':
+            i += 1
+        elif char in '"\'':
+            quote = char
+        elif char == '#' and (i == 0 or command[i - 1].isspace()):
+            return True
+        i += 1
+    return False
+
+
+def _new_block(text: str) -> Block:
+    return Block([], [text], None, text.split(None, 1)[0], changed=True)
+
+
+def _is_rewritable_run(block: Block) -> bool:
+    return block.name == 'RUN' and bool(block.commands) and not any(starts_comment(c) for c in block.commands)
+
+
+def _stages(blocks: List[Block]) -> List[List[int]]:
+    """Block indexes per stage (blocks before the first FROM are skipped)."""
+    stages = []
+    for index, block in enumerate(blocks):
+        if block.name == 'FROM':
+            stages.append([])
+        elif stages:
+            stages[-1].append(index)
+    return stages
+
+
+def _install_manifests(block: Block) -> Optional[List[str]]:
+    """
+    Manifests a dependency-install RUN reads from the build context.
+
+    Returns None if any command in the RUN may need other sources.
+    """
+    if not _is_rewritable_run(block):
+        return None
+    manifests = []
+    for command in block.commands:
+        if PIP_INSTALL.match(command):
+            words = command.split()
+            install = words.index('install')
+            skip = False
+            for index, word in enumerate(words[install + 1:], install + 1):
+                if skip:
+                    skip = False
+                    continue
+                if word in ('-r', '--requirement'):
+                    if index + 1 >= len(words):
+                        return None
+                    manifests.append(_requirements_source(words[index + 1]))
+                    skip = True
+                elif word.startswith('--requirement='):
+                    manifests.append(_requirements_source(word.split('=', 1)[1]))
+                elif word in PIP_VALUE_OPTIONS:
+                    skip = True
+                elif word.startswith('-'):
+                    if word.startswith(('-e', '--editable', '-c', '--constraint', '-f', '--find-links')):
+                        return None  # local paths, or files that may be
+                elif word.startswith('.') or '/' in word or word.endswith(LOCAL_ARCHIVES):
+                    return None  # installs local paths, e.g. src/ or dist/app.whl
+        elif NPM_INSTALL.match(command):
+            if any(not w.startswith('-') for w in command.split()[2:]):
+                return None  # adds packages, rewriting package.json
+            manifests.append('package*.json')
+        elif YARN_INSTALL.match(command):
+            manifests.extend(['package.json', 'yarn.lock*'])
+        elif POETRY_INSTALL.match(command):
+            manifests.extend(['pyproject.toml', 'poetry.lock*'])
+        else:
+            return None
+    return list(dict.fromkeys(manifests))
+
+
+def _requirements_source(path: str) -> str:
+    """What to copy for a requirements file; nested -r includes usually sit next to it."""
+    if path.startswith('./'):
+        path = path[2:]
+    if '/' in path:
+        return path.rsplit('/', 1)[0] + '/'
+    return 'requirements*.txt' if path.startswith('requirements') else path
+
+
+def _reorder_stage(blocks: List[Block], stage: List[int], changes: List[Change]):
+    """Move the first dependency install of a stage above its `COPY . <dest>`."""
+    for position, index in enumerate(stage):
+        copy = blocks[index]
+        if copy.name != 'COPY' or copy.instruction is None or copy.instruction.heredocs:
+            continue
+        words = copy.instruction.arguments.split()
+        flags = [w for w in words if w.startswith('--')]
+        paths = [w for w in words if not w.startswith('--')]
+        if any(f.startswith('--from=') for f in flags) or len(paths) != 2 or paths[0] not in ('.', './'):
+            continue
+        install_index = None
+        variables = []  # ARG/ENV the install may read; they move up with it
+        for later in stage[position + 1:]:
+            if blocks[later].name in REORDER_PASSTHROUGH:
+                if blocks[later].name in ('ARG', 'ENV'):
+                    variables.append(later)
+                continue
+            if blocks[later].name == 'RUN':
+                install_index = later
+            break
+        manifests = _install_manifests(blocks[install_index]) if install_index is not None else None
+        if manifests is None or (variables and '$' in copy.instruction.arguments):
+            return  # moved variables would change what the source COPY sees
+        dest = paths[1] if paths[1].endswith('/') else paths[1] + '/'
+        moved = [blocks[i] for i in variables + [install_index]]
+        for i in sorted(variables + [install_index], reverse=True):
+            blocks.pop(i)
+        blocks[index:index] = moved
+        install = moved[-1]
+        # Directories keep their path under dest; files land directly in it
+        files = [m for m in manifests if not m.endswith('/')]
+        copies = [_new_block(' '.join(['COPY'] + flags + files + [dest]))] if files else []
+        copies += [_new_block(' '.join(['COPY'] + flags + [m, dest + m])) for m in manifests if m.endswith('/')]
+        if copies and copy.leading and not copy.leading[0].strip():
+            # Keep the blank line that separated the source COPY from what came before
+            copies[0].leading = ['']
+        blocks[index:index] = copies
+        changes.append(Change(
+            copy.line_number, 'reorder',
+            f"Copy {' '.join(manifests) or 'nothing'} and run the install from line "
+            f"{install.line_number} before COPY {copy.instruction.arguments}, so source "
+            f"changes no longer re-run the dependency install"
+        ))
+        return
+
+
+def reorder_dependency_copies(blocks: List[Block], changes: List[Change]):
+    """Copy manifests and install dependencies before `COPY . <dest>` in each stage."""
+    stage_number = 0
+    while True:
+        # Reordering inserts blocks, so stage indexes are recomputed each time
+        stages = _stages(blocks)
+        if stage_number >= len(stages):
+            return
+        _reorder_stage(blocks, stages[stage_number], changes)
+        stage_number += 1
+
+
+def _installs_dependencies(command: str) -> bool:
+    """Whether one command of a RUN installs (or resolves) language dependencies."""
+    return bool(
+        PIP_INSTALL.match(command) or NPM_INSTALL.match(command) or YARN_INSTALL.match(command)
+        or POETRY_INSTALL.match(command) or JVM_DEPENDENCIES.match(command)
+    )
+
+
+def _dependency_install(block: Block) -> bool:
+    """Whether the RUN installs language dependencies (kept as its own cache layer)."""
+    return any(_installs_dependencies(c) for c in block.commands)
+
+
+def _manager_installs(manager: PackageManager, command: str) -> bool:
+    """Whether the command installs packages with this manager."""
+    if not manager.install.search(command):
+        return False
+    return manager.stack == 'os' or _installs_dependencies(command)
+
+
+def merge_runs(blocks: List[Block], changes: List[Change]):
+    """Merge adjacent shell-form RUNs with the same flags within a stage."""
+    shell_changed = False
+    index = 0
+    while index < len(blocks) - 1:
+        first, second = blocks[index], blocks[index + 1]
+        if first.name == 'FROM':
+            shell_changed = False
+        elif first.name == 'SHELL':
+            shell_changed = True
+        mergeable = (
+            not shell_changed
+            and _is_rewritable_run(first) and _is_rewritable_run(second)
+            and first.flags == second.flags
+            and not _dependency_install(first) and not _dependency_install(second)
+            and not any(STATEFUL_COMMAND.match(c) or c.rstrip().endswith('&') for c in first.commands)
+        )
+        if not mergeable:
+            index += 1
+            continue
+        first.commands.extend(second.commands)
+        first.leading.extend(line for line in second.leading if line.strip())
+        first.changed = True
+        blocks.pop(index + 1)
+        changes.append(Change(
+            second.line_number, 'merge',
+            f"Merge RUN at line {second.line_number} into the RUN at line {first.line_number}"
+        ))
+
+
+def apply_cache_options(blocks: List[Block], changes: List[Change], managers: Tuple[PackageManager, ...],
+                        cache_mounts: bool = False, stack: str = None):
+    """
+    Keep package-manager download caches out of layers.
+
+    With cache_mounts, language package managers get a BuildKit cache mount;
+    otherwise (and always for OS package managers) their no-cache flag or
+    cleanup command is added. With a stack, other stacks' managers are skipped.
+    Language managers only count for commands that install dependencies
+    (the same predicate that keeps installs out of merged RUNs), so build
+    and test commands are never rewritten.
+    """
+    for block in blocks:
+        if not _is_rewritable_run(block) or any(CACHE_MOUNT.search(' ' + flag) for flag in block.flags):
+            continue
+        text = ' && '.join(block.commands)
+        for manager in managers:
+            if stack and manager.stack not in (stack.lower(), 'os'):
+                continue
+            if not any(_manager_installs(manager, c) for c in block.commands):
+                continue
+            if manager.cache is not None and manager.cache.search(text):
+                continue
+            if cache_mounts and manager.stack != 'os' and manager.cache_dir:
+                block.flags.append(f"--mount=type=cache,target={manager.cache_dir}")
+                description = f"Mount a {manager.name} cache at {manager.cache_dir}"
+            elif manager.no_cache_flag:
+                block.commands = [
+                    manager.install.sub(lambda m: f"{m.group(0)} {manager.no_cache_flag}", c, count=1)
+                    if _manager_installs(manager, c) and manager.no_cache_flag not in c else c
+                    for c in block.commands
+                ]
+                description = f"Add {manager.no_cache_flag} to {manager.name}"
+            elif manager.cleanup:
+                block.commands.append(manager.cleanup)
+                description = f"Append `{manager.cleanup}`"
+            else:
+                continue
+            text = ' && '.join(block.commands)
+            block.changed = True
+            changes.append(Change(block.line_number, 'cache', description))
+
+
+def optimize_dockerfile(content: str, stack: str = None, cache_mounts: bool = False,
+                        rule_set=None) -> OptimizationResult:
+    """
+    Rewrite a Dockerfile for build-cache efficiency and re-validate it.
+
+    Passes run in order: dependency copies before source copies, merging
+    adjacent RUNs, then no-cache options or cache mounts per package
+    manager (as configured for PERF-002 in rules.yaml), which also cleans
+    apt lists in the installing layer. Heredoc and exec-form RUNs are
+    never rewritten; untouched lines are kept byte for byte.
+
+    Args:
+        content: Dockerfile content
+        stack: Detected stack, if known
+        cache_mounts: Prefer RUN --mount=type=cache (BuildKit) over no-cache options
+        rule_set: CompiledRuleSet (defaults to the shared rule set)
+
+    Returns:
+        OptimizationResult
+    """
+    rule_set = rule_set or get_rule_set()
+    blocks, tail, escape = _blocks(content)
+    changes: List[Change] = []
+
+    reorder_dependency_copies(blocks, changes)
+    merge_runs(blocks, changes)
+    apply_cache_options(blocks, changes, configured_managers(rule_set), cache_mounts, stack)
+
+    changes.sort(key=lambda change: change.line)
+    if changes:
+        lines = [line for block in blocks for line in _render(block, escape)] + tail
+        optimized = '\n'.join(lines)
+    else:
+        optimized = content
+
+    parsed_before = parse_dockerfile(content)
+    parsed_after = parse_dockerfile(optimized)
+    return OptimizationResult(
+        original=content,
+        optimized=optimized,
+        changes=changes,
+        before=rule_set.validate(content, parsed_before),
+        after=rule_set.validate(optimized, parsed_after),
+        size_before=estimate_image_size(parsed_before.instructions),
+        size_after=estimate_image_size(parsed_after.instructions),
+        syntax_errors=[
+            e for e in validate_syntax(optimized, parsed_after).errors
+            if e not in validate_syntax(content, parsed_before).errors
+        ]
+    )
+
+
+def format_optimization_report(result: OptimizationResult) -> str:
+    """Format applied changes and the before/after validation for the CLI."""
+    if not result.changes:
+        return "\nNo optimizations apply.\n"
+    report = "\n--- OPTIMIZATIONS ---\n"
+    for change in result.changes:
+        report += f"• line {change.line}: {change.description}\n"
+    report += (
+        f"\nValidation: {result.before.summary} -> {result.after.summary}\n"
+        f"Estimated size: {result.size_before.final_mb:.0f} MB -> {result.size_after.final_mb:.0f} MB\n"
+    )
+    for error in result.syntax_errors:
+        report += f"✗ {error}\n"
+    return report
@@ -0,0 +1,322 @@
+"""
+Example Index Module
+File-backed BM25 index of accepted Dockerfiles used as few-shot examples.
+"""
+
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict, field
+from typing import Dict, List, Optional
+from src.config_loader import load_config
+
+try:
+    import fcntl
+except ImportError:  # not on Windows; writers are then only serialized within a process
+    fcntl = None
+
+
+@dataclass
+class Example:
+    """Accepted Dockerfile with the context it was generated for."""
+    id: str
+    stack: str
+    framework: Optional[str]
+    dependencies: List[str]
+    dockerfile: str
+    added: float
+    last_used: float = 0.0
+    terms: List[str] = field(default_factory=list)
+
+
+def _normalize_name(name: str) -> str:
+    """Normalize a dependency name for matching."""
+    return re.sub(r'[-_.]+', '-', name.strip().lower())
+
+
+def build_terms(stack: str, framework: Optional[str], dependencies: List[str]) -> List[str]:
+    """
+    Build index terms for a stack, framework and dependency set.
+
+    Args:
+        stack: Stack name
+        framework: Framework name or None
+        dependencies: Dependency names
+
+    Returns:
+        List of field-prefixed terms
+    """
+    terms = [f"stack:{stack.lower()}"]
+    if framework:
+        terms.append(f"fw:{framework.lower()}")
+    for dep in dependencies:
+        name = _normalize_name(dep)
+        if name:
+            terms.append(f"dep:{name}")
+            # Scoped and namespaced packages also match on their last segment
+            tail = re.split(r'[/:]', name)[-1]
+            if tail != name:
+                terms.append(f"dep:{tail}")
+    return terms
+
+
+class ExampleIndex:
+    """
+    Incremental, size-capped BM25 index persisted as JSON lines.
+
+    Processes sharing the file append under a file lock and pick up each
+    other's records before writing.
+    """
+
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self, index_file: str = 'logs/example_index.jsonl', max_entries: int = 500):
+        """
+        Initialize example index.
+
+        Args:
+            index_file: JSON lines file backing the index
+            max_entries: Maximum number of examples kept before eviction
+        """
+        self.index_file = index_file
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._examples: Dict[str, Example] = {}
+        self._doc_freq: Counter = Counter()
+        self._total_length = 0
+        # Backing file position already applied: inode, byte offset, line count
+        self._inode = None
+        self._offset = 0
+        self._lines = 0
+        os.makedirs(os.path.dirname(index_file) or '.', exist_ok=True)
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._examples)
+
+    @contextmanager
+    def _file_lock(self):
+        """Exclusive lock serializing writers across processes."""
+        lock_fd = os.open(f"{self.index_file}.lock", os.O_WRONLY | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(lock_fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_fd, fcntl.LOCK_UN)
+            os.close(lock_fd)
+
+    def _load(self):
+        """Load examples from disk, compacting the file if needed."""
+        with self._lock, self._file_lock():
+            self._sync()
+            self._compact()
+
+    def _sync(self):
+        """
+        Apply records other processes wrote since the last read (file lock held).
+
+        Later records override earlier ones; the whole file is re-read
+        after another process rewrote it.
+        """
+        try:
+            stat = os.stat(self.index_file)
+        except FileNotFoundError:
+            return
+        if stat.st_ino != self._inode or stat.st_size < self._offset:
+            self._examples.clear()
+            self._doc_freq = Counter()
+            self._total_length = 0
+            self._inode, self._offset, self._lines = stat.st_ino, 0, 0
+        if stat.st_size == self._offset:
+            return
+        with open(self.index_file, 'rb') as f:
+            f.seek(self._offset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break  # a write still in progress elsewhere
+                self._offset += len(line)
+                self._lines += 1
+                try:
+                    self._apply(json.loads(line))
+                except (ValueError, TypeError, AttributeError):
+                    continue
+
+    def _apply(self, record: dict):
+        """Apply one record: a full example, or a last_used update of one."""
+        if set(record) == {'id', 'last_used'}:
+            example = self._examples.get(record['id'])
+            if example is not None:
+                example.last_used = max(example.last_used, record['last_used'])
+            return
+        example = Example(**record)
+        previous = self._examples.get(example.id)
+        if previous is not None:
+            example.last_used = max(example.last_used, previous.last_used)
+            self._remove(example.id)
+        self._insert(example)
+
+    def _append(self, records: List[dict]):
+        """Append records to the backing file (file lock held, after _sync)."""
+        data = ''.join(json.dumps(record) + '\n' for record in records).encode('utf-8')
+        with open(self.index_file, 'ab') as f:
+            f.write(data)
+        stat = os.stat(self.index_file)
+        self._inode, self._offset = stat.st_ino, stat.st_size
+        self._lines += len(records)
+        self._compact()
+
+    def _compact(self):
+        """Evict over the size cap and drop superseded lines (file lock held)."""
+        if len(self._examples) > self.max_entries:
+            self._evict()
+            self._rewrite()
+        elif self._lines > 2 * max(len(self._examples), self.max_entries):
+            self._rewrite()
+
+    def _insert(self, example: Example):
+        self._examples[example.id] = example
+        self._doc_freq.update(set(example.terms))
+        self._total_length += len(example.terms)
+
+    def _remove(self, example_id: str):
+        example = self._examples.pop(example_id)
+        self._doc_freq.subtract(set(example.terms))
+        self._total_length -= len(example.terms)
+
+    def _evict(self):
+        """Drop least recently used examples until within the size cap."""
+        overflow = len(self._examples) - self.max_entries
+        if overflow <= 0:
+            return
+        victims = sorted(self._examples.values(), key=lambda e: max(e.last_used, e.added))
+        for example in victims[:overflow]:
+            self._remove(example.id)
+        self._doc_freq = +self._doc_freq
+
+    def _rewrite(self):
+        """Rewrite the backing file atomically (file lock held)."""
+        tmp_file = self.index_file + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            for example in self._examples.values():
+                f.write(json.dumps(asdict(example)) + '\n')
+        os.replace(tmp_file, self.index_file)
+        stat = os.stat(self.index_file)
+        self._inode, self._offset, self._lines = stat.st_ino, stat.st_size, len(self._examples)
+
+    def add(self, stack: str, framework: Optional[str], dependencies: List[str], dockerfile: str) -> str:
+        """
+        Add an accepted Dockerfile to the index.
+
+        Re-adding a known Dockerfile only refreshes its last use. Other
+        processes' additions are picked up before writing.
+
+        Args:
+            stack: Stack name
+            framework: Framework name or None
+            dependencies: Dependency names of the project
+            dockerfile: Dockerfile content that passed validation
+
+        Returns:
+            Example id (content hash)
+        """
+        dockerfile = dockerfile.strip()
+        example_id = hashlib.sha256(dockerfile.encode('utf-8')).hexdigest()[:16]
+        now = time.time()
+
+        with self._lock, self._file_lock():
+            self._sync()
+            if example_id in self._examples:
+                self._examples[example_id].last_used = now
+                self._append([{'id': example_id, 'last_used': now}])
+                return example_id
+            example = Example(
+                id=example_id,
+                stack=stack,
+                framework=framework,
+                dependencies=sorted(set(dependencies)),
+                dockerfile=dockerfile,
+                added=now,
+                terms=build_terms(stack, framework, dependencies)
+            )
+            self._insert(example)
+            self._append([asdict(example)])
+
+        return example_id
+
+    def search(self, stack: str, framework: Optional[str], dependencies: List[str], limit: int = 2) -> List[Example]:
+        """
+        Find the accepted examples closest to a stack, framework and dependency set.
+
+        Args:
+            stack: Stack name; only examples of the same stack are returned
+            framework: Framework name or None
+            dependencies: Dependency names of the project
+            limit: Maximum number of examples
+
+        Returns:
+            Examples ordered by BM25 score, best first
+        """
+        query = set(build_terms(stack, framework, dependencies))
+        stack_term = f"stack:{stack.lower()}"
+
+        with self._lock:
+            count = len(self._examples)
+            if count == 0:
+                return []
+            avg_length = self._total_length / count
+
+            scored = []
+            for example in self._examples.values():
+                if example.stack.lower() != stack.lower():
+                    continue
+                length = len(example.terms)
+                tf = Counter(example.terms)
+                score = 0.0
+                for term in query:
+                    if term == stack_term or term not in tf:
+                        continue
+                    df = self._doc_freq[term]
+                    idf = math.log(1 + (count - df + 0.5) / (df + 0.5))
+                    freq = tf[term]
+                    score += idf * freq * (self.K1 + 1) / (
+                        freq + self.K1 * (1 - self.B + self.B * length / avg_length)
+                    )
+                scored.append((score, example.added, example))
+
+            scored.sort(key=lambda item: (item[0], item[1]), reverse=True)
+            results = [example for _, _, example in scored[:limit]]
+            if results:
+                # Persisted, so eviction after a restart still knows what is in use
+                touches = [{'id': example.id, 'last_used': time.time()} for example in results]
+                with self._file_lock():
+                    self._sync()
+                    for touch in touches:
+                        self._apply(touch)
+                    self._append(touches)
+
+        return results
+
+
+# Global example index
+_example_index = None
+
+
+def get_example_index() -> ExampleIndex:
+    """Get global example index."""
+    global _example_index
+    if _example_index is None:
+        settings = load_config().get('examples', {})
+        _example_index = ExampleIndex(
+            index_file=settings.get('index_file', 'logs/example_index.jsonl'),
+            max_entries=settings.get('max_entries', 500)
+        )
+    return _example_index
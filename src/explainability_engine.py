@@ -5,19 +5,51 @@ Generates explanations for AI decisions.
 
 from typing import Dict, List
 
+from src.stage_graph import StageGraph, analyze_stages
+from src.syntax_validator import parse_dockerfile
 
-def explain_dockerfile(dockerfile: str, stack: str) -> str:
+
+def explain_stages(stages: StageGraph) -> str:
+    """
+    Explain the multi-stage build structure.
+    
+    Args:
+        stages: Stage analysis of the Dockerfile
+        
+    Returns:
+        Explanation, or an empty string for single-stage builds
+    """
+    if len(stages.stages) < 2:
+        return ''
+    label = lambda index: stages.stages[index].label
+    explanation = (
+        f"Build: Multi-stage ({len(stages.stages)} stages)\n"
+        "Reason: Separates build dependencies from runtime\n"
+        "Rule: SEC-005 (Multi-stage builds recommended)\n"
+        "Benefit: Smaller final image size\n"
+        f"Critical path: {' -> '.join(label(i) for i in stages.critical_path)} "
+        f"({stages.critical_cost} cost units)\n"
+    )
+    for suggestion in stages.suggestions:
+        explanation += f"Suggestion: {suggestion}\n"
+    return explanation
+
+
+def explain_dockerfile(dockerfile: str, stack: str, stages: StageGraph = None) -> str:
     """
     Generate explanation for Dockerfile decisions.
     
     Args:
         dockerfile: Generated Dockerfile content
         stack: Detected stack
+        stages: Stage analysis (computed from the Dockerfile if omitted)
         
     Returns:
         Human-readable explanation
     """
     explanations = []
+    if stages is None:
+        stages = analyze_stages(parse_dockerfile(dockerfile).instructions)
     
     # Explain base image
     if 'alpine' in dockerfile.lower():
@@ -45,13 +77,9 @@ def explain_dockerfile(dockerfile: str, stack: str) -> str:
         )
     
     # Explain multi-stage
-    if dockerfile.count('FROM') >= 2:
-        explanations.append(
-            "Build: Multi-stage\n"
-            "Reason: Separates build dependencies from runtime\n"
-            "Rule: SEC-005 (Multi-stage builds recommended)\n"
-            "Benefit: Smaller final image size\n"
-        )
+    stage_explanation = explain_stages(stages)
+    if stage_explanation:
+        explanations.append(stage_explanation)
     
     return "\n".join(explanations)
 
@@ -0,0 +1,276 @@
+"""
+Generation Module
+The Dockerfile generation pipeline shared by the CLI and the web UI.
+
+Stage graph (stages on one line run concurrently):
+
+    normalize_input   health_check   load_templates   load_examples
+    detect_stack
+    build_prompt      (detect_stack, load_templates, load_examples)
+    generate          (build_prompt, health_check)
+    optimize          (optional)
+    validate
+    image_size        record_example
+"""
+
+import time
+from dataclasses import dataclass, replace
+from typing import Any, Dict, Iterable, List, Optional
+from src.config_loader import load_config
+from src.dockerfile_optimizer import OptimizationResult, optimize_dockerfile
+from src.example_index import get_example_index
+from src.image_size import SizeEstimate, estimate_image_size
+from src.input_processor import ProcessedInput, normalize_input
+from src.ollama_client import OllamaClient
+from src.metrics_collector import get_metrics_collector
+from src.pipeline import (
+    CancelToken, Pipeline, PipelineCancelled, PipelineContext, Stage, StageCache, StageHook, StageTimer,
+    tracing_hook
+)
+from src.prompt_builder import AssembledPrompt, assemble_prompt
+from src.rule_engine import get_rule_set
+from src.stack_detector import StackInfo, detect_stack
+from src.syntax_validator import parse_dockerfile
+from src.template_registry import get_template_registry
+from src.validation_cache import CacheEntry, get_validation_cache
+
+
+class GenerationError(Exception):
+    """Generation request that cannot be served, with its HTTP status."""
+
+    def __init__(self, message: str, status: int = 500):
+        super().__init__(message)
+        self.status = status
+
+
+def check_token_budget(token_budget: Any) -> Optional[int]:
+    """
+    Validate a requested prompt token budget.
+
+    Args:
+        token_budget: Requested budget, or None for the configured default
+
+    Returns:
+        The budget (None if not given)
+
+    Raises:
+        GenerationError: If the budget is not a positive integer (status 400)
+    """
+    if token_budget is None:
+        return None
+    if isinstance(token_budget, bool) or not isinstance(token_budget, int) or token_budget <= 0:
+        raise GenerationError('token_budget must be a positive integer', 400)
+    return token_budget
+
+
+@dataclass
+class GenerationResult:
+    """Everything the generation pipeline produced."""
+    input_data: ProcessedInput
+    stack_info: StackInfo
+    assembled: AssembledPrompt
+    generated: str
+    optimization: Optional[OptimizationResult]
+    validation: CacheEntry
+    image_size: SizeEstimate
+
+    @property
+    def dockerfile(self) -> str:
+        """Generated Dockerfile, optimized when the optimizer ran and re-validated."""
+        return _final_dockerfile(self.generated, self.optimization)
+
+    @property
+    def optimizations(self) -> List[Dict[str, Any]]:
+        """Optimizer changes that were kept."""
+        if self.dockerfile is self.generated:
+            return []
+        return [
+            {'line': c.line, 'kind': c.kind, 'description': c.description}
+            for c in self.optimization.changes
+        ]
+
+
+def _final_dockerfile(generated: str, optimization: Optional[OptimizationResult]) -> str:
+    if optimization is not None and optimization.changes and optimization.safe:
+        return optimization.optimized
+    return generated
+
+
+def _normalize_input(ctx: PipelineContext) -> ProcessedInput:
+    return normalize_input(ctx['source'], source_type=ctx['source_type'])
+
+
+def _health_check(ctx: PipelineContext) -> bool:
+    if not ctx['client'].health_check():
+        raise GenerationError('Ollama not available', 503)
+    return True
+
+
+def _load_templates(ctx: PipelineContext):
+    # Warm (or mtime-check) prompt templates and the rule set used for cache guidance
+    get_template_registry()
+    get_rule_set()
+
+
+def _load_examples(ctx: PipelineContext):
+    examples_config = ctx['config'].get('examples', {})
+    return get_example_index() if examples_config.get('enabled', True) else None
+
+
+def _detect_stack(ctx: PipelineContext) -> StackInfo:
+    return detect_stack(ctx['normalize_input'])
+
+
+def _build_prompt(ctx: PipelineContext) -> AssembledPrompt:
+    config = ctx['config']
+    token_budget = ctx.get('token_budget') or config.get('prompt', {}).get('token_budget')
+    return assemble_prompt(
+        ctx['detect_stack'], ctx['normalize_input'], token_budget,
+        example_index=ctx['load_examples'],
+        max_examples=config.get('examples', {}).get('max_examples', 2)
+    )
+
+
+def _generate(ctx: PipelineContext) -> str:
+    return ctx['client'].generate(ctx['build_prompt'].prompt)
+
+
+def _should_optimize(ctx: PipelineContext) -> bool:
+    optimize = ctx.get('optimize')
+    if optimize is None:
+        optimize = ctx['config'].get('optimizer', {}).get('enabled', False)
+    return bool(optimize)
+
+
+def _optimize(ctx: PipelineContext) -> OptimizationResult:
+    return optimize_dockerfile(
+        ctx['generate'], ctx['detect_stack'].name,
+        ctx['config'].get('optimizer', {}).get('cache_mounts', False)
+    )
+
+
+def _validate(ctx: PipelineContext) -> CacheEntry:
+    entry, _ = get_validation_cache().validate(_final_dockerfile(ctx['generate'], ctx['optimize']))
+    return entry
+
+
+def _image_size(ctx: PipelineContext) -> SizeEstimate:
+    dependencies = list(ctx['normalize_input'].dependencies)
+    if not dependencies:
+        return ctx['validate'].image_size
+    # Known dependencies refine the estimate for `install -r requirements.txt` style steps
+    dockerfile = _final_dockerfile(ctx['generate'], ctx['optimize'])
+    return estimate_image_size(parse_dockerfile(dockerfile).instructions, dependencies=dependencies)
+
+
+def _record_example(ctx: PipelineContext):
+    example_index = ctx['load_examples']
+    entry = ctx['validate']
+    if example_index is not None and entry.validation_result.passed and entry.syntax_result.valid:
+        stack_info = ctx['detect_stack']
+        example_index.add(
+            stack_info.name, stack_info.framework,
+            list(ctx['normalize_input'].dependencies),
+            _final_dockerfile(ctx['generate'], ctx['optimize'])
+        )
+
+
+def _client_key(ctx: PipelineContext):
+    client = ctx['client']
+    return client.base_url, client.model
+
+
+STAGES = [
+    Stage('normalize_input', _normalize_input),
+    Stage('health_check', _health_check, cache_ttl=5.0, cache_key=_client_key),
+    Stage('load_templates', _load_templates),
+    Stage('load_examples', _load_examples),
+    Stage('detect_stack', _detect_stack, requires=('normalize_input',)),
+    Stage('build_prompt', _build_prompt, requires=('detect_stack', 'load_templates', 'load_examples')),
+    Stage('generate', _generate, requires=('build_prompt', 'health_check'), background=True),
+    Stage('optimize', _optimize, requires=('generate',), enabled=_should_optimize),
+    Stage('validate', _validate, requires=('optimize',)),
+    Stage('image_size', _image_size, requires=('validate',)),
+    Stage('record_example', _record_example, requires=('validate',)),
+]
+
+
+# Global generation pipeline
+_generation_pipeline: Optional[Pipeline] = None
+
+
+def get_generation_pipeline() -> Pipeline:
+    """Get global generation pipeline (traced, with cached health checks)."""
+    global _generation_pipeline
+    if _generation_pipeline is None:
+        settings = load_config().get('pipeline', {})
+        ttl = settings.get('health_check_ttl', 5.0)
+        stages = [replace(s, cache_ttl=ttl) if s.name == 'health_check' else s for s in STAGES]
+        _generation_pipeline = Pipeline(stages, hooks=[tracing_hook, StageCache()])
+    return _generation_pipeline
+
+
+def run_generation(source, source_type: str = 'text', token_budget: int = None,
+                   optimize: bool = None, cancel: CancelToken = None,
+                   hooks: Iterable[StageHook] = (), client: OllamaClient = None,
+                   config: Dict[str, Any] = None) -> GenerationResult:
+    """
+    Generate and validate a Dockerfile.
+
+    Args:
+        source: Text description, directory or README path
+        source_type: 'text', 'directory' or 'readme'
+        token_budget: Prompt token budget (default from config)
+        optimize: Run the optimizer (default from config)
+        cancel: Cancellation token (e.g. tied to the client connection)
+        hooks: Extra stage hooks, e.g. progress reporting
+        client: Model client (default OllamaClient())
+        config: Application config (loaded if omitted)
+
+    Returns:
+        GenerationResult
+
+    Raises:
+        GenerationError: If the token budget is invalid or the model is not available
+        PipelineCancelled: If cancelled before finishing
+    """
+    token_budget = check_token_budget(token_budget)
+    timer = StageTimer()
+    start = time.perf_counter()
+    outcome = 'failure'
+    try:
+        context = get_generation_pipeline().run({
+            'source': source,
+            'source_type': source_type,
+            'token_budget': token_budget,
+            'optimize': optimize,
+            'client': client or OllamaClient(),
+            'config': config if config is not None else load_config()
+        }, cancel=cancel, hooks=[timer, *hooks])
+        outcome = 'success'
+    except PipelineCancelled:
+        outcome = 'cancelled'
+        raise
+    finally:
+        _record_metrics(timer, time.perf_counter() - start, outcome)
+
+    return GenerationResult(
+        input_data=context['normalize_input'],
+        stack_info=context['detect_stack'],
+        assembled=context['build_prompt'],
+        generated=context['generate'],
+        optimization=context['optimize'],
+        validation=context['validate'],
+        image_size=context['image_size']
+    )
+
+
+def _record_metrics(timer: StageTimer, duration: float, outcome: str):
+    metrics = get_metrics_collector()
+    if not metrics.enabled:
+        return
+    results = timer.context.results if timer.context is not None else {}
+    stack = results['detect_stack'].name if results.get('detect_stack') else 'unknown'
+    metrics.record_generation(duration, outcome == 'success', stack, timer.timings, outcome)
+    if results.get('validate') is not None:
+        metrics.record_validation(results['validate'].validation_result.passed)
@@ -0,0 +1,443 @@
+"""
+Image Size Module
+Estimates per-stage and final image sizes offline from a bundled size table.
+"""
+
+import hashlib
+import os
+import re
+import threading
+import yaml
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
+
+from src.cache_rules import CACHE_MOUNT
+from src.rule_engine import RuleResult, RuleVisitor
+from src.stage_graph import COPY_FROM, build_stages
+from src.syntax_validator import Instruction
+
+
+COMMAND_SEPARATOR = re.compile(r'&&|\|\||[;|\n]')
+APT_LISTS_REMOVED = re.compile(r'rm\s+-r?f\S*\s+/var/lib/apt/lists')
+NPM_CACHE_CLEANED = re.compile(r'\b(npm|yarn)\s+cache\s+clean\b')
+PACKAGE_NAME = re.compile(r'[<>=!~\[;@\s]')
+
+# What COPY --from carries over from another stage: language packages and
+# copied files, not OS packages or caches left in the build stage
+COPIED_KINDS = frozenset({'package', 'files'})
+
+# Flags that take the next word as their value
+VALUE_FLAGS = {
+    'apk': {'--virtual', '-t', '--repository', '-X'},
+    'apt': {'-o', '-t', '--target-release'},
+    'pip': {'-r', '--requirement', '-c', '--constraint', '-e', '--editable', '-i', '--index-url',
+            '--extra-index-url', '-f', '--find-links', '-t', '--target', '--prefix', '--root'},
+    'npm': {'--prefix', '--registry'}
+}
+NPM_PRODUCTION_FLAGS = {'--omit=dev', '--production', '--only=production', '--only=prod', '--prod'}
+
+
+@dataclass(frozen=True)
+class SizeTable:
+    """Base image sizes and package-install heuristics in MB."""
+    base_images: Dict[str, Dict[str, float]]
+    unknown_image: float
+    packages: Dict[str, dict]
+    download_cache: float
+    context_copy: float
+    version: str
+    source: str = '<inline>'
+    mtime: float = 0.0
+
+    def base_size(self, image: str) -> Optional[float]:
+        """
+        Size of a base image reference.
+
+        Args:
+            image: Image reference as written after FROM
+
+        Returns:
+            Size in MB, or None if the image is not in the table
+        """
+        image = image.split('@', 1)[0].lower()
+        repository, tag = image, ''
+        if ':' in image.rsplit('/', 1)[-1]:
+            repository, tag = image.rsplit(':', 1)
+        for prefix in ('docker.io/library/', 'docker.io/', 'library/'):
+            if repository.startswith(prefix):
+                repository = repository[len(prefix):]
+                break
+        variants = self.base_images.get(repository) or self.base_images.get(repository.rsplit('/', 1)[-1])
+        if variants is None:
+            return None
+        if tag in variants:
+            return variants[tag]
+        words = set(tag.split('-'))
+        best = None
+        for name in variants:
+            parts = name.split('-')
+            if name != 'default' and words.issuperset(parts) and (best is None or len(parts) > len(best.split('-'))):
+                best = name
+        return variants[best] if best is not None else variants.get('default')
+
+    def package_size(self, manager: str, name: str) -> float:
+        """Size of one named package installed with the given manager."""
+        settings = self.packages.get(manager, {})
+        return (settings.get('known') or {}).get(name.lower(), settings.get('default', 0))
+
+
+@dataclass
+class SizeItem:
+    """One contribution to a stage's size."""
+    line: int
+    description: str
+    size_mb: float
+    kind: str = 'package'  # os, package, cache or files
+
+
+@dataclass
+class StageSize:
+    """Estimated size of one stage."""
+    index: int
+    label: str
+    base: str
+    base_mb: float
+    known_base: bool = True
+    items: List[SizeItem] = field(default_factory=list)
+
+    @property
+    def added_mb(self) -> float:
+        return sum(item.size_mb for item in self.items)
+
+    @property
+    def total_mb(self) -> float:
+        return self.base_mb + self.added_mb
+
+    @property
+    def artifact_mb(self) -> float:
+        """Size another stage gets when copying this stage's build output."""
+        return sum(item.size_mb for item in self.items if item.kind in COPIED_KINDS)
+
+
+@dataclass
+class SizeEstimate:
+    """Per-stage and final image size estimate."""
+    stages: List[StageSize]
+    final: Optional[int]
+    table_version: str = ''
+
+    @property
+    def final_mb(self) -> float:
+        return self.stages[self.final].total_mb if self.final is not None else 0.0
+
+    def largest_items(self, limit: int = 3) -> List[SizeItem]:
+        """Biggest additions to the final stage."""
+        if self.final is None:
+            return []
+        return sorted(self.stages[self.final].items, key=lambda item: -item.size_mb)[:limit]
+
+    def to_dict(self) -> Dict:
+        """Serialize for API responses."""
+        return {
+            'final_mb': round(self.final_mb, 1),
+            'final_stage': self.stages[self.final].label if self.final is not None else None,
+            'table_version': self.table_version,
+            'stages': [
+                {
+                    'name': s.label,
+                    'base': s.base,
+                    'base_mb': round(s.base_mb, 1),
+                    'known_base': s.known_base,
+                    'added_mb': round(s.added_mb, 1),
+                    'total_mb': round(s.total_mb, 1),
+                    'items': [
+                        {
+                            'line': i.line,
+                            'description': i.description,
+                            'size_mb': round(i.size_mb, 1),
+                            'kind': i.kind
+                        }
+                        for i in s.items
+                    ]
+                }
+                for s in self.stages
+            ]
+        }
+
+
+def load_size_table(table_file: str) -> SizeTable:
+    """
+    Load the image size table from YAML.
+
+    Args:
+        table_file: Path to the size table
+
+    Returns:
+        SizeTable
+    """
+    with open(table_file, 'rb') as f:
+        raw = f.read()
+    data = yaml.safe_load(raw) or {}
+    base_images = {
+        str(name).lower(): {str(tag).lower(): float(size) for tag, size in (variants or {}).items()}
+        for name, variants in (data.get('base_images') or {}).items()
+    }
+    return SizeTable(
+        base_images=base_images,
+        unknown_image=float(data.get('unknown_image', 150)),
+        packages=data.get('packages') or {},
+        download_cache=float(data.get('download_cache', 0.5)),
+        context_copy=float(data.get('context_copy', 2)),
+        version=hashlib.sha256(raw).hexdigest()[:16],
+        source=table_file,
+        mtime=os.stat(table_file).st_mtime
+    )
+
+
+def _default_table_file() -> str:
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    project_root = os.path.dirname(current_dir)
+    return os.path.join(project_root, 'config', 'image_sizes.yaml')
+
+
+_size_tables: Dict[str, SizeTable] = {}
+_size_tables_lock = threading.Lock()
+
+
+def get_size_table(table_file: str = None) -> SizeTable:
+    """
+    Get the shared size table, reloading it when the file changes.
+
+    Args:
+        table_file: Path to the size table (defaults to config/image_sizes.yaml)
+
+    Returns:
+        SizeTable
+    """
+    table_file = os.path.abspath(table_file or _default_table_file())
+    mtime = os.stat(table_file).st_mtime
+    table = _size_tables.get(table_file)
+    if table is not None and table.mtime == mtime:
+        return table
+    with _size_tables_lock:
+        table = _size_tables.get(table_file)
+        if table is None or table.mtime != mtime:
+            table = _size_tables[table_file] = load_size_table(table_file)
+        return table
+
+
+def _arguments(words: List[str], start: int, value_flags: set) -> List[str]:
+    """Non-flag words after index start, skipping values of flags in value_flags."""
+    args = []
+    skip = False
+    for word in words[start:]:
+        if skip:
+            skip = False
+        elif word in value_flags:
+            skip = True
+        elif not word.startswith('-'):
+            args.append(word)
+    return args
+
+
+def _run_items(instruction: Instruction, table: SizeTable, pip_no_cache: bool,
+               dependencies: Optional[Iterable[str]]) -> List[SizeItem]:
+    """Estimate what one RUN instruction adds."""
+    text = instruction.arguments + ''.join('\n' + h.content for h in instruction.heredocs)
+    mounted = bool(CACHE_MOUNT.search(instruction.arguments))
+    line = instruction.line_number
+    items: List[SizeItem] = []
+    virtual: Dict[str, SizeItem] = {}
+
+    def add(description: str, size: float, kind: str = 'package', cached: bool = False):
+        if size <= 0:
+            return None
+        item = SizeItem(line, description, size, kind)
+        items.append(item)
+        if cached:
+            items.append(SizeItem(line, f"{description} download cache", size * table.download_cache, 'cache'))
+        return item
+
+    def add_node(tool: str, verb: str, rest: List[str]):
+        packages = _arguments(rest, 0, VALUE_FLAGS['npm'])
+        cached = not (mounted or NPM_CACHE_CLEANED.search(text))
+        if packages:
+            add(f"{tool} {verb} {' '.join(packages)}", sum(table.package_size('npm', p) for p in packages),
+                cached=cached)
+            return
+        settings = table.packages.get('npm', {})
+        size = settings.get('install', 0)
+        if NPM_PRODUCTION_FLAGS.intersection(rest):
+            size *= settings.get('production', 1)
+        add(f"{tool} {verb} (node_modules)", size, cached=cached)
+
+    for command in COMMAND_SEPARATOR.split(text):
+        words = command.split()
+        while words and (words[0] == 'sudo' or '=' in words[0]):
+            words = words[1:]
+        if not words:
+            continue
+        tool = words[0].rsplit('/', 1)[-1]
+
+        if tool == 'apk' and 'add' in words:
+            packages = _arguments(words, words.index('add') + 1, VALUE_FLAGS['apk'])
+            size = sum(table.package_size('apk', p) for p in packages)
+            item = add(f"apk add {' '.join(packages)}", size, 'os')
+            for flag in ('--virtual', '-t'):
+                if flag in words and words.index(flag) + 1 < len(words) and item is not None:
+                    virtual[words[words.index(flag) + 1]] = item
+        elif tool == 'apk' and 'del' in words:
+            for name in _arguments(words, words.index('del') + 1, set()):
+                if name in virtual and virtual[name] in items:
+                    items.remove(virtual.pop(name))
+        elif tool in ('apt-get', 'apt') and 'install' in words:
+            packages = _arguments(words, words.index('install') + 1, VALUE_FLAGS['apt'])
+            add(f"{tool} install {' '.join(packages)}", sum(table.package_size('apt', p) for p in packages), 'os')
+        elif tool in ('apt-get', 'apt') and 'update' in words:
+            if not mounted and not APT_LISTS_REMOVED.search(text):
+                add('apt package index', table.packages.get('apt', {}).get('index', 0), 'cache')
+        elif 'install' in words and any(
+                w.rsplit('/', 1)[-1] in ('pip', 'pip3') for w in words[:words.index('install')]):
+            args_start = words.index('install') + 1
+            packages = _arguments(words, args_start, VALUE_FLAGS['pip'])
+            requirements = any(w in ('-r', '--requirement') or w.startswith('--requirement=')
+                               for w in words[args_start:])
+            cached = not (mounted or pip_no_cache or '--no-cache-dir' in words)
+            if requirements:
+                if dependencies is not None:
+                    size = sum(table.package_size('pip', name) for name in dependencies)
+                else:
+                    size = table.packages.get('pip', {}).get('requirements', 0)
+                add('pip install -r requirements', size, cached=cached)
+            names = [PACKAGE_NAME.split(p, 1)[0] for p in packages]
+            if names:
+                add(f"pip install {' '.join(names)}", sum(table.package_size('pip', n) for n in names), cached=cached)
+        elif tool == 'npm' and len(words) > 1 and words[1] in ('ci', 'install', 'i'):
+            add_node(tool, words[1], words[2:])
+        elif tool == 'yarn' and (len(words) == 1 or words[1] in ('install', 'add') or words[1].startswith('-')):
+            if len(words) > 1 and words[1] in ('install', 'add'):
+                add_node(tool, words[1], words[2:])
+            else:
+                add_node(tool, 'install', words[1:])
+        elif tool in ('mvn', 'mvnw', 'gradle', 'gradlew') and not mounted:
+            manager = 'maven' if tool.startswith('mvn') else 'gradle'
+            if not any(item.description.startswith(manager) for item in items):
+                add(f"{manager} dependency cache", table.packages.get(manager, {}).get('install', 0), 'cache')
+    return items
+
+
+def estimate_image_size(instructions: List[Instruction], table: SizeTable = None,
+                        dependencies: Optional[Iterable[str]] = None) -> SizeEstimate:
+    """
+    Estimate the size of every stage and of the final image.
+
+    Args:
+        instructions: Parsed instructions
+        table: Size table (defaults to the shared config/image_sizes.yaml)
+        dependencies: Python dependency names, used for `pip install -r`
+            instead of the flat requirements estimate
+
+    Returns:
+        SizeEstimate; the last stage is the final image
+    """
+    table = table or get_size_table()
+    if dependencies is not None:
+        dependencies = list(dependencies)
+    stages = build_stages(instructions)
+    if not stages:
+        return SizeEstimate([], None, table.version)
+
+    names: Dict[str, int] = {}  # stages processed so far, as build_stages resolves them
+    sizes: List[StageSize] = []
+    pip_no_cache = False
+    for instruction in instructions:
+        name = instruction.instruction
+        if name == 'FROM':
+            stage = stages[len(sizes)]
+            if stage.parent is not None:
+                parent = sizes[stage.parent]
+                sizes.append(StageSize(stage.index, stage.label, parent.label, parent.total_mb, parent.known_base))
+            else:
+                base_mb = table.base_size(stage.base)
+                sizes.append(StageSize(
+                    stage.index, stage.label, stage.base,
+                    base_mb if base_mb is not None else table.unknown_image, base_mb is not None
+                ))
+            if stage.name:
+                names[stage.name.lower()] = stage.index
+            pip_no_cache = False
+            continue
+        if not sizes:
+            continue
+        current = sizes[-1]
+        if name == 'ENV' and 'PIP_NO_CACHE_DIR' in instruction.arguments:
+            pip_no_cache = True
+        elif name == 'RUN':
+            current.items.extend(_run_items(instruction, table, pip_no_cache, dependencies))
+        elif name in ('COPY', 'ADD'):
+            source = COPY_FROM.search(instruction.arguments)
+            reference = source.group(1).lower() if source else None
+            index = names.get(reference) if reference else None
+            if index is None and reference and reference.isdigit() and int(reference) < current.index:
+                index = int(reference)
+            if index is not None and index < current.index:
+                current.items.append(SizeItem(
+                    instruction.line_number, f"COPY --from={sizes[index].label}", sizes[index].artifact_mb, 'files'
+                ))
+            elif not instruction.heredocs:
+                current.items.append(SizeItem(
+                    instruction.line_number, f"{name} {instruction.arguments}", table.context_copy, 'files'
+                ))
+    return SizeEstimate(sizes, len(sizes) - 1, table.version)
+
+
+def format_size_report(estimate: SizeEstimate) -> str:
+    """Format the size estimate for the CLI validation report."""
+    if estimate.final is None:
+        return ''
+    report = "\n--- IMAGE SIZE (estimate) ---\n"
+    for stage in estimate.stages:
+        base = stage.base if stage.known_base else f"{stage.base} (not in size table)"
+        marker = ' (final)' if stage.index == estimate.final else ''
+        report += (
+            f"  {stage.label}: {stage.base_mb:.0f} MB {base} + {stage.added_mb:.0f} MB "
+            f"= {stage.total_mb:.0f} MB{marker}\n"
+        )
+    largest = estimate.largest_items()
+    if largest:
+        report += "Largest additions: " + '; '.join(
+            f"line {item.line} {item.description} ~{item.size_mb:.0f} MB" for item in largest
+        ) + "\n"
+    return report
+
+
+class SizeBudgetRule(RuleVisitor):
+    """SIZE-001: estimated final image size within a budget."""
+    rule_id = 'SIZE-001'
+    severity = 'WARNING'
+    instructions = frozenset({'FROM', 'ENV', 'RUN', 'COPY', 'ADD'})  # all estimate_image_size reads
+
+    def __init__(self, budget_mb: float = 500):
+        self.budget_mb = budget_mb
+        self.collected: List[Instruction] = []
+
+    def visit(self, instruction: Instruction):
+        self.collected.append(instruction)
+
+    def result(self) -> RuleResult:
+        estimate = estimate_image_size(self.collected)
+        final_mb = estimate.final_mb
+        if final_mb <= self.budget_mb:
+            return RuleResult(
+                self.rule_id, True,
+                f'Estimated image size {final_mb:.0f} MB within {self.budget_mb:g} MB budget', self.severity
+            )
+        stage = estimate.stages[estimate.final]
+        # No line numbers: the result spans the whole file, so they would go stale after edits
+        hints = [f"Base {stage.base}: ~{stage.base_mb:.0f} MB"]
+        hints += [f"{i.description} ~{i.size_mb:.0f} MB" for i in estimate.largest_items()]
+        return RuleResult(
+            self.rule_id, False,
+            f'Estimated image size {final_mb:.0f} MB exceeds {self.budget_mb:g} MB budget',
+            self.severity, hint='\n'.join(hints)
+        )
@@ -0,0 +1,303 @@
+"""
+Incremental Validator Module
+Keeps parsed Dockerfiles per document and re-validates only what an edit touches.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from src.config_loader import load_config
+from src.rule_engine import CompiledRuleSet, RuleResult, ValidationResult, get_rule_set, run_visitors
+from src.syntax_validator import (
+    DockerfileTokenizer, Instruction, ParsedDockerfile, SyntaxResult, instruction_errors, validate_syntax
+)
+
+
+@dataclass
+class TextEdit:
+    """Replace lines start_line..end_line (1-based, inclusive) with new lines.
+
+    Use end_line = start_line - 1 to insert before start_line.
+    """
+    start_line: int
+    end_line: int
+    lines: List[str]
+
+
+class UnknownDocumentError(KeyError):
+    """Raised when an edit targets a document without a session."""
+
+
+@dataclass(frozen=True)
+class DocumentResults:
+    """Validation results of a document as of one edit."""
+    syntax: SyntaxResult
+    validation: ValidationResult
+
+
+class _RuleUnit:
+    """One visitor factory with its instruction dependencies, cached results and analysis memo."""
+
+    __slots__ = ('factory', 'instructions', 'results', 'cache')
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.instructions = frozenset(factory().instructions)
+        self.results: List[RuleResult] = []
+        self.cache = {}  # RuleVisitor.cache: per-instruction facts by instruction text
+
+
+class DocumentSession:
+    """Parsed state of one document being edited."""
+
+    def __init__(self, content: str, rule_set: CompiledRuleSet):
+        self.lock = threading.Lock()
+        self.last_access = time.monotonic()
+        self.reset(content, rule_set)
+
+    def reset(self, content: str, rule_set: CompiledRuleSet):
+        """Re-parse and fully re-validate the whole document."""
+        self.rule_set = rule_set
+        self.lines = content.split('\n')
+        tokenizer = DockerfileTokenizer()
+        self.instructions = tokenizer.feed_lines(self.lines)
+        closed = tokenizer.close()
+        if closed is not None:
+            self.instructions.append(closed)
+        self.directives = tokenizer.directives
+        self.escape = tokenizer.escape
+        # Instruction errors are rebuilt from the instructions after each edit
+        self.directive_errors = tokenizer.directive_errors
+        self.units = [_RuleUnit(factory) for factory in rule_set.visitor_factories()]
+        self.syntax_result: Optional[SyntaxResult] = None
+        self.validation_result: Optional[ValidationResult] = None
+        self._evaluate(self.units)
+
+    @property
+    def content(self) -> str:
+        return '\n'.join(self.lines)
+
+    def parsed(self) -> ParsedDockerfile:
+        """Current instructions as a ParsedDockerfile."""
+        errors = self.directive_errors + [e for x in self.instructions for e in instruction_errors(x)]
+        return ParsedDockerfile(self.instructions, not errors, errors, self.directives)
+
+    def results(self) -> DocumentResults:
+        """Current results (call with `lock` held while edits may run)."""
+        return DocumentResults(self.syntax_result, self.validation_result)
+
+    def _evaluate(self, units: List[_RuleUnit]):
+        """Re-run the given rule units and rebuild the combined results."""
+        parsed = self.parsed()
+        if units:
+            visitors = [unit.factory() for unit in units]
+            for unit, visitor in zip(units, visitors):
+                if len(unit.cache) > 2 * len(self.instructions) + 256:
+                    unit.cache.clear()  # drop facts of text edited away
+                visitor.instructions = unit.instructions
+                visitor.cache = unit.cache
+            run_visitors(parsed, visitors)
+            for unit, visitor in zip(units, visitors):
+                unit.results = visitor.results()
+        self.syntax_result = validate_syntax(self.content, parsed)
+        self.validation_result = self.rule_set.collect(
+            [result for unit in self.units for result in unit.results]
+        )
+
+    def _affected_range(self, start: int, end: int) -> Tuple[int, int]:
+        """Indexes [first, last) of old instructions touching old lines start..end."""
+        low, high = min(start, end), max(start, end)
+        first = len(self.instructions)
+        last = 0
+        for index, instruction in enumerate(self.instructions):
+            if instruction.end_line < low:
+                continue
+            if instruction.line_number > high:
+                break
+            first = min(first, index)
+            last = index + 1
+        if first >= last:
+            # Edit only touched blank or comment lines between instructions
+            first = last = next(
+                (i for i, x in enumerate(self.instructions) if x.line_number > high),
+                len(self.instructions)
+            )
+        return first, last
+
+    def _open_at_end(self, instruction: Instruction) -> bool:
+        """Whether an instruction was cut off by the end of the document."""
+        if any(not heredoc.terminated for heredoc in instruction.heredocs):
+            return True
+        return not instruction.heredocs and self.lines[instruction.end_line - 1].strip().endswith(self.escape)
+
+    def _dangling_start(self, line_number: int, floor: int) -> int:
+        """Start of continuation lines without an instruction just before line_number."""
+        start = line_number
+        for index in range(line_number - 2, floor - 1, -1):
+            text = self.lines[index].strip()
+            if not text or text.startswith('#'):
+                continue
+            if not text.endswith(self.escape):
+                break
+            start = index + 1
+        return start
+
+    def apply(self, edit: TextEdit):
+        """Apply one edit, re-parsing only the affected instruction span."""
+        start = max(1, edit.start_line)
+        end = min(max(edit.end_line, start - 1), len(self.lines))
+        delta = len(edit.lines) - (end - start + 1)
+
+        header_end = self.instructions[0].line_number if self.instructions else len(self.lines) + 1
+        if start <= header_end:
+            # Parser directives may have changed: re-parse everything
+            self.lines[start - 1:end] = edit.lines
+            self.reset(self.content, self.rule_set)
+            return
+
+        first, last = self._affected_range(start, end)
+        old = self.instructions
+        if first and self._open_at_end(old[first - 1]):
+            first -= 1
+        region_start = min([start] + [x.line_number for x in old[first:last]])
+        region_start = self._dangling_start(region_start, old[first - 1].end_line if first else 0)
+        region_end = max([end] + [x.end_line for x in old[first:last]])
+
+        self.lines[start - 1:end] = edit.lines
+
+        # An open continuation or heredoc pulls following instructions into the span
+        while True:
+            new_end = min(region_end + delta, len(self.lines))
+            tokenizer = DockerfileTokenizer(self.escape, directives=False)
+            reparsed = tokenizer.feed_lines(self.lines[region_start - 1:new_end])
+            if not tokenizer.pending or new_end >= len(self.lines):
+                closed = tokenizer.close()
+                if closed is not None:
+                    reparsed.append(closed)
+                break
+            if last < len(old):
+                region_end = max(region_end + 1, old[last].end_line)
+                last += 1
+            else:
+                region_end = len(self.lines) - delta
+
+        offset = region_start - 1
+        reparsed = [x.shifted(offset) for x in reparsed]
+        tail = old[last:]
+        if delta:
+            tail = [x.shifted(delta) for x in tail]
+        self.instructions = old[:first] + reparsed + tail
+
+        changed = {x.instruction for x in old[first:last]} | {x.instruction for x in reparsed}
+        stale = []
+        for unit in self.units:
+            if unit.instructions & changed:
+                stale.append(unit)
+            elif delta and any(not r.passed or r.line is not None or r.hint for r in unit.results):
+                # Findings cite line numbers (in `line`, the message or the hint) that may have moved
+                stale.append(unit)
+        self._evaluate(stale)
+
+
+class IncrementalValidator:
+    """Bounded store of document sessions with idle eviction."""
+
+    def __init__(self, max_sessions: int = 256, idle_ttl: float = 600.0):
+        """
+        Initialize incremental validator.
+
+        Args:
+            max_sessions: Maximum documents kept; least recently used are evicted
+            idle_ttl: Seconds after which an untouched document is evicted
+        """
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self._sessions: 'OrderedDict[str, DocumentSession]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _evict(self):
+        now = time.monotonic()
+        while self._sessions:
+            document_id, session = next(iter(self._sessions.items()))
+            if len(self._sessions) > self.max_sessions or now - session.last_access > self.idle_ttl:
+                del self._sessions[document_id]
+            else:
+                break
+
+    def open(self, document_id: str, content: str) -> DocumentResults:
+        """
+        Start (or restart) a document session with full content.
+
+        Args:
+            document_id: Client-chosen document id
+            content: Full Dockerfile content
+
+        Returns:
+            DocumentResults of the full validation
+        """
+        session = DocumentSession(content, get_rule_set())
+        results = session.results()  # not yet shared, so no lock needed
+        with self._lock:
+            self._sessions[document_id] = session
+            self._sessions.move_to_end(document_id)
+            self._evict()
+        return results
+
+    def update(self, document_id: str, edits: List[TextEdit]) -> DocumentResults:
+        """
+        Apply edits to an open document and re-validate incrementally.
+
+        Args:
+            document_id: Document id passed to open()
+            edits: Edits applied in order
+
+        Returns:
+            DocumentResults after these edits (read under the session lock,
+            so a concurrent update cannot mix in its results)
+
+        Raises:
+            UnknownDocumentError: If the document has no session (send full content)
+        """
+        with self._lock:
+            self._evict()
+            session = self._sessions.get(document_id)
+            if session is None:
+                raise UnknownDocumentError(document_id)
+            self._sessions.move_to_end(document_id)
+            session.last_access = time.monotonic()
+
+        rule_set = get_rule_set()
+        with session.lock:
+            for edit in edits:
+                session.apply(edit)
+            if rule_set is not session.rule_set:
+                # Rules changed on disk: fall back to a full validation
+                session.reset(session.content, rule_set)
+            return session.results()
+
+    def close(self, document_id: str):
+        """Drop a document session."""
+        with self._lock:
+            self._sessions.pop(document_id, None)
+
+
+# Global incremental validator
+_incremental_validator = None
+
+
+def get_incremental_validator() -> IncrementalValidator:
+    """Get global incremental validator."""
+    global _incremental_validator
+    if _incremental_validator is None:
+        settings = load_config().get('incremental', {})
+        _incremental_validator = IncrementalValidator(
+            max_sessions=settings.get('max_sessions', 256),
+            idle_ttl=settings.get('idle_ttl', 600)
+        )
+    return _incremental_validator
@@ -3,9 +3,11 @@ Input Processor Module
 Handles parsing and normalization of user input for Dockerfile generation.
 """
 
+import json
 import os
+import re
 from dataclasses import dataclass
-from typing import Dict, List, Optional
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 
 
 @dataclass
@@ -49,6 +51,47 @@ def read_readme(path: str) -> str:
         return f.read()
 
 
+# Directories read_directory never descends into
+IGNORED_DIRS = {'node_modules', '__pycache__', 'venv', 'env'}
+
+
+def scan_directory(
+    path: str,
+    skip: Callable[[str, os.DirEntry], bool] = None
+) -> Iterator[Tuple[str, os.DirEntry]]:
+    """
+    Walk a directory tree top-down in os.walk order with one scandir per directory.
+    
+    Args:
+        path: Root directory
+        skip: Called with (relative path, entry) for every file and
+            directory; returning True skips it (and everything below a directory)
+        
+    Yields:
+        (path relative to root, DirEntry) for every file that is not skipped
+    """
+    pending = [('', path)]
+    while pending:
+        relative_dir, directory = pending.pop()
+        subdirs = []
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            continue
+        for entry in entries:
+            relative = os.path.join(relative_dir, entry.name) if relative_dir else entry.name
+            if skip is not None and skip(relative, entry):
+                continue
+            if entry.is_dir():
+                # Like os.walk, symlinked directories are listed but not followed
+                if not entry.is_symlink():
+                    subdirs.append((relative, entry.path))
+            else:
+                yield relative, entry
+        # Reversed onto the stack so directories are visited in listing order
+        pending.extend(reversed(subdirs))
+
+
 def read_directory(path: str) -> Dict[str, List[str]]:
     """
     Read directory structure and identify key files.
@@ -79,28 +122,71 @@ def read_directory(path: str) -> Dict[str, List[str]]:
         'pom.xml', 'build.gradle', 'build.gradle.kts'     # Java
     ]
     
-    for root, dirs, files in os.walk(path):
-        # Skip hidden directories and common ignore patterns
-        dirs[:] = [d for d in dirs if not d.startswith('.') and d not in ['node_modules', '__pycache__', 'venv', 'env']]
+    def skip(relative_path, entry):
+        # Skip hidden files and directories and common ignore patterns
+        return entry.name.startswith('.') or (entry.name in IGNORED_DIRS and entry.is_dir())
+    
+    for relative_path, entry in scan_directory(path, skip):
+        file = entry.name
+        result['all_files'].append(relative_path)
         
-        for file in files:
-            if file.startswith('.'):
-                continue
-                
-            file_path = os.path.join(root, file)
-            relative_path = os.path.relpath(file_path, path)
-            result['all_files'].append(relative_path)
-            
-            if file in dependency_patterns:
-                result['dependency_files'].append(relative_path)
-            elif file.endswith(('.py', '.js', '.java', '.go')):
-                result['source_files'].append(relative_path)
-            elif file.endswith(('.yml', '.yaml', '.json', '.toml', '.ini')):
-                result['config_files'].append(relative_path)
+        if file in dependency_patterns:
+            result['dependency_files'].append(relative_path)
+        elif file.endswith(('.py', '.js', '.java', '.go')):
+            result['source_files'].append(relative_path)
+        elif file.endswith(('.yml', '.yaml', '.json', '.toml', '.ini')):
+            result['config_files'].append(relative_path)
     
     return result
 
 
+def read_dependencies(path: str, dependency_files: List[str]) -> Dict[str, str]:
+    """
+    Read declared dependency names from dependency manifests.
+    
+    Args:
+        path: Project root directory
+        dependency_files: Dependency file paths relative to project root
+        
+    Returns:
+        Dictionary mapping dependency name to version spec ('' if unpinned)
+    """
+    dependencies = {}
+    
+    for relative_path in dependency_files:
+        file_path = os.path.join(path, relative_path)
+        name = os.path.basename(relative_path)
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                content = f.read()
+        except (OSError, UnicodeDecodeError):
+            continue
+        
+        if name == 'requirements.txt':
+            for line in content.splitlines():
+                line = line.split('#', 1)[0].strip()
+                if not line or line.startswith('-'):
+                    continue
+                match = re.match(r'([A-Za-z0-9][A-Za-z0-9._-]*)\s*(.*)', line)
+                if match:
+                    dependencies.setdefault(match.group(1), match.group(2).strip())
+        
+        elif name == 'package.json':
+            try:
+                data = json.loads(content)
+            except ValueError:
+                continue
+            for section in ('dependencies', 'devDependencies'):
+                for dep, version in (data.get(section) or {}).items():
+                    dependencies.setdefault(dep, str(version))
+        
+        elif name == 'pom.xml':
+            for artifact in re.findall(r'<artifactId>([^<]+)</artifactId>', content)[1:]:
+                dependencies.setdefault(artifact.strip(), '')
+    
+    return dependencies
+
+
 def extract_text_input(text: str) -> Dict[str, str]:
     """
     Extract information from text input.
@@ -151,7 +237,7 @@ def normalize_input(raw_input, source_type: str = 'text') -> ProcessedInput:
         return ProcessedInput(
             description=description,
             files=dir_info['all_files'],
-            dependencies={},  # Will be populated by stack detector
+            dependencies=read_dependencies(raw_input, dir_info['dependency_files']),
             source_type='directory',
             raw_content=None
         )
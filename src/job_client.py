@@ -0,0 +1,93 @@
+"""
+Job Client Module
+Submit generation jobs to a running server and follow their progress.
+"""
+
+import json
+import time
+from typing import Any, Dict, Iterator, Tuple
+
+import requests
+
+
+class JobClientError(Exception):
+    """Raised when the server rejects a job request."""
+
+
+def _check(response: requests.Response) -> Dict[str, Any]:
+    try:
+        data = response.json()
+    except ValueError:
+        data = {}
+    if response.status_code >= 400:
+        message = data.get('error', response.reason)
+        if response.status_code == 429:
+            message += f" (retry after {response.headers.get('Retry-After', '?')}s)"
+        raise JobClientError(message)
+    return data
+
+
+def submit_job(server: str, request: Dict[str, Any], timeout: float = 10) -> Dict[str, Any]:
+    """
+    Submit a generation job.
+
+    Args:
+        server: Server base URL
+        request: Job request ({prompt, token_budget?, optimize?})
+        timeout: HTTP timeout in seconds
+
+    Returns:
+        Job status (job_id, status, deduplicated, ...)
+
+    Raises:
+        JobClientError: If the server rejects the job
+    """
+    return _check(requests.post(f"{server.rstrip('/')}/api/jobs", json=request, timeout=timeout))
+
+
+def get_job(server: str, job_id: str, timeout: float = 10) -> Dict[str, Any]:
+    """Current status of a job (with its result once done)."""
+    return _check(requests.get(f"{server.rstrip('/')}/api/jobs/{job_id}", timeout=timeout))
+
+
+def job_events(server: str, job_id: str, timeout: float = 60) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Follow a job's server-sent events until it finishes.
+
+    The server ends each stream after a while (with a `retry:` hint) and
+    answers 429 when too many streams are open; both reconnect after the
+    advertised delay.
+
+    Args:
+        server: Server base URL
+        job_id: Job id
+        timeout: Longest silence from the server in seconds
+
+    Yields:
+        (event, data) pairs; the last event is 'done' or 'failed'
+    """
+    url = f"{server.rstrip('/')}/api/jobs/{job_id}/events"
+    while True:
+        delay = 1.0
+        with requests.get(url, stream=True, timeout=timeout) as response:
+            if response.status_code == 429:
+                delay = float(response.headers.get('Retry-After', delay))
+            elif response.status_code >= 400:
+                _check(response)
+            else:
+                event, data = 'message', []
+                for line in response.iter_lines(decode_unicode=True):
+                    if line is None or line.startswith(':'):
+                        continue
+                    if line.startswith('retry:'):
+                        delay = int(line[6:].strip() or 1000) / 1000
+                    elif line.startswith('event:'):
+                        event = line[6:].strip()
+                    elif line.startswith('data:'):
+                        data.append(line[5:].strip())
+                    elif not line and data:
+                        yield event, json.loads('\n'.join(data))
+                        if event in ('done', 'failed'):
+                            return
+                        event, data = 'message', []
+        time.sleep(delay)
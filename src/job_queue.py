@@ -0,0 +1,457 @@
+"""
+Job Queue Module
+SQLite-backed queue for asynchronous generation jobs.
+"""
+
+import hashlib
+import json
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from src.config_loader import load_config
+
+logger = logging.getLogger(__name__)
+
+
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+FINISHED = (DONE, FAILED)
+
+# Longest wait between retries after a database error
+MAX_BACKOFF = 30.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    key TEXT NOT NULL,
+    status TEXT NOT NULL,
+    stage TEXT,
+    request TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_until REAL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at);
+CREATE INDEX IF NOT EXISTS jobs_key ON jobs (key, status);
+"""
+
+# (request, progress callback) -> JSON-serializable result
+JobHandler = Callable[[Dict[str, Any], Callable[[str], None]], Dict[str, Any]]
+
+
+class QueueFullError(Exception):
+    """Raised when too many jobs are pending."""
+
+    def __init__(self, pending: int, estimated_wait: float = 0.0):
+        self.pending = pending
+        self.estimated_wait = estimated_wait
+        self.retry_after = max(1, math.ceil(estimated_wait))
+        super().__init__(f"{pending} jobs pending")
+
+
+@dataclass
+class Job:
+    """One generation job."""
+    id: str
+    key: str
+    status: str
+    stage: Optional[str]
+    request: Dict[str, Any]
+    result: Optional[Dict[str, Any]]
+    error: Optional[str]
+    attempts: int
+    created_at: float
+    started_at: Optional[float]
+    finished_at: Optional[float]
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED
+
+    def to_dict(self, include_result: bool = True) -> Dict[str, Any]:
+        """Serialize for API responses."""
+        data = {
+            'job_id': self.id,
+            'status': self.status,
+            'stage': self.stage,
+            'attempts': self.attempts,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at
+        }
+        if self.error:
+            data['error'] = self.error
+        if include_result and self.result is not None:
+            data['result'] = self.result
+        return data
+
+
+def job_key(request: Dict[str, Any]) -> str:
+    """Deduplication key: hash of the canonical JSON request."""
+    canonical = json.dumps(request, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def _row_to_job(row: sqlite3.Row) -> Job:
+    return Job(
+        id=row['id'],
+        key=row['key'],
+        status=row['status'],
+        stage=row['stage'],
+        request=json.loads(row['request']),
+        result=json.loads(row['result']) if row['result'] else None,
+        error=row['error'],
+        attempts=row['attempts'],
+        created_at=row['created_at'],
+        started_at=row['started_at'],
+        finished_at=row['finished_at']
+    )
+
+
+class JobStore:
+    """
+    Persistent job table shared by all worker processes.
+
+    Each operation uses its own connection (WAL mode), so the store is safe
+    across threads and processes. Running jobs hold a lease; a job whose
+    worker died is picked up again once the lease expires.
+    """
+
+    def __init__(self, db_file: str = 'logs/jobs.db', lease_seconds: float = 900,
+                 max_attempts: int = 3):
+        """
+        Initialize the store.
+
+        Args:
+            db_file: SQLite database path
+            lease_seconds: How long a claimed job stays with its worker
+            max_attempts: Claims before an abandoned job is failed
+        """
+        self.db_file = db_file
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        os.makedirs(os.path.dirname(db_file) or '.', exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.db_file, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Write transaction (taken up front so concurrent claims serialize)."""
+        with self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield conn
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            conn.execute('COMMIT')
+
+    def submit(self, request: Dict[str, Any], max_pending: int = 0) -> Tuple[Job, bool]:
+        """
+        Queue a job unless an identical one is pending or running.
+
+        Args:
+            request: Generation request
+            max_pending: Reject when this many jobs are pending (0 = no limit)
+
+        Returns:
+            Tuple of (job, created); created is False for a duplicate
+
+        Raises:
+            QueueFullError: If max_pending jobs are already waiting
+        """
+        key = job_key(request)
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE key = ? AND status IN (?, ?) ORDER BY created_at LIMIT 1",
+                (key, PENDING, RUNNING)
+            ).fetchone()
+            if row is not None:
+                return _row_to_job(row), False
+            if max_pending:
+                pending = conn.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (PENDING,)).fetchone()[0]
+                if pending >= max_pending:
+                    raise QueueFullError(pending)
+            job_id = uuid.uuid4().hex
+            conn.execute(
+                "INSERT INTO jobs (id, key, status, request, created_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, key, PENDING, json.dumps(request), time.time())
+            )
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _row_to_job(row), True
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Job by id, or None."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _row_to_job(row) if row else None
+
+    def claim(self, worker: str) -> Optional[Job]:
+        """
+        Take the oldest pending job (or one whose lease expired).
+
+        Args:
+            worker: Worker identifier stored with the job
+
+        Returns:
+            Claimed job, or None if nothing is runnable
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE status = ? "
+                "OR (status = ? AND lease_until < ? AND attempts < ?) "
+                "ORDER BY created_at LIMIT 1",
+                (PENDING, RUNNING, now, self.max_attempts)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = ?, worker = ?, lease_until = ?, started_at = ?, "
+                "attempts = attempts + 1, stage = NULL WHERE id = ?",
+                (RUNNING, worker, now + self.lease_seconds, now, row['id'])
+            )
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (row['id'],)).fetchone()
+        return _row_to_job(row)
+
+    def progress(self, job_id: str, worker: str, stage: str):
+        """Record the current stage and renew the lease."""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET stage = ?, lease_until = ? WHERE id = ? AND worker = ? AND status = ?",
+                (stage, time.time() + self.lease_seconds, job_id, worker, RUNNING)
+            )
+
+    def finish(self, job_id: str, worker: str, result: Dict[str, Any] = None, error: str = None):
+        """Store the result (or error) of a running job."""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, lease_until = NULL "
+                "WHERE id = ? AND worker = ? AND status = ?",
+                (FAILED if error else DONE, json.dumps(result) if result is not None else None,
+                 error, time.time(), job_id, worker, RUNNING)
+            )
+
+    def cleanup(self, ttl: float) -> int:
+        """
+        Fail abandoned jobs and delete finished jobs older than ttl.
+
+        Args:
+            ttl: Seconds finished jobs are kept
+
+        Returns:
+            Number of jobs deleted
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ? "
+                "WHERE status = ? AND lease_until < ? AND attempts >= ?",
+                (FAILED, 'Worker lost', now, RUNNING, now, self.max_attempts)
+            )
+            deleted = conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?",
+                (DONE, FAILED, now - ttl)
+            ).rowcount
+        return deleted
+
+    def average_duration(self) -> float:
+        """Mean run time of the finished jobs still in the store (0 if none)."""
+        with self._connect() as conn:
+            value = conn.execute(
+                "SELECT AVG(finished_at - started_at) FROM jobs WHERE status = ?", (DONE,)
+            ).fetchone()[0]
+        return value or 0.0
+
+    def stats(self) -> Dict[str, int]:
+        """Job counts per status."""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts = {status: 0 for status in (PENDING, RUNNING, DONE, FAILED)}
+        counts.update({status: count for status, count in rows})
+        return counts
+
+
+class JobQueue:
+    """
+    Worker threads draining a JobStore.
+
+    Every process serving the API runs its own pool; the store coordinates
+    them. Workers start lazily (after any fork) on the first call to
+    ensure_started.
+    """
+
+    def __init__(self, store: JobStore, handler: JobHandler = None, workers: int = 1,
+                 poll_interval: float = 1.0, ttl: float = 3600, max_pending: int = 100):
+        """
+        Initialize the queue.
+
+        Args:
+            store: Job store
+            handler: Runs a job request, reporting stages through its callback
+            workers: Worker threads in this process
+            poll_interval: Seconds between polls for jobs from other processes
+            ttl: Seconds finished jobs are kept
+            max_pending: Pending jobs accepted before submit is refused
+        """
+        self.store = store
+        self.handler = handler
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.ttl = ttl
+        self.max_pending = max_pending
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._pid = None
+        self._lock = threading.Lock()
+        self._last_cleanup = 0.0
+
+    def ensure_started(self):
+        """Start the worker threads in this process if not running yet."""
+        if self._pid == os.getpid() or self.handler is None:
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._stop.clear()
+            self._threads = [
+                threading.Thread(target=self._run, args=(f"{os.getpid()}-{i}",),
+                                 name=f"job-worker-{i}", daemon=True)
+                for i in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+            self._pid = os.getpid()
+
+    def stop(self, timeout: float = None):
+        """Stop the workers after their current job."""
+        self._stop.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._pid = None
+
+    def submit(self, request: Dict[str, Any]) -> Tuple[Job, bool]:
+        """
+        Queue a job and wake a local worker.
+
+        Returns:
+            Tuple of (job, created) as in JobStore.submit
+
+        Raises:
+            QueueFullError: If too many jobs are pending
+        """
+        try:
+            job, created = self.store.submit(request, self.max_pending)
+        except QueueFullError as e:
+            estimate = e.pending * self.store.average_duration() / max(1, self.workers)
+            raise QueueFullError(e.pending, estimate) from None
+        if created:
+            self._wakeup.set()
+        return job, created
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Job by id, or None."""
+        return self.store.get(job_id)
+
+    def _run(self, worker: str):
+        failures = 0
+        while not self._stop.is_set():
+            try:
+                self._maybe_cleanup()
+                job = self.store.claim(worker)
+                if job is not None:
+                    self._execute(job, worker)
+            except sqlite3.Error as e:
+                # Locked or briefly unavailable database: back off and retry. A job
+                # whose result could not be stored is claimed again once its lease expires.
+                failures += 1
+                delay = min(self.poll_interval * 2 ** min(failures, 6), MAX_BACKOFF)
+                logger.warning("Job worker %s: %s (retrying in %.1fs)", worker, e, delay)
+                self._stop.wait(delay)
+                continue
+            failures = 0
+            if job is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+
+    def _execute(self, job: Job, worker: str):
+        def progress(stage: str):
+            self.store.progress(job.id, worker, stage)
+
+        try:
+            result = self.handler(job.request, progress)
+        except Exception as e:
+            self.store.finish(job.id, worker, error=str(e) or type(e).__name__)
+        else:
+            self.store.finish(job.id, worker, result=result)
+
+    def _maybe_cleanup(self):
+        now = time.monotonic()
+        if now - self._last_cleanup < max(self.poll_interval, 60):
+            return
+        self._last_cleanup = now
+        try:
+            self.store.cleanup(self.ttl)
+        except sqlite3.Error:
+            pass  # another process holds the write lock; try next round
+
+
+# Global job queue
+_job_queue: Optional[JobQueue] = None
+
+
+def get_job_queue(handler: JobHandler = None) -> JobQueue:
+    """
+    Get global job queue.
+
+    Args:
+        handler: Job handler, set on the first call that provides one
+
+    Returns:
+        JobQueue configured from the `jobs` config section
+    """
+    global _job_queue
+    if _job_queue is None:
+        settings = load_config().get('jobs', {})
+        store = JobStore(
+            db_file=settings.get('store', 'logs/jobs.db'),
+            lease_seconds=settings.get('lease_seconds', 900),
+            max_attempts=settings.get('max_attempts', 3)
+        )
+        _job_queue = JobQueue(
+            store,
+            workers=settings.get('workers', 1),
+            poll_interval=settings.get('poll_interval', 1.0),
+            ttl=settings.get('ttl', 3600),
+            max_pending=settings.get('max_pending', 100)
+        )
+    if handler is not None and _job_queue.handler is None:
+        _job_queue.handler = handler
+    return _job_queue
@@ -4,14 +4,18 @@ Command-line interface for Dockerfile generation.
 """
 
 import click
+import os
 import sys
 from src.input_processor import normalize_input
-from src.stack_detector import detect_stack
-from src.prompt_builder import build_prompt
-from src.ollama_client import OllamaClient
+from src.config_loader import load_config
 from src.rule_engine import validate_dockerfile
-from src.syntax_validator import validate_syntax
+from src.syntax_validator import parse_dockerfile, validate_syntax
 from src.output_formatter import format_dockerfile, format_validation_report
+from src.dockerfile_optimizer import format_optimization_report, optimize_dockerfile
+from src.image_size import estimate_image_size
+from src.stage_graph import analyze_stages
+from src.tracing import get_trace_log, span, start_trace
+from src.generation import run_generation
 
 
 @click.group()
@@ -24,59 +28,87 @@ def cli():
 @click.option('--input', '-i', help='Input directory or README path')
 @click.option('--text', '-t', help='Text description')
 @click.option('--output', '-o', default='Dockerfile', help='Output file path')
-def generate(input, text, output):
+@click.option('--token-budget', type=click.IntRange(min=1), default=None, help='Prompt token budget (default from config)')
+@click.option('--optimize/--no-optimize', default=None, help='Run the optimizer on the result (default from config)')
+@click.option('--timings', is_flag=True, help='Print how long each pipeline stage took')
+def generate(input, text, output, token_budget, optimize, timings):
     """Generate Dockerfile from input."""
+    config = load_config()
+    trace_log = get_trace_log()
+    if not (timings or trace_log):
+        _generate(config, input, text, output, token_budget, optimize)
+        return
+    
+    with start_trace('generate') as trace:
+        try:
+            _generate(config, input, text, output, token_budget, optimize)
+        finally:
+            trace.finish()
+            if timings:
+                click.echo(trace.format_table(), err=True)
+            if trace_log:
+                trace_log.write(trace)
+
+
+def _echo_stage(stage, context, call):
+    """Pipeline hook printing CLI progress around each stage."""
+    if stage.name == 'generate':
+        click.echo("⏳ Generating Dockerfile...")
+    result = call()
+    if stage.name == 'normalize_input':
+        click.echo("✓ Input processed")
+    elif stage.name == 'detect_stack':
+        click.echo(f"✓ Stack detected: {result.name}")
+    elif stage.name == 'build_prompt':
+        click.echo(f"✓ Prompt built ({result.prompt_tokens}/{result.token_budget} tokens)")
+    elif stage.name == 'generate':
+        click.echo("✓ Dockerfile generated")
+    elif stage.name == 'optimize' and result is not None and result.changes:
+        if result.safe:
+            click.echo(f"✓ Optimized: {len(result.changes)} changes")
+        else:
+            click.echo("⚠ Optimization skipped: rewrite did not re-validate", err=True)
+    elif stage.name == 'validate':
+        if not result.syntax_result.valid:
+            click.echo("Warning: Syntax issues detected", err=True)
+            for error in result.syntax_result.errors:
+                click.echo(f"  - {error}", err=True)
+        click.echo(f"✓ Validation: {result.validation_result.summary}")
+    return result
+
+
+def _generate(config, input, text, output, token_budget, optimize):
     try:
-        # Step 1: Process input
         if text:
-            input_data = normalize_input(text, source_type='text')
+            source, source_type = text, 'text'
         elif input:
-            input_data = normalize_input(input, source_type='directory')
+            source, source_type = input, 'directory'
         else:
             click.echo("Error: Provide --input or --text", err=True)
             sys.exit(1)
         
-        click.echo("✓ Input processed")
-        
-        # Step 2: Detect stack
-        stack_info = detect_stack(input_data)
-        click.echo(f"✓ Stack detected: {stack_info.name}")
-        
-        # Step 3: Build prompt
-        prompt = build_prompt(stack_info, input_data)
-        click.echo("✓ Prompt built")
-        
-        # Step 4: Generate with Ollama
-        click.echo("⏳ Generating Dockerfile...")
-        client = OllamaClient()
-        
-        if not client.health_check():
-            click.echo("Error: Ollama not available", err=True)
-            sys.exit(1)
-        
-        dockerfile_content = client.generate(prompt)
-        click.echo("✓ Dockerfile generated")
-        
-        # Step 5: Validate
-        syntax_result = validate_syntax(dockerfile_content)
-        if not syntax_result.valid:
-            click.echo("Warning: Syntax issues detected", err=True)
-            for error in syntax_result.errors:
-                click.echo(f"  - {error}", err=True)
-        
-        validation_result = validate_dockerfile(dockerfile_content)
-        click.echo(f"✓ Validation: {validation_result.summary}")
-        
-        # Step 6: Format and save
-        formatted = format_dockerfile(dockerfile_content, validation_result)
+        # Input scan, model health check and template loading run concurrently
+        result = run_generation(
+            source, source_type, token_budget, optimize,
+            hooks=[_echo_stage], config=config
+        )
+        validation_result = result.validation.validation_result
         
-        with open(output, 'w') as f:
-            f.write(formatted)
+        # Format and save
+        with span('format'):
+            formatted = format_dockerfile(result.dockerfile, validation_result)
+            
+            with open(output, 'w') as f:
+                f.write(formatted)
         
         click.echo(f"✓ Dockerfile saved to: {output}")
         
         # Show validation report
-        click.echo(format_validation_report(validation_result))
+        click.echo(format_validation_report(
+            validation_result,
+            result.validation.stage_graph,
+            result.image_size
+        ))
         
         if not validation_result.passed:
             click.echo("\n⚠ Warning: Some security checks failed", err=True)
@@ -97,6 +129,7 @@ def compose(input, output):
         from src.service_detector import detect_services
         from src.dependency_analyzer import analyze_dependencies
         from src.compose_builder import build_compose
+        from src.compose_validator import validate_compose
         
         # Process input
         input_data = normalize_input(input, source_type='directory')
@@ -112,12 +145,18 @@ def compose(input, output):
         
         # Build compose
         compose_dict = build_compose(services, dependencies)
+        compose_content = yaml.dump(compose_dict, default_flow_style=False, sort_keys=False)
+        
+        # Validate
+        validation_result = validate_compose(compose_content)
+        click.echo(f"✓ Validation: {validation_result.summary}")
         
         # Save to file
         with open(output, 'w') as f:
-            yaml.dump(compose_dict, f, default_flow_style=False, sort_keys=False)
+            f.write(compose_content)
         
         click.echo(f"✓ Compose file saved to: {output}")
+        click.echo(format_validation_report(validation_result))
         
     except Exception as e:
         click.echo(f"Error: {str(e)}", err=True)
@@ -133,15 +172,18 @@ def validate(file):
             content = f.read()
         
         # Syntax validation
-        syntax_result = validate_syntax(content)
+        parsed = parse_dockerfile(content)
+        syntax_result = validate_syntax(content, parsed)
         if not syntax_result.valid:
             click.echo("Syntax Errors:")
             for error in syntax_result.errors:
                 click.echo(f"  ✗ {error}")
         
         # Security validation
-        validation_result = validate_dockerfile(content)
-        click.echo(format_validation_report(validation_result))
+        validation_result = validate_dockerfile(content, parsed=parsed)
+        click.echo(format_validation_report(
+            validation_result, analyze_stages(parsed.instructions), estimate_image_size(parsed.instructions)
+        ))
         
         if validation_result.passed:
             click.echo("\n✓ All security checks passed")
@@ -157,6 +199,284 @@ def validate(file):
         sys.exit(1)
 
 
+@cli.command()
+@click.option('--file', '-f', required=True, help='Dockerfile path')
+@click.option('--output', '-o', default=None, help='Write the result here (default: print the diff only)')
+@click.option('--in-place', is_flag=True, help='Overwrite the input Dockerfile')
+@click.option('--stack', default=None, help='Only apply rules for this stack (python, nodejs, java)')
+@click.option('--cache-mounts/--no-cache-mounts', default=None,
+              help='Prefer BuildKit cache mounts over no-cache options (default from config)')
+def optimize(file, output, in_place, stack, cache_mounts):
+    """Optimize an existing Dockerfile for layer caching and size."""
+    try:
+        with open(file, 'r') as f:
+            content = f.read()
+        
+        if cache_mounts is None:
+            cache_mounts = load_config().get('optimizer', {}).get('cache_mounts', False)
+        result = optimize_dockerfile(content, stack, cache_mounts)
+        
+        if result.changes:
+            click.echo(result.diff(file), nl=False)
+        click.echo(format_optimization_report(result))
+        
+        target = file if in_place else output
+        if target and result.changes:
+            if not result.safe:
+                click.echo("✗ Not written: the optimized Dockerfile fails checks the original passed", err=True)
+                sys.exit(1)
+            with open(target, 'w') as f:
+                f.write(result.optimized)
+            click.echo(f"✓ Optimized Dockerfile saved to: {target}")
+        
+    except FileNotFoundError:
+        click.echo(f"Error: File not found: {file}", err=True)
+        sys.exit(1)
+    except Exception as e:
+        click.echo(f"Error: {str(e)}", err=True)
+        sys.exit(1)
+
+
+@cli.command()
+@click.option('--input', '-i', 'input', required=True, type=click.Path(exists=True, file_okay=False), help='Build context directory')
+@click.option('--file', '-f', default=None, help='Dockerfile path (default: <input>/Dockerfile)')
+@click.option('--write', is_flag=True, help='Write the generated .dockerignore into the context')
+def context(input, file, write):
+    """Measure the build context and generate a minimal .dockerignore."""
+    from src.build_context import analyze_context, format_context_report
+    
+    try:
+        dockerfile = None
+        if file:
+            with open(file, 'r') as f:
+                dockerfile = f.read()
+        
+        report = analyze_context(input, dockerfile)
+        click.echo(format_context_report(report))
+        
+        content = '\n'.join(report.dockerignore) + '\n'
+        if write:
+            target = os.path.join(input, '.dockerignore')
+            with open(target, 'w') as f:
+                f.write(content)
+            click.echo(f"✓ .dockerignore saved to: {target}")
+        else:
+            click.echo("--- GENERATED .dockerignore ---")
+            click.echo(content, nl=False)
+    
+    except FileNotFoundError as e:
+        click.echo(f"Error: File not found: {e.filename}", err=True)
+        sys.exit(1)
+    except Exception as e:
+        click.echo(f"Error: {str(e)}", err=True)
+        sys.exit(1)
+
+
+@cli.command('validate-compose')
+@click.option('--file', '-f', required=True, help='docker-compose file path')
+def validate_compose_file(file):
+    """Validate existing docker-compose file."""
+    from src.compose_validator import validate_compose
+    
+    try:
+        with open(file, 'r') as f:
+            content = f.read()
+        
+        validation_result = validate_compose(content)
+        click.echo(format_validation_report(validation_result))
+        
+        if validation_result.passed:
+            click.echo("\n✓ All compose checks passed")
+        else:
+            click.echo("\n✗ Some compose checks failed")
+            sys.exit(1)
+    
+    except FileNotFoundError:
+        click.echo(f"Error: File not found: {file}", err=True)
+        sys.exit(1)
+    except Exception as e:
+        click.echo(f"Error: {str(e)}", err=True)
+        sys.exit(1)
+
+
+@cli.command('bulk-validate')
+@click.argument('roots', nargs=-1, required=True, type=click.Path(exists=True))
+@click.option('--workers', '-w', type=int, default=None, help='Worker processes (default: CPU count)')
+@click.option('--fail-on', type=click.Choice(['ERROR', 'WARNING', 'NONE'], case_sensitive=False),
+              default='ERROR', help='Lowest severity that makes the exit code non-zero')
+@click.option('--rules', 'rules_file', default=None, help='Rules YAML (default: config/rules.yaml)')
+@click.option('--kind', type=click.Choice(['dockerfile', 'compose', 'secrets']), default='dockerfile',
+              help='Validate Dockerfiles, docker-compose files, or only scan Dockerfiles for secrets')
+@click.option('--quiet', '-q', is_flag=True, help='Only print files with findings')
+def bulk_validate(roots, workers, fail_on, rules_file, kind, quiet):
+    """Validate every Dockerfile (or compose file) found under ROOTS in parallel."""
+    from src.bulk_validator import BulkSummary, SEVERITY_LEVELS, run_bulk
+    
+    threshold = SEVERITY_LEVELS.get(fail_on.upper())
+    summary = BulkSummary()
+    over_threshold = 0
+    
+    try:
+        for report in run_bulk(roots, workers, rules_file, summary, kind):
+            if threshold is not None and report.worst_severity() >= threshold:
+                over_threshold += 1
+            
+            if report.error:
+                click.echo(f"✗ {report.path}: {report.error}")
+                continue
+            if not report.failures and not report.syntax_errors:
+                if not quiet:
+                    click.echo(f"✓ {report.path}")
+                continue
+            
+            symbol = '✓' if report.passed else '✗'
+            click.echo(f"{symbol} {report.path}")
+            for error in report.syntax_errors:
+                click.echo(f"    ✗ {error}")
+            for result in report.failures:
+                marker = '⚠' if result.severity == 'WARNING' else '✗'
+                click.echo(f"    {marker} {result.rule_id}: {result.message}")
+    except Exception as e:
+        click.echo(f"Error: {str(e)}", err=True)
+        sys.exit(1)
+    
+    click.echo(
+        f"\nSummary: {summary.files} files, {summary.passed} passed, "
+        f"{summary.failed} failed, {summary.errors} unreadable "
+        f"in {summary.elapsed:.2f}s ({summary.files_per_second:.1f} files/s)"
+    )
+    
+    if over_threshold:
+        click.echo(f"✗ {over_threshold} files with findings at or above {fail_on.upper()}")
+        sys.exit(1)
+
+
+@cli.command()
+@click.option('--host', default=None, help='Bind address (default from config)')
+@click.option('--port', '-p', type=int, default=None, help='Port (default from config)')
+@click.option('--workers', '-w', type=int, default=None, help='Worker processes (0 = 2 x CPU + 1)')
+@click.option('--threads', type=int, default=None, help='Threads per worker')
+@click.option('--dev', is_flag=True, help='Run the Flask development server with the debugger instead')
+def serve(host, port, workers, threads, dev):
+    """Run the web UI with pre-forked workers (SIGHUP reloads, SIGTERM drains)."""
+    from src.server import ServerOptions, serve as run_server
+    
+    try:
+        options = ServerOptions.from_config(host=host, port=port, workers=workers, threads=threads)
+    except ValueError as e:
+        click.echo(f"Error: {e}", err=True)
+        sys.exit(1)
+    if dev:
+        from web_ui import app
+        app.run(host=options.host, port=options.port, debug=True)
+        return
+    
+    try:
+        run_server(options)
+    except ImportError:
+        click.echo("Error: gunicorn is not installed (pip install -r requirements.txt), or use --dev", err=True)
+        sys.exit(1)
+
+
+@cli.group()
+def jobs():
+    """Submit and follow generation jobs on a running server."""
+    pass
+
+
+def _server_url(server):
+    return server or load_config().get('jobs', {}).get('server_url', 'http://localhost:5000')
+
+
+def _await_job(server, job_id, output):
+    """Print progress events, then save the Dockerfile of a finished job."""
+    from src.job_client import job_events
+    
+    for event, data in job_events(server, job_id):
+        if event == 'progress':
+            click.echo(f"… {data['status']}" + (f": {data['stage']}" if data.get('stage') else ''))
+        elif event == 'failed':
+            click.echo(f"✗ Job failed: {data.get('error', 'unknown error')}", err=True)
+            sys.exit(1)
+        elif event == 'done':
+            result = data['result']
+            with open(output, 'w') as f:
+                f.write(result['dockerfile'])
+            click.echo(f"✓ Dockerfile saved to: {output}")
+            validation = result['validation']
+            click.echo(f"{'✓' if validation['passed'] else '✗'} Validation: {validation['summary']}")
+
+
+@jobs.command('submit')
+@click.option('--text', '-t', required=True, help='Text description')
+@click.option('--token-budget', type=click.IntRange(min=1), default=None, help='Prompt token budget (default from server config)')
+@click.option('--optimize/--no-optimize', default=None, help='Run the optimizer on the result (default from server config)')
+@click.option('--server', '-s', default=None, help='Server URL (default from config)')
+@click.option('--wait', is_flag=True, help='Follow progress and save the result')
+@click.option('--output', '-o', default='Dockerfile', help='Output file path (with --wait)')
+def jobs_submit(text, token_budget, optimize, server, wait, output):
+    """Queue a generation job."""
+    from src.job_client import JobClientError, submit_job
+    
+    server = _server_url(server)
+    request = {'prompt': text}
+    if token_budget is not None:
+        request['token_budget'] = token_budget
+    if optimize is not None:
+        request['optimize'] = optimize
+    
+    try:
+        job = submit_job(server, request)
+        note = ' (already queued)' if job.get('deduplicated') else ''
+        click.echo(f"✓ Job {job['job_id']} {job['status']}{note}")
+        if wait:
+            _await_job(server, job['job_id'], output)
+    except JobClientError as e:
+        click.echo(f"Error: {e}", err=True)
+        sys.exit(1)
+    except Exception as e:
+        click.echo(f"Error: {str(e)}", err=True)
+        sys.exit(1)
+
+
+@jobs.command('status')
+@click.argument('job_id')
+@click.option('--server', '-s', default=None, help='Server URL (default from config)')
+def jobs_status(job_id, server):
+    """Show a job's status."""
+    from src.job_client import JobClientError, get_job
+    
+    try:
+        job = get_job(_server_url(server), job_id)
+        click.echo(f"{job['job_id']}: {job['status']}" + (f" ({job['stage']})" if job.get('stage') else ''))
+        if job.get('error'):
+            click.echo(f"Error: {job['error']}")
+    except JobClientError as e:
+        click.echo(f"Error: {e}", err=True)
+        sys.exit(1)
+    except Exception as e:
+        click.echo(f"Error: {str(e)}", err=True)
+        sys.exit(1)
+
+
+@jobs.command('wait')
+@click.argument('job_id')
+@click.option('--server', '-s', default=None, help='Server URL (default from config)')
+@click.option('--output', '-o', default='Dockerfile', help='Output file path')
+def jobs_wait(job_id, server, output):
+    """Wait for a job and save its Dockerfile."""
+    from src.job_client import JobClientError
+    
+    try:
+        _await_job(_server_url(server), job_id, output)
+    except JobClientError as e:
+        click.echo(f"Error: {e}", err=True)
+        sys.exit(1)
+    except Exception as e:
+        click.echo(f"Error: {str(e)}", err=True)
+        sys.exit(1)
+
+
 @cli.command()
 def version():
     """Show version information."""
@@ -1,92 +1,435 @@
 """
 Metrics Collector Module
 Collects usage and performance metrics.
+
+Counters and latency histograms are aggregated in memory. Each thread
+records into its own shard, so the request path takes no lock; reads merge
+the shards. A background thread periodically writes a JSON snapshot with
+an atomic rename, and prometheus() renders the text exposition format.
+
+With a shared file configured, each worker process also publishes its
+totals into its own slot of a memory-mapped file (see shared_metrics), and
+reads aggregate every worker, so any worker can answer /metrics. The file
+keeps the totals across restarts; without it, each process starts from the
+last JSON snapshot instead.
 """
 
+import atexit
 import json
 import os
-from datetime import datetime
-from typing import Dict
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src.config_loader import load_config
+from src.rule_metrics import LatencyHistogram, RuleStats, get_rule_metrics
+from src.shared_metrics import SharedMetrics
+
+
+# Upper bounds in milliseconds shared by all histograms: the smallest ones
+# resolve single rule evaluations, the largest cover the worker timeout
+# (server.timeout, 300 s by default)
+DURATION_BUCKETS_MS: Tuple[float, ...] = (
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 25.0, 50.0, 100.0, 250.0, 500.0,
+    1000.0, 2500.0, 5000.0, 10000.0, 30000.0, 60000.0, 120000.0, 180000.0, 300000.0, 600000.0
+)
+
+# (metric name, sorted (label, value) pairs)
+MetricKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+METRIC_HELP = {
+    'generations_total': ('counter', 'Generation requests by stack and outcome.'),
+    'validations_total': ('counter', 'Dockerfile validations by outcome.'),
+    'generation_duration_seconds': ('histogram', 'End-to-end generation latency by stack.'),
+    'stage_duration_seconds': ('histogram', 'Pipeline stage latency by stack and stage.'),
+    'rule_evaluations_total': ('counter', 'Rule evaluations by rule id and outcome.'),
+    'rule_duration_seconds': ('histogram', 'Rule evaluation latency by rule id (sampled validations).'),
+    'rule_validation_duration_seconds': ('histogram', 'Time to run all rules over one Dockerfile (sampled).'),
+}
+
+PROMETHEUS_PREFIX = 'dockerfile_generator_'
+
+
+def metric_key(name: str, **labels: str) -> MetricKey:
+    """Build the key of one labelled series."""
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class _Shard:
+    """Counters and histograms written by a single thread."""
+    __slots__ = ('thread', 'counters', 'histograms')
+
+    def __init__(self, thread: threading.Thread):
+        self.thread = thread
+        self.counters: Dict[MetricKey, int] = {}
+        self.histograms: Dict[MetricKey, LatencyHistogram] = {}
+
+
+def _merge_histogram(target: Dict[MetricKey, LatencyHistogram], key: MetricKey, source: LatencyHistogram):
+    merged = target.get(key)
+    if merged is None:
+        merged = target[key] = LatencyHistogram(bounds=source.bounds)
+    for index, bucket in enumerate(list(source.counts)):
+        merged.counts[index] += bucket
+    merged.count += source.count
+    merged.total_ms += source.total_ms
 
 
 class MetricsCollector:
-    """Collects and stores metrics."""
-    
-    def __init__(self, metrics_file: str = 'logs/metrics.json'):
-        """Initialize metrics collector."""
+    """Thread-sharded in-memory metrics with periodic atomic snapshots."""
+
+    def __init__(self, metrics_file: str = 'logs/metrics.json', flush_interval: float = 30.0,
+                 enabled: bool = True, shared: SharedMetrics = None, sync_interval: float = 1.0):
+        """
+        Initialize metrics collector.
+
+        Args:
+            metrics_file: JSON snapshot path ('' disables flushing)
+            flush_interval: Seconds between snapshots
+            enabled: Whether callers should record at all
+            shared: Cross-process slots; None keeps metrics per process
+            sync_interval: Seconds between publishing this process's totals to `shared`
+        """
+        self.enabled = enabled
         self.metrics_file = metrics_file
-        os.makedirs(os.path.dirname(metrics_file), exist_ok=True)
-        self.metrics = self._load_metrics()
-    
-    def _load_metrics(self) -> Dict:
-        """Load existing metrics."""
-        if os.path.exists(self.metrics_file):
+        self.flush_interval = flush_interval
+        self.shared = shared
+        self.sync_interval = sync_interval
+        self.started = time.time()
+        self._local = threading.local()
+        self._shards: List[_Shard] = []
+        self._retired = _Shard(None)  # merged shards of finished threads
+        # Totals of the previous run (the shared file keeps its own)
+        self._baseline = self._load_snapshot() if metrics_file and shared is None else _Shard(None)
+        self._lock = threading.Lock()  # shard registry and snapshots only
+        self._flusher_pid = None
+        self.workers: List[Dict] = []  # live worker slots seen by the last shared read
+        if metrics_file:
+            os.makedirs(os.path.dirname(metrics_file) or '.', exist_ok=True)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        # A forked worker starts empty: the parent's totals are the parent's to publish
+        self._local = threading.local()
+        self._shards, self._retired = [], _Shard(None)
+        self._lock = threading.Lock()
+
+    def _load_snapshot(self) -> _Shard:
+        """Series from the last JSON snapshot; histograms with other buckets are skipped."""
+        baseline = _Shard(None)
+        try:
             with open(self.metrics_file, 'r') as f:
-                return json.load(f)
-        return {
-            'total_generations': 0,
-            'successful_generations': 0,
-            'failed_generations': 0,
-            'total_validations': 0,
-            'validation_passes': 0,
-            'validation_failures': 0,
-            'stacks': {},
-            'avg_generation_time': 0
-        }
-    
-    def record_generation(self, duration: float, success: bool, stack: str = 'unknown'):
-        """Record generation metrics."""
-        self.metrics['total_generations'] += 1
-        if success:
-            self.metrics['successful_generations'] += 1
-        else:
-            self.metrics['failed_generations'] += 1
-        
-        # Update stack count
-        if stack not in self.metrics['stacks']:
-            self.metrics['stacks'][stack] = 0
-        self.metrics['stacks'][stack] += 1
-        
-        # Update average time
-        total = self.metrics['total_generations']
-        current_avg = self.metrics['avg_generation_time']
-        self.metrics['avg_generation_time'] = (current_avg * (total - 1) + duration) / total
-        
-        self._save_metrics()
-    
+                data = json.load(f)
+        except (OSError, ValueError):
+            return baseline
+        if not isinstance(data, dict):
+            return baseline
+        expected = list(LatencyHistogram(bounds=DURATION_BUCKETS_MS).to_dict()['buckets'])
+        try:
+            for series in data.get('counters', []):
+                key = metric_key(series['name'], **series['labels'])
+                baseline.counters[key] = int(series['value'])
+            for series in data.get('histograms', []):
+                if list(series['buckets']) != expected:
+                    continue
+                key = metric_key(series['name'], **series['labels'])
+                baseline.histograms[key] = LatencyHistogram(
+                    bounds=DURATION_BUCKETS_MS,
+                    counts=[int(bucket) for bucket in series['buckets'].values()],
+                    count=int(series['count']),
+                    total_ms=float(series['avg_ms']) * int(series['count'])
+                )
+        except (KeyError, TypeError, ValueError, AttributeError):
+            return _Shard(None)  # not a snapshot written by this collector
+        return baseline
+
+    def _shard(self) -> _Shard:
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = _Shard(threading.current_thread())
+            with self._lock:
+                self._shards.append(shard)
+            self._ensure_flusher()
+        return shard
+
+    def inc(self, name: str, value: int = 1, **labels: str):
+        """Add to a counter."""
+        counters = self._shard().counters
+        key = metric_key(name, **labels)
+        counters[key] = counters.get(key, 0) + value
+
+    def observe(self, name: str, ms: float, **labels: str):
+        """Record a latency in milliseconds."""
+        histograms = self._shard().histograms
+        key = metric_key(name, **labels)
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = LatencyHistogram(bounds=DURATION_BUCKETS_MS)
+        histogram.observe(ms)
+
+    def record_generation(self, duration: float, success: bool, stack: str = 'unknown',
+                          stage_times: Iterable[Tuple[str, float]] = (), outcome: str = None):
+        """
+        Record one generation.
+
+        Args:
+            duration: End-to-end seconds
+            success: Whether a Dockerfile was produced
+            stack: Detected stack
+            stage_times: (stage name, seconds) pairs
+            outcome: Overrides success/failure (e.g. 'cancelled')
+        """
+        outcome = outcome or ('success' if success else 'failure')
+        self.inc('generations_total', stack=stack, outcome=outcome)
+        self.observe('generation_duration_seconds', duration * 1000, stack=stack)
+        for stage, seconds in stage_times:
+            self.observe('stage_duration_seconds', seconds * 1000, stack=stack, stage=stage)
+
     def record_validation(self, passed: bool):
         """Record validation metrics."""
-        self.metrics['total_validations'] += 1
-        if passed:
-            self.metrics['validation_passes'] += 1
-        else:
-            self.metrics['validation_failures'] += 1
-        
-        self._save_metrics()
-    
+        self.inc('validations_total', outcome='passed' if passed else 'failed')
+
+    def record_rules(self, validation_result):
+        """
+        Record one rule-engine validation.
+
+        Args:
+            validation_result: ValidationResult; latencies are only recorded
+                when its duration fields are set (sampled validations)
+        """
+        if validation_result.duration is not None:
+            self.observe('rule_validation_duration_seconds', validation_result.duration * 1000)
+        for result in validation_result.results:
+            self.inc('rule_evaluations_total', rule_id=result.rule_id,
+                     outcome='passed' if result.passed else 'failed')
+            if result.duration is not None:
+                self.observe('rule_duration_seconds', result.duration * 1000, rule_id=result.rule_id)
+
+    def _merged(self) -> Tuple[Dict[MetricKey, int], Dict[MetricKey, LatencyHistogram]]:
+        """Totals of all processes when shared, else of this process's shards."""
+        counters, histograms = self._merged_local()
+        if self.shared is None or not self.shared.publish(counters, histograms):
+            return counters, histograms
+        counters, histograms, info = self.shared.read()
+        self.workers = info['workers']
+        return counters, histograms
+
+    def _merged_local(self) -> Tuple[Dict[MetricKey, int], Dict[MetricKey, LatencyHistogram]]:
+        """Sum all shards; folds shards of finished threads into one."""
+        counters: Dict[MetricKey, int] = {}
+        histograms: Dict[MetricKey, LatencyHistogram] = {}
+        with self._lock:
+            live = []
+            for shard in self._shards:
+                if shard.thread.is_alive():
+                    live.append(shard)
+                    continue
+                for key, value in shard.counters.items():
+                    self._retired.counters[key] = self._retired.counters.get(key, 0) + value
+                for key, histogram in shard.histograms.items():
+                    _merge_histogram(self._retired.histograms, key, histogram)
+            self._shards = live
+            for shard in [self._baseline, self._retired] + live:
+                # dict() copies atomically, so a writer adding a series cannot break the loop
+                for key, value in dict(shard.counters).items():
+                    counters[key] = counters.get(key, 0) + value
+                for key, histogram in dict(shard.histograms).items():
+                    _merge_histogram(histograms, key, histogram)
+        return counters, histograms
+
+    def snapshot(self) -> Dict:
+        """All series as JSON-serializable data."""
+        counters, histograms = self._merged()
+        return {
+            'started': self.started,
+            'timestamp': time.time(),
+            'workers': len(self.workers) if self.shared is not None else 1,
+            'counters': [
+                {'name': name, 'labels': dict(labels), 'value': value}
+                for (name, labels), value in sorted(counters.items())
+            ],
+            'histograms': [
+                dict({'name': name, 'labels': dict(labels)}, **histogram.to_dict())
+                for (name, labels), histogram in sorted(histograms.items())
+            ]
+        }
+
     def get_summary(self) -> Dict:
         """Get metrics summary."""
+        counters, histograms = self._merged()
+        generations: Dict[str, int] = {}
+        stacks: Dict[str, int] = {}
+        validations: Dict[str, int] = {}
+        for (name, labels), value in counters.items():
+            labels = dict(labels)
+            if name == 'generations_total':
+                generations[labels['outcome']] = generations.get(labels['outcome'], 0) + value
+                stacks[labels['stack']] = stacks.get(labels['stack'], 0) + value
+            elif name == 'validations_total':
+                validations[labels['outcome']] = value
+
+        total = sum(generations.values())
+        total_ms = sum(h.total_ms for (name, _), h in histograms.items() if name == 'generation_duration_seconds')
+        latency: Dict[str, Dict] = {}
+        stages: Dict[str, Dict] = {}
+        for (name, labels), histogram in sorted(histograms.items()):
+            labels = dict(labels)
+            percentiles = {'count': histogram.count, **histogram.percentiles()}
+            if name == 'generation_duration_seconds':
+                latency[labels['stack']] = percentiles
+            elif name == 'stage_duration_seconds':
+                stages.setdefault(labels['stage'], {})[labels['stack']] = percentiles
+
+        rule_metrics = get_rule_metrics()
+        rules: Dict[str, RuleStats] = {}
+        for (name, labels), value in counters.items():
+            if name == 'rule_evaluations_total':
+                labels = dict(labels)
+                stats = rules.get(labels['rule_id'])
+                if stats is None:
+                    stats = rules[labels['rule_id']] = RuleStats(latency=LatencyHistogram(bounds=DURATION_BUCKETS_MS))
+                setattr(stats, labels['outcome'], value)
+        for (name, labels), histogram in histograms.items():
+            rule_id = dict(labels).get('rule_id')
+            if name == 'rule_duration_seconds' and rule_id in rules:
+                rules[rule_id].latency = histogram
+        rule_validations = histograms.get(metric_key('rule_validation_duration_seconds'))
+
         return {
-            'total_generations': self.metrics['total_generations'],
-            'success_rate': self.metrics['successful_generations'] / max(1, self.metrics['total_generations']),
-            'validation_pass_rate': self.metrics['validation_passes'] / max(1, self.metrics['total_validations']),
-            'avg_generation_time': self.metrics['avg_generation_time'],
-            'most_used_stack': max(self.metrics['stacks'].items(), key=lambda x: x[1])[0] if self.metrics['stacks'] else 'none'
+            'total_generations': total,
+            'success_rate': generations.get('success', 0) / max(1, total),
+            'validation_pass_rate': validations.get('passed', 0) / max(1, sum(validations.values())),
+            'avg_generation_time': total_ms / 1000 / total if total else 0,
+            'most_used_stack': max(stacks.items(), key=lambda x: x[1])[0] if stacks else 'none',
+            'generation_latency': latency,
+            'stage_latency': stages,
+            'workers': len(self.workers) if self.shared is not None else 1,
+            'rule_metrics': {
+                'enabled': rule_metrics.enabled,
+                'sample_every': rule_metrics.sample_every,
+                'validations': (rule_validations or LatencyHistogram(bounds=DURATION_BUCKETS_MS)).to_dict(),
+                'rules': {rule_id: stats.to_dict() for rule_id, stats in sorted(rules.items())}
+            }
         }
-    
-    def _save_metrics(self):
-        """Save metrics to file."""
-        with open(self.metrics_file, 'w') as f:
-            json.dump(self.metrics, f, indent=2)
+
+    def prometheus(self) -> str:
+        """Render all series in the Prometheus text exposition format."""
+        counters, histograms = self._merged()
+        lines: List[str] = []
+        described = set()
+
+        def describe(name: str):
+            if name not in described:
+                kind, text = METRIC_HELP.get(name, ('untyped', name))
+                lines.append(f"# HELP {PROMETHEUS_PREFIX}{name} {text}")
+                lines.append(f"# TYPE {PROMETHEUS_PREFIX}{name} {kind}")
+                described.add(name)
+
+        for (name, labels), value in sorted(counters.items()):
+            describe(name)
+            lines.append(f"{PROMETHEUS_PREFIX}{name}{_labels(labels)} {value}")
+        for (name, labels), histogram in sorted(histograms.items()):
+            describe(name)
+            cumulative = 0
+            for bound, bucket in zip(histogram.bounds, histogram.counts):
+                cumulative += bucket
+                lines.append(f"{PROMETHEUS_PREFIX}{name}_bucket{_labels(labels + (('le', f'{bound / 1000:g}'),))} {cumulative}")
+            lines.append(f"{PROMETHEUS_PREFIX}{name}_bucket{_labels(labels + (('le', '+Inf'),))} {histogram.count}")
+            lines.append(f"{PROMETHEUS_PREFIX}{name}_sum{_labels(labels)} {histogram.total_ms / 1000:.6f}")
+            lines.append(f"{PROMETHEUS_PREFIX}{name}_count{_labels(labels)} {histogram.count}")
+        return '\n'.join(lines) + '\n'
+
+    def flush(self):
+        """Write a JSON snapshot atomically (temp file + rename)."""
+        if not self.metrics_file:
+            return
+        tmp_file = f"{self.metrics_file}.{os.getpid()}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(tmp_file, self.metrics_file)
+
+    def sync(self):
+        """Publish this process's totals to the shared file."""
+        if self.shared is not None:
+            self.shared.publish(*self._merged_local())
+
+    def _ensure_flusher(self):
+        """Start the snapshot/sync thread once per process (after any fork)."""
+        flushing = bool(self.metrics_file) and self.flush_interval > 0
+        syncing = self.shared is not None and self.sync_interval > 0
+        if not (flushing or syncing) or self._flusher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+        threading.Thread(target=self._flush_loop, args=(flushing, syncing), name='metrics-flush',
+                         daemon=True).start()
+        atexit.register(self._flush_quietly)
+
+    def _flush_loop(self, flushing: bool, syncing: bool):
+        interval = min(self.sync_interval, self.flush_interval) if flushing and syncing else (
+            self.sync_interval if syncing else self.flush_interval)
+        next_flush = time.monotonic() + self.flush_interval
+        while True:
+            time.sleep(interval)
+            if syncing:
+                self._sync_quietly()
+            if flushing and time.monotonic() >= next_flush:
+                next_flush += self.flush_interval
+                self._flush_quietly()
+
+    def _sync_quietly(self):
+        try:
+            self.sync()
+        except (OSError, ValueError):
+            pass  # retried next interval
+
+    def _flush_quietly(self):
+        self._sync_quietly()
+        try:
+            self.flush()
+        except OSError:
+            pass  # metrics must never break a request; retried next interval
+
+
+def _labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ''
+    escaped = (
+        f'{k}="' + v.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"') + '"'
+        for k, v in labels
+    )
+    return '{' + ','.join(escaped) + '}'
 
 
 # Global metrics collector
-_metrics_collector = None
+_metrics_collector: Optional[MetricsCollector] = None
 
 
 def get_metrics_collector() -> MetricsCollector:
     """Get global metrics collector."""
     global _metrics_collector
     if _metrics_collector is None:
-        _metrics_collector = MetricsCollector()
+        settings = load_config().get('metrics', {})
+        shared_settings = settings.get('shared', {})
+        shared = None
+        if settings.get('enabled', True) and shared_settings.get('file'):
+            try:
+                shared = SharedMetrics.open(
+                    shared_settings['file'],
+                    slots=shared_settings.get('slots', 32),
+                    series=shared_settings.get('series', 256),
+                    bounds=DURATION_BUCKETS_MS
+                )
+            except OSError:
+                shared = None  # unshareable location: fall back to per-process metrics
+        _metrics_collector = MetricsCollector(
+            metrics_file=settings.get('file', 'logs/metrics.json'),
+            flush_interval=settings.get('flush_interval', 30),
+            enabled=settings.get('enabled', True),
+            shared=shared,
+            sync_interval=shared_settings.get('sync_interval', 1.0)
+        )
     return _metrics_collector
@@ -5,6 +5,8 @@ Formats and presents results.
 
 from datetime import datetime
 from src.rule_engine import ValidationResult
+from src.image_size import SizeEstimate, format_size_report
+from src.stage_graph import StageGraph, format_stage_report
 
 
 def format_dockerfile(content: str, validation: ValidationResult) -> str:
@@ -17,13 +19,24 @@ def format_dockerfile(content: str, validation: ValidationResult) -> str:
     return header + content
 
 
-def format_validation_report(validation: ValidationResult) -> str:
-    """Format validation report."""
+def format_validation_report(
+    validation: ValidationResult,
+    stages: StageGraph = None,
+    size: SizeEstimate = None
+) -> str:
+    """Format validation report, with the build stage analysis and size estimate when given."""
     report = "\n--- VALIDATION REPORT ---\n"
     
     for result in validation.results:
         symbol = '✓' if result.passed else ('⚠' if result.severity == 'WARNING' else '✗')
         report += f"{symbol} {result.rule_id}: {result.message}\n"
+        if result.hint and not result.passed:
+            report += ''.join(f"    → {hint}\n" for hint in result.hint.split('\n'))
+    
+    if stages is not None:
+        report += format_stage_report(stages)
+    if size is not None:
+        report += format_size_report(size)
     
     report += f"\nSummary: {validation.summary}\n"
     return report
@@ -0,0 +1,301 @@
+"""
+Pipeline Module
+Dependency-driven stage runner: stages whose inputs are ready run
+concurrently, with hooks around every stage for caching and instrumentation.
+"""
+
+import contextvars
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+from src.config_loader import load_config
+from src.tracing import span
+
+
+class PipelineCancelled(Exception):
+    """Raised when a pipeline run is cancelled (e.g. the client went away)."""
+
+
+class CancelToken:
+    """
+    Cancellation flag for one pipeline run.
+
+    Besides explicit cancel(), an optional probe (such as a client
+    disconnect check) is consulted at most once per poll_interval.
+    """
+
+    def __init__(self, probe: Callable[[], bool] = None, poll_interval: float = 0.5):
+        """
+        Initialize the token.
+
+        Args:
+            probe: Returns True once the run should stop
+            poll_interval: Seconds between probe calls
+        """
+        self.probe = probe
+        self.poll_interval = poll_interval
+        self._event = threading.Event()
+        self._last_probe = 0.0
+
+    def cancel(self):
+        """Request cancellation."""
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        if self._event.is_set():
+            return True
+        if self.probe is not None:
+            now = time.monotonic()
+            if now - self._last_probe >= self.poll_interval:
+                self._last_probe = now
+                if self.probe():
+                    self._event.set()
+                    return True
+        return False
+
+    def raise_if_cancelled(self):
+        """
+        Raises:
+            PipelineCancelled: If cancellation was requested
+        """
+        if self.cancelled:
+            raise PipelineCancelled("Pipeline cancelled")
+
+
+@dataclass(frozen=True)
+class Stage:
+    """
+    One pipeline step.
+
+    `run` receives the PipelineContext and returns the stage result, which
+    later stages read as context[name]. A stage whose `enabled` predicate
+    is false is skipped and its result is None.
+    """
+    name: str
+    run: Callable[['PipelineContext'], Any]
+    requires: Tuple[str, ...] = ()
+    enabled: Optional[Callable[['PipelineContext'], bool]] = None
+    cache_ttl: float = 0.0  # > 0: result reusable by StageCache for this many seconds
+    cache_key: Optional[Callable[['PipelineContext'], Hashable]] = None
+    background: bool = False  # run off the caller's thread so cancellation is noticed while it runs
+
+
+class PipelineContext:
+    """Inputs of a run plus the results of the stages finished so far."""
+
+    def __init__(self, inputs: Dict[str, Any], cancel: CancelToken = None):
+        self.inputs = dict(inputs)
+        self.results: Dict[str, Any] = {}
+        self.cancel = cancel or CancelToken()
+
+    def __getitem__(self, name: str) -> Any:
+        if name in self.results:
+            return self.results[name]
+        return self.inputs[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.results or name in self.inputs
+
+    def get(self, name: str, default: Any = None) -> Any:
+        return self[name] if name in self else default
+
+
+# hook(stage, context, call) -> result; call() runs the next hook or the stage
+StageHook = Callable[[Stage, PipelineContext, Callable[[], Any]], Any]
+
+
+def tracing_hook(stage: Stage, context: PipelineContext, call: Callable[[], Any]) -> Any:
+    """Time each stage as a span of the current trace."""
+    with span(stage.name):
+        return call()
+
+
+def progress_hook(progress: Callable[[str], None]) -> StageHook:
+    """Hook reporting the name of each stage as it starts."""
+    def hook(stage: Stage, context: PipelineContext, call: Callable[[], Any]) -> Any:
+        progress(stage.name)
+        return call()
+    return hook
+
+
+class StageTimer:
+    """Hook collecting (stage name, seconds) for one run."""
+
+    def __init__(self):
+        self.timings: List[Tuple[str, float]] = []
+        self.context: Optional[PipelineContext] = None
+
+    def __call__(self, stage: Stage, context: PipelineContext, call: Callable[[], Any]) -> Any:
+        self.context = context
+        start = time.perf_counter()
+        try:
+            return call()
+        finally:
+            self.timings.append((stage.name, time.perf_counter() - start))
+
+
+class StageCache:
+    """Hook reusing results of stages with a cache_ttl, keyed by their cache_key."""
+
+    def __init__(self, max_entries: int = 256):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Entries kept before the oldest are dropped
+        """
+        self.max_entries = max_entries
+        self._entries: Dict[Tuple[str, Hashable], Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, stage: Stage, context: PipelineContext, call: Callable[[], Any]) -> Any:
+        if stage.cache_ttl <= 0:
+            return call()
+        key = (stage.name, stage.cache_key(context) if stage.cache_key else None)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                return entry[1]
+        result = call()
+        with self._lock:
+            self._entries[key] = (now + stage.cache_ttl, result)
+            if len(self._entries) > self.max_entries:
+                expired = [k for k, (expires, _) in self._entries.items() if expires <= now]
+                for k in expired or list(self._entries)[:len(self._entries) - self.max_entries]:
+                    del self._entries[k]
+        return result
+
+    def clear(self):
+        """Drop all cached results."""
+        with self._lock:
+            self._entries.clear()
+
+
+class Pipeline:
+    """
+    Stages with declared dependencies.
+
+    run() starts every stage as soon as the stages it requires have
+    finished. When several are ready they run on a shared thread pool
+    (with the caller's context, so trace spans still attach); a lone ready
+    stage runs on the caller's thread unless it is marked background.
+    """
+
+    def __init__(self, stages: Sequence[Stage], hooks: Iterable[StageHook] = ()):
+        """
+        Initialize the pipeline.
+
+        Args:
+            stages: Stages in any order
+            hooks: Wrapped around every stage, first hook outermost
+
+        Raises:
+            ValueError: For duplicate names, unknown requirements or cycles
+        """
+        self.stages = list(stages)
+        self.hooks = list(hooks)
+        names = [stage.name for stage in self.stages]
+        if len(set(names)) != len(names):
+            raise ValueError("Duplicate stage names")
+        for stage in self.stages:
+            unknown = set(stage.requires) - set(names)
+            if unknown:
+                raise ValueError(f"Stage '{stage.name}' requires unknown stages: {sorted(unknown)}")
+        self.order = self._topological_order()
+
+    def _topological_order(self) -> List[str]:
+        order, done = [], set()
+        pending = list(self.stages)
+        while pending:
+            ready = [s for s in pending if set(s.requires) <= done]
+            if not ready:
+                raise ValueError(f"Dependency cycle among: {[s.name for s in pending]}")
+            for stage in ready:
+                order.append(stage.name)
+                done.add(stage.name)
+                pending.remove(stage)
+        return order
+
+    def _call(self, stage: Stage, context: PipelineContext, hooks: List[StageHook]) -> Any:
+        if stage.enabled is not None and not stage.enabled(context):
+            return None
+        call = lambda: stage.run(context)
+        for hook in reversed(hooks):
+            call = (lambda h, inner: lambda: h(stage, context, inner))(hook, call)
+        return call()
+
+    def run(self, inputs: Dict[str, Any], cancel: CancelToken = None,
+            hooks: Iterable[StageHook] = ()) -> PipelineContext:
+        """
+        Run all stages.
+
+        Args:
+            inputs: Values stages read from the context
+            cancel: Cancellation token, checked between stages and while waiting
+            hooks: Extra hooks for this run (inside the pipeline's own hooks)
+
+        Returns:
+            PipelineContext with every stage result
+
+        Raises:
+            PipelineCancelled: If cancelled before all stages finished
+            Exception: The first exception raised by a stage
+        """
+        context = PipelineContext(inputs, cancel)
+        hooks = self.hooks + list(hooks)
+        remaining = {stage.name: stage for stage in self.stages}
+        running: Dict[Future, Stage] = {}
+        executor = get_pipeline_executor()
+
+        try:
+            while remaining or running:
+                context.cancel.raise_if_cancelled()
+                ready = [
+                    stage for stage in remaining.values()
+                    if all(r in context.results for r in stage.requires)
+                ]
+                for stage in ready:
+                    del remaining[stage.name]
+
+                inline = None
+                if ready and not running and not ready[-1].background:
+                    inline = ready.pop()
+                for stage in ready:
+                    ctx = contextvars.copy_context()
+                    running[executor.submit(ctx.run, self._call, stage, context, hooks)] = stage
+                if inline is not None:
+                    context.results[inline.name] = self._call(inline, context, hooks)
+                    continue
+                if not running:
+                    continue
+
+                finished, _ = wait(list(running), timeout=context.cancel.poll_interval,
+                                   return_when=FIRST_COMPLETED)
+                for future in finished:
+                    stage = running.pop(future)
+                    context.results[stage.name] = future.result()
+        finally:
+            for future in running:
+                future.cancel()  # not started yet; stages already running finish unobserved
+
+        return context
+
+
+# Shared thread pool for concurrent stages
+_pipeline_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_pipeline_executor() -> ThreadPoolExecutor:
+    """Get global stage thread pool (size from pipeline.workers)."""
+    global _pipeline_executor
+    if _pipeline_executor is None:
+        with _executor_lock:
+            if _pipeline_executor is None:
+                workers = load_config().get('pipeline', {}).get('workers', 8)
+                _pipeline_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='pipeline')
+    return _pipeline_executor
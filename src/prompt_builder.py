@@ -4,84 +4,299 @@ Constructs prompts for LLM with context and security rules.
 """
 
 import os
-from typing import Optional
+import re
+from dataclasses import dataclass
+from typing import List, Optional
+from src.cache_rules import cache_guidance
+from src.template_registry import PromptTemplate, get_template_registry
 
 
-def load_template(stack_name: str) -> str:
+def get_template(stack_name: str) -> PromptTemplate:
     """
-    Load prompt template for specified stack.
+    Get prompt template record for specified stack.
     
     Args:
         stack_name: Name of stack (python, nodejs, java)
         
     Returns:
-        Template content as string
+        PromptTemplate with content and content hash
         
     Raises:
         FileNotFoundError: If template file not found
     """
     # Map stack names to template files
     template_map = {
-        'python': 'python_template.txt',
-        'nodejs': 'nodejs_template.txt',
-        'java': 'java_template.txt',
-        'unknown': 'base_template.txt'
+        'python': 'python_template',
+        'nodejs': 'nodejs_template',
+        'java': 'java_template',
+        'unknown': 'base_template'
     }
     
-    template_file = template_map.get(stack_name.lower(), 'base_template.txt')
+    template_name = template_map.get(stack_name.lower(), 'base_template')
     
-    # Get template path relative to this file
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    project_root = os.path.dirname(current_dir)
-    template_path = os.path.join(project_root, 'config', 'prompts', template_file)
+    registry = get_template_registry()
+    template = registry.get(template_name)
+    if template is None:
+        raise FileNotFoundError(
+            f"Template not found: {os.path.join(registry.prompts_dir, template_name + '.txt')}"
+        )
     
-    if not os.path.exists(template_path):
-        raise FileNotFoundError(f"Template not found: {template_path}")
+    return template
+
+
+def load_template(stack_name: str) -> str:
+    """
+    Load prompt template for specified stack.
     
-    with open(template_path, 'r', encoding='utf-8') as f:
-        return f.read()
+    Args:
+        stack_name: Name of stack (python, nodejs, java)
+        
+    Returns:
+        Template content as string
+        
+    Raises:
+        FileNotFoundError: If template file not found
+    """
+    return get_template(stack_name).content
+
 
+@dataclass
+class AssembledPrompt:
+    """Prompt assembled within a token budget."""
+    prompt: str
+    token_budget: int
+    prompt_tokens: int
+    template_hash: str
+    included: List[str]
+    dropped: List[str]
 
-def build_prompt(stack_info, input_data) -> str:
+
+DEFAULT_TOKEN_BUDGET = 1024
+
+# Rough sub-word split: long words cost roughly one token per four letters
+_TOKEN_RE = re.compile(r'[A-Za-z]{1,4}|\d{1,3}|[^\sA-Za-z\d]')
+
+ENTRY_POINT_NAMES = {
+    'app.py', 'main.py', 'wsgi.py', 'asgi.py', 'manage.py', 'server.py',
+    'server.js', 'index.js', 'app.js', 'main.js', 'server.ts', 'index.ts', 'main.ts',
+    'Application.java', 'Main.java'
+}
+
+RELEVANCE_KEYWORDS = {
+    'install', 'run', 'start', 'port', 'docker', 'build', 'deploy', 'environment',
+    'env', 'config', 'configuration', 'dependencies', 'requirements', 'usage',
+    'setup', 'server', 'database', 'production', 'command', 'serve', 'entrypoint'
+}
+
+
+def estimate_tokens(text: str) -> int:
     """
-    Build complete prompt with context.
+    Estimate token count locally without a tokenizer.
+    
+    Args:
+        text: Text to measure
+        
+    Returns:
+        Approximate token count
+    """
+    return len(_TOKEN_RE.findall(text))
+
+
+def _truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text after approximately max_tokens tokens."""
+    if max_tokens <= 0:
+        return ''
+    for count, match in enumerate(_TOKEN_RE.finditer(text), 1):
+        if count == max_tokens:
+            return text[:match.end()].rstrip()
+    return text
+
+
+def _split_sections(description: str) -> List[tuple]:
+    """Split markdown into (index, text) sections at headings."""
+    sections = []
+    current = []
+    for line in description.split('\n'):
+        if line.lstrip().startswith('#') and current:
+            sections.append('\n'.join(current).strip())
+            current = []
+        current.append(line)
+    if current:
+        sections.append('\n'.join(current).strip())
+    return [(i, text) for i, text in enumerate(sections) if text]
+
+
+def rank_sections(description: str, keywords: set) -> List[tuple]:
+    """
+    Rank README sections by keyword relevance.
+    
+    Args:
+        description: README or free-text description
+        keywords: Lowercase keywords that signal useful context
+        
+    Returns:
+        List of (index, text) sections, most relevant first
+    """
+    def score(section):
+        index, text = section
+        words = re.findall(r'[a-z0-9_.-]+', text.lower())
+        if not words:
+            return (0.0, -index)
+        heading = text.split('\n', 1)[0].lower()
+        hits = sum(1 for word in words if word in keywords)
+        heading_hits = sum(1 for keyword in keywords if keyword in heading)
+        # Favour dense sections; earlier sections win ties
+        return (hits / len(words) ** 0.5 + heading_hits, -index)
+    
+    return sorted(_split_sections(description), key=score, reverse=True)
+
+
+def _detect_ports(stack: str, framework: Optional[str], description: str) -> List[str]:
+    """Collect default port plus ports mentioned in the description."""
+    ports = [_get_default_ports(stack, framework)]
+    for port in re.findall(r'\bports?\s*[:=]?\s*(\d{2,5})\b', description, re.IGNORECASE):
+        if port not in ports and 0 < int(port) < 65536:
+            ports.append(port)
+    return ports
+
+
+def assemble_prompt(
+    stack_info,
+    input_data,
+    token_budget: int = None,
+    example_index=None,
+    max_examples: int = 2
+) -> AssembledPrompt:
+    """
+    Assemble prompt, filling a token budget with the most useful context first.
+    
+    Build-cache guidance from the PERF-* rules is always included. Context
+    is added in priority order: dependency names, entry-point files,
+    detected ports, accepted example Dockerfiles, then README sections
+    ranked by keyword relevance.
     
     Args:
         stack_info: StackInfo object with detected stack
         input_data: ProcessedInput object with input details
+        token_budget: Total prompt token budget (defaults to DEFAULT_TOKEN_BUDGET)
+        example_index: Optional ExampleIndex to draw few-shot examples from
+        max_examples: Maximum number of examples to inject
         
     Returns:
-        Complete prompt string ready for LLM
+        AssembledPrompt with prompt text and token accounting
     """
-    # Load appropriate template
-    template = load_template(stack_info.name)
+    if token_budget is None:
+        token_budget = DEFAULT_TOKEN_BUDGET
     
-    # Extract information
+    template = get_template(stack_info.name)
     framework = stack_info.framework or 'Not specified'
-    description = getattr(input_data, 'description', 'No description provided')
+    description = getattr(input_data, 'description', None) or 'No description provided'
+    files = getattr(input_data, 'files', None) or []
     
-    # Determine dependencies
-    dependencies = 'See project files'
-    if hasattr(input_data, 'files') and input_data.files:
-        dep_files = [f for f in input_data.files if any(
+    fields = {
+        'stack_name': stack_info.name,
+        'framework': framework,
+        'build_cache': '\n'.join(f"- {line}" for line in cache_guidance(stack_info.name)),
+        'dependencies': '',
+        'entry_points': '',
+        'ports': '',
+        'examples': '',
+        'description': ''
+    }
+    remaining = token_budget - estimate_tokens(template.content.format(**fields))
+    included = []
+    dropped = []
+    
+    def add_items(field, items, separator=', '):
+        nonlocal remaining
+        taken = []
+        for item in items:
+            cost = estimate_tokens(item) + 1
+            if cost > remaining:
+                dropped.append(f"{field}:{item}")
+                continue
+            taken.append(item)
+            remaining -= cost
+        if taken:
+            included.append(field)
+        return separator.join(taken)
+    
+    # Dependency names, falling back to manifest file names
+    dependency_names = list((getattr(input_data, 'dependencies', None) or {}).keys())
+    if not dependency_names:
+        dependency_names = [f for f in files if any(
             dep in f for dep in ['requirements.txt', 'package.json', 'pom.xml', 'build.gradle']
         )]
-        if dep_files:
-            dependencies = ', '.join(dep_files)
-    
-    # Determine ports (default based on framework)
-    ports = _get_default_ports(stack_info.name, framework)
-    
-    # Inject variables into template
-    prompt = template.format(
-        stack_name=stack_info.name,
-        framework=framework,
-        dependencies=dependencies,
-        ports=ports,
-        description=description[:500]  # Limit description length
+    fields['dependencies'] = add_items('dependencies', dependency_names) or 'See project files'
+    
+    entry_points = [f for f in files if os.path.basename(f) in ENTRY_POINT_NAMES]
+    entry_points.sort(key=lambda f: f.count('/') + f.count(os.sep))
+    fields['entry_points'] = add_items('entry_points', entry_points) or 'Not detected'
+    
+    ports = _detect_ports(stack_info.name, stack_info.framework, description)
+    fields['ports'] = add_items('ports', ports) or _get_default_ports(stack_info.name, framework)
+    
+    # Closest accepted Dockerfiles as few-shot examples
+    if example_index is not None and max_examples > 0:
+        examples = example_index.search(
+            stack_info.name, stack_info.framework, dependency_names, limit=max_examples
+        )
+        blocks = add_items('examples', [example.dockerfile for example in examples], '\n---\n')
+        if blocks:
+            fields['examples'] = (
+                "\nACCEPTED EXAMPLES (similar projects that passed validation):\n"
+                f"---\n{blocks}\n---\n"
+            )
+    
+    # README sections by relevance, emitted in original order
+    keywords = set(RELEVANCE_KEYWORDS)
+    keywords.add(stack_info.name.lower())
+    if stack_info.framework:
+        keywords.add(stack_info.framework.lower())
+    keywords.update(name.lower() for name in dependency_names)
+    
+    chosen = []
+    for index, section in rank_sections(description, keywords):
+        cost = estimate_tokens(section) + 1
+        if cost <= remaining:
+            chosen.append((index, section))
+            remaining -= cost
+        elif remaining > 16 and not chosen:
+            # Always keep a truncated lead section rather than nothing
+            chosen.append((index, _truncate_to_tokens(section, remaining - 1)))
+            remaining = 0
+        else:
+            dropped.append(f"description:section {index}")
+    if chosen:
+        included.append('description')
+        fields['description'] = '\n\n'.join(text for _, text in sorted(chosen))
+    
+    prompt = template.content.format(**fields)
+    
+    return AssembledPrompt(
+        prompt=prompt,
+        token_budget=token_budget,
+        prompt_tokens=estimate_tokens(prompt),
+        template_hash=template.content_hash,
+        included=included,
+        dropped=dropped
     )
+
+
+def build_prompt(stack_info, input_data, token_budget: int = None, example_index=None) -> str:
+    """
+    Build complete prompt with context.
     
-    return prompt
+    Args:
+        stack_info: StackInfo object with detected stack
+        input_data: ProcessedInput object with input details
+        token_budget: Total prompt token budget (defaults to DEFAULT_TOKEN_BUDGET)
+        example_index: Optional ExampleIndex to draw few-shot examples from
+        
+    Returns:
+        Complete prompt string ready for LLM
+    """
+    return assemble_prompt(stack_info, input_data, token_budget, example_index).prompt
 
 
 def _get_default_ports(stack: str, framework: Optional[str]) -> str:
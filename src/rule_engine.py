@@ -3,20 +3,32 @@ Rule Engine Module
 Validates Dockerfile against security rules.
 """
 
+import functools
+import hashlib
+import importlib
+import logging
 import os
 import re
+import threading
+import time
 import yaml
 from dataclasses import dataclass
-from typing import List, Callable
+from typing import Callable, Dict, List, Optional, Tuple
+from src.metrics_collector import get_metrics_collector
+from src.rule_metrics import get_rule_metrics
+from src.secret_scanner import scan_secrets
+from src.syntax_validator import Instruction, ParsedDockerfile, VALID_INSTRUCTIONS, parse_dockerfile
+
+logger = logging.getLogger(__name__)
 
 
 @dataclass
 class Rule:
-    """Security rule definition."""
+    """Security rule definition (validator is None for declarative rules)."""
     id: str
     name: str
     severity: str
-    validator: Callable
+    validator: Optional[Callable]
 
 
 @dataclass
@@ -26,6 +38,9 @@ class RuleResult:
     passed: bool
     message: str
     severity: str
+    line: Optional[int] = None
+    duration: Optional[float] = None  # seconds, when timed
+    hint: Optional[str] = None  # remediation detail, e.g. layers a change invalidates
 
 
 @dataclass
@@ -34,10 +49,11 @@ class ValidationResult:
     passed: bool
     results: List[RuleResult]
     summary: str
+    duration: Optional[float] = None  # seconds, when timed
 
 
-def load_rules(rules_file: str = None) -> List[dict]:
-    """Load rules from YAML file."""
+def load_rules(rules_file: str = None, section: str = 'rules') -> List[dict]:
+    """Load rules (or another rule section, e.g. compose_rules) from YAML file."""
     if rules_file is None:
         current_dir = os.path.dirname(os.path.abspath(__file__))
         project_root = os.path.dirname(current_dir)
@@ -45,117 +61,800 @@ def load_rules(rules_file: str = None) -> List[dict]:
     
     with open(rules_file, 'r') as f:
         data = yaml.safe_load(f)
-    return data.get('rules', [])
+    return data.get(section, [])
+
+
+def instruction_key(instruction: Instruction) -> tuple:
+    """Text of an instruction without its position (key of RuleVisitor.cache)."""
+    if instruction.heredocs:
+        # Heredoc lines are kept relative to the instruction: findings cite them as offsets
+        return (instruction.instruction, instruction.arguments, tuple(
+            (h.delimiter, h.content, h.terminated, h.line_number - instruction.line_number)
+            for h in instruction.heredocs
+        ))
+    return instruction.instruction, instruction.arguments
+
+
+class RuleVisitor:
+    """
+    Rule evaluated in a single pass over parsed instructions.
+    
+    Subclasses list the instruction types they care about in `instructions`;
+    `visit` is called for each matching instruction in file order and
+    `result` once at the end.
+    """
+    rule_id = ''
+    severity = 'ERROR'
+    instructions = frozenset()
+    # Memo of `analyze` by instruction text; the incremental validator keeps
+    # one per rule across edits so unchanged instructions are not re-analyzed
+    cache: Optional[Dict] = None
+    
+    def visit(self, instruction: Instruction):
+        """Inspect one instruction."""
+        pass
+    
+    def analyze(self, instruction: Instruction):
+        """Facts that depend on the instruction text alone, never its position (optional)."""
+        return None
+    
+    def facts(self, instruction: Instruction):
+        """`analyze(instruction)`, looked up in `cache` when one is set."""
+        if self.cache is None:
+            return self.analyze(instruction)
+        key = instruction_key(instruction)
+        try:
+            return self.cache[key]
+        except KeyError:
+            value = self.cache[key] = self.analyze(instruction)
+            return value
+    
+    def result(self) -> RuleResult:
+        """Produce the rule result after all instructions were visited."""
+        raise NotImplementedError
+    
+    def results(self) -> List[RuleResult]:
+        """Produce all results; visitors covering several rules override this."""
+        return [self.result()]
+    
+    @classmethod
+    def configure(cls, options: dict) -> Callable[[], 'RuleVisitor']:
+        """
+        Bind the `options` block of a rule in rules.yaml.
+        
+        Args:
+            options: Rule options
+            
+        Returns:
+            Factory creating configured visitors
+        """
+        return functools.partial(cls, **options)
+
+
+ROOT_USERS = {'root', '0'}
+
+
+class NonRootUserRule(RuleVisitor):
+    """SEC-001: final stage must switch to a non-root user."""
+    rule_id = 'SEC-001'
+    instructions = frozenset({'FROM', 'USER'})
+    
+    def __init__(self):
+        self.last_user = None
+    
+    def visit(self, instruction: Instruction):
+        if instruction.instruction == 'FROM':
+            # Each stage starts as root again
+            self.last_user = None
+        else:
+            self.last_user = instruction
+    
+    def result(self) -> RuleResult:
+        if self.last_user is None:
+            return RuleResult(self.rule_id, False, 'No USER instruction or using root', self.severity)
+        user = self.last_user.arguments.split(':', 1)[0].strip().lower()
+        if user in ROOT_USERS:
+            return RuleResult(
+                self.rule_id, False,
+                f'Final stage runs as root (USER {self.last_user.arguments} at line {self.last_user.line_number})',
+                self.severity, self.last_user.line_number
+            )
+        return RuleResult(self.rule_id, True, 'Non-root user found', self.severity)
+
+
+MINIMAL_IMAGES = ['alpine', 'distroless', 'slim', 'scratch']
+
+
+class MinimalImageRule(RuleVisitor):
+    """SEC-002: final stage must build on a minimal base image."""
+    rule_id = 'SEC-002'
+    instructions = frozenset({'FROM'})
+    
+    def __init__(self):
+        self.stage_bases = {}
+        self.final_base = None
+        self.final_line = None
+    
+    def visit(self, instruction: Instruction):
+        args = [a for a in instruction.arguments.split() if not a.startswith('--')]
+        if not args:
+            return
+        image = args[0].lower()
+        # Stages built FROM an earlier stage inherit its base image
+        base = self.stage_bases.get(image, image)
+        if len(args) >= 3 and args[1].upper() == 'AS':
+            self.stage_bases[args[2].lower()] = base
+        self.final_base = base
+        self.final_line = instruction.line_number
+    
+    def result(self) -> RuleResult:
+        if self.final_base is None:
+            return RuleResult(self.rule_id, False, 'No FROM instruction found', self.severity)
+        if any(img in self.final_base for img in MINIMAL_IMAGES):
+            return RuleResult(self.rule_id, True, 'Minimal base image used', self.severity)
+        return RuleResult(
+            self.rule_id, False,
+            f'Use alpine, slim, or distroless images (final stage uses {self.final_base} at line {self.final_line})',
+            self.severity, self.final_line
+        )
+
+
+class ExposedPortsRule(RuleVisitor):
+    """SEC-003: ports must be exposed explicitly."""
+    rule_id = 'SEC-003'
+    instructions = frozenset({'EXPOSE'})
+    
+    def __init__(self):
+        self.found = False
+    
+    def visit(self, instruction: Instruction):
+        self.found = True
+    
+    def result(self) -> RuleResult:
+        return RuleResult(
+            self.rule_id, self.found,
+            'Ports explicitly exposed' if self.found else 'No EXPOSE instruction found',
+            self.severity
+        )
+
+
+class NoSecretsRule(RuleVisitor):
+    """
+    SEC-004: no hardcoded secrets in any instruction.
+    
+    Without a cache, instructions are collected one per line and scanned
+    together in `result`, since one scan_secrets call per instruction
+    costs far more than the scan itself.
+    """
+    rule_id = 'SEC-004'
+    instructions = frozenset(VALID_INSTRUCTIONS)
+    
+    def __init__(self):
+        self.findings = []
+        self.texts = []
+        self.lines = []
+    
+    def analyze(self, instruction: Instruction) -> Tuple[Tuple[int, str], ...]:
+        """(line offset from the instruction, secret rule) pairs."""
+        text = f"{instruction.instruction} {instruction.arguments}"
+        return tuple([(0, finding.rule) for finding in scan_secrets(text)] + self._heredoc_findings(instruction))
+    
+    @staticmethod
+    def _heredoc_findings(instruction: Instruction) -> List[Tuple[int, str]]:
+        return [
+            (heredoc.line_number - instruction.line_number + finding.line - 1, finding.rule)
+            for heredoc in instruction.heredocs for finding in scan_secrets(heredoc.content)
+        ]
+    
+    def visit(self, instruction: Instruction):
+        if self.cache is not None:
+            found = self.facts(instruction)
+        else:
+            self.texts.append(f"{instruction.instruction} {instruction.arguments}")
+            self.lines.append(instruction.line_number)
+            found = self._heredoc_findings(instruction) if instruction.heredocs else ()
+        if found:
+            self.findings.extend((instruction.line_number + offset, rule) for offset, rule in found)
+    
+    def result(self) -> RuleResult:
+        if self.texts:
+            # Arguments are single lines, so text line n is instruction n
+            self.findings.extend(
+                (self.lines[finding.line - 1], finding.rule) for finding in scan_secrets('\n'.join(self.texts))
+            )
+            self.texts = []
+        self.findings.sort(key=lambda finding: finding[0])
+        if self.findings:
+            details = ', '.join(f'line {line}: {rule}' for line, rule in self.findings)
+            return RuleResult(
+                self.rule_id, False, f'Potential hardcoded secret detected ({details})',
+                self.severity, self.findings[0][0]
+            )
+        return RuleResult(self.rule_id, True, 'No hardcoded secrets detected', self.severity)
+
+
+class MultiStageRule(RuleVisitor):
+    """SEC-005: prefer multi-stage builds."""
+    rule_id = 'SEC-005'
+    severity = 'WARNING'
+    instructions = frozenset({'FROM'})
+    
+    def __init__(self):
+        self.stages = 0
+    
+    def visit(self, instruction: Instruction):
+        self.stages += 1
+    
+    def result(self) -> RuleResult:
+        is_multi_stage = self.stages >= 2
+        return RuleResult(
+            self.rule_id, is_multi_stage,
+            'Multi-stage build used' if is_multi_stage else 'Consider using multi-stage build',
+            self.severity
+        )
+
+
+class HealthcheckRule(RuleVisitor):
+    """SEC-006: a HEALTHCHECK should be defined."""
+    rule_id = 'SEC-006'
+    severity = 'WARNING'
+    instructions = frozenset({'HEALTHCHECK'})
+    
+    def __init__(self):
+        self.defined = False
+    
+    def visit(self, instruction: Instruction):
+        # HEALTHCHECK NONE disables an inherited check
+        self.defined = instruction.arguments.strip().upper() != 'NONE'
+    
+    def result(self) -> RuleResult:
+        return RuleResult(
+            self.rule_id, self.defined,
+            'Healthcheck defined' if self.defined else 'Consider adding HEALTHCHECK',
+            self.severity
+        )
+
+
+def run_visitors(parsed: ParsedDockerfile, visitors: List[RuleVisitor], timed: bool = False) -> List[RuleResult]:
+    """
+    Evaluate rule visitors in one linear pass over the instructions.
+    
+    Args:
+        parsed: Parsed Dockerfile
+        visitors: Fresh rule visitor instances
+        timed: Record the wall time spent in each visitor on its results
+        
+    Returns:
+        RuleResults in visitor order
+    """
+    if timed:
+        return _run_visitors_timed(parsed, visitors)
+    
+    dispatch: Dict[str, List[RuleVisitor]] = {}
+    for visitor in visitors:
+        for name in visitor.instructions:
+            dispatch.setdefault(name, []).append(visitor)
+    
+    for instruction in parsed.instructions:
+        for visitor in dispatch.get(instruction.instruction, ()):
+            visitor.visit(instruction)
+    
+    results = []
+    for visitor in visitors:
+        results.extend(visitor.results())
+    return results
+
+
+def _run_visitors_timed(parsed: ParsedDockerfile, visitors: List[RuleVisitor]) -> List[RuleResult]:
+    """run_visitors with per-visitor wall time attached to each result."""
+    clock = time.perf_counter
+    elapsed = [0.0] * len(visitors)
+    dispatch: Dict[str, List[Tuple[int, RuleVisitor]]] = {}
+    for index, visitor in enumerate(visitors):
+        for name in visitor.instructions:
+            dispatch.setdefault(name, []).append((index, visitor))
+    
+    for instruction in parsed.instructions:
+        for index, visitor in dispatch.get(instruction.instruction, ()):
+            started = clock()
+            visitor.visit(instruction)
+            elapsed[index] += clock() - started
+    
+    results = []
+    for index, visitor in enumerate(visitors):
+        started = clock()
+        produced = visitor.results()
+        spent = elapsed[index] + clock() - started
+        # A visitor covering several rules (the pattern matcher) splits its time
+        share = spent / len(produced) if produced else 0.0
+        for result in produced:
+            result.duration = share
+        results.extend(produced)
+    return results
+
+
+def _check(visitor_class, content: str) -> RuleResult:
+    return run_visitors(parse_dockerfile(content), [visitor_class()])[0]
 
 
 def check_non_root_user(content: str) -> RuleResult:
     """Check if Dockerfile uses non-root user."""
-    lines = content.upper().split('\n')
-    has_user = any('USER ' in line and 'USER ROOT' not in line for line in lines)
-    
-    return RuleResult(
-        rule_id='SEC-001',
-        passed=has_user,
-        message='Non-root user found' if has_user else 'No USER instruction or using root',
-        severity='ERROR'
-    )
+    return _check(NonRootUserRule, content)
 
 
 def check_minimal_image(content: str) -> RuleResult:
     """Check if using minimal base image."""
-    minimal_images = ['alpine', 'distroless', 'slim']
-    from_lines = [line for line in content.split('\n') if line.strip().upper().startswith('FROM')]
-    
-    if not from_lines:
-        return RuleResult('SEC-002', False, 'No FROM instruction found', 'ERROR')
-    
-    has_minimal = any(any(img in line.lower() for img in minimal_images) for line in from_lines)
-    
-    return RuleResult(
-        rule_id='SEC-002',
-        passed=has_minimal,
-        message='Minimal base image used' if has_minimal else 'Use alpine, slim, or distroless images',
-        severity='ERROR'
-    )
+    return _check(MinimalImageRule, content)
 
 
 def check_exposed_ports(content: str) -> RuleResult:
     """Check if ports are explicitly exposed."""
-    has_expose = 'EXPOSE' in content.upper()
-    
-    return RuleResult(
-        rule_id='SEC-003',
-        passed=has_expose,
-        message='Ports explicitly exposed' if has_expose else 'No EXPOSE instruction found',
-        severity='ERROR'
-    )
+    return _check(ExposedPortsRule, content)
 
 
 def check_no_secrets(content: str) -> RuleResult:
     """Check for hardcoded secrets."""
-    secret_patterns = [
-        r'password\s*=\s*["\']',
-        r'api[_-]?key\s*=\s*["\']',
-        r'secret\s*=\s*["\']',
-        r'token\s*=\s*["\']',
-        r'AWS_SECRET',
-        r'PRIVATE_KEY'
-    ]
-    
-    for pattern in secret_patterns:
-        if re.search(pattern, content, re.IGNORECASE):
-            return RuleResult('SEC-004', False, 'Potential hardcoded secret detected', 'ERROR')
-    
-    return RuleResult('SEC-004', True, 'No hardcoded secrets detected', 'ERROR')
+    return _check(NoSecretsRule, content)
 
 
 def check_multi_stage(content: str) -> RuleResult:
     """Check if using multi-stage build."""
-    from_count = content.upper().count('FROM ')
-    is_multi_stage = from_count >= 2
-    
-    return RuleResult(
-        rule_id='SEC-005',
-        passed=is_multi_stage,
-        message='Multi-stage build used' if is_multi_stage else 'Consider using multi-stage build',
-        severity='WARNING'
-    )
+    return _check(MultiStageRule, content)
 
 
 def check_healthcheck(content: str) -> RuleResult:
     """Check if healthcheck is defined."""
-    has_healthcheck = 'HEALTHCHECK' in content.upper()
+    return _check(HealthcheckRule, content)
+
+
+VALIDATORS = {
+    'SEC-001': NonRootUserRule,
+    'SEC-002': MinimalImageRule,
+    'SEC-003': ExposedPortsRule,
+    'SEC-004': NoSecretsRule,
+    'SEC-005': MultiStageRule,
+    'SEC-006': HealthcheckRule
+}
+
+
+def register_rule(rule_id: str, visitor_class):
+    """
+    Register a custom Python rule.
     
-    return RuleResult(
-        rule_id='SEC-006',
-        passed=has_healthcheck,
-        message='Healthcheck defined' if has_healthcheck else 'Consider adding HEALTHCHECK',
-        severity='WARNING'
+    Rules in rules.yaml whose id is registered here (or which name a
+    `plugin: module:Class`) are evaluated by the given RuleVisitor class.
+    
+    Args:
+        rule_id: Rule id as used in rules.yaml
+        visitor_class: RuleVisitor subclass
+    """
+    if not (isinstance(visitor_class, type) and issubclass(visitor_class, RuleVisitor)):
+        raise TypeError(f"Rule {rule_id} must be a RuleVisitor subclass")
+    VALIDATORS[rule_id] = visitor_class
+
+
+def _load_plugin(rule_id: str, target: str):
+    """Import `module:Class` plugin and register it for rule_id."""
+    module_name, _, class_name = target.partition(':')
+    if not class_name:
+        raise ValueError(f"Rule {rule_id}: plugin must be 'module:Class', got '{target}'")
+    visitor_class = getattr(importlib.import_module(module_name), class_name)
+    register_rule(rule_id, visitor_class)
+    return visitor_class
+
+
+@dataclass(frozen=True)
+class PatternRule:
+    """Declarative rule compiled from a `match` block in rules.yaml."""
+    id: str
+    name: str
+    severity: str
+    instructions: frozenset
+    pattern: Optional[str]
+    ignore_case: bool
+    min_count: Optional[int]
+    max_count: Optional[int]
+    message: str
+    pass_message: str
+
+
+def compile_pattern_rule(rule: dict) -> PatternRule:
+    """
+    Compile a declarative rule definition.
+    
+    Supported keys under `match`:
+        instruction: instruction name or list of names (default: any)
+        pattern: regex searched in the instruction arguments
+        ignore_case: case-insensitive pattern (default: false)
+        count: {min: N, max: M} on matching instructions (default: max 0)
+    
+    Args:
+        rule: Rule dictionary from rules.yaml
+        
+    Returns:
+        PatternRule
+        
+    Raises:
+        ValueError: If the definition is invalid
+    """
+    match = rule['match']
+    names = match.get('instruction') or sorted(VALID_INSTRUCTIONS)
+    if isinstance(names, str):
+        names = [names]
+    instructions = frozenset(name.upper() for name in names)
+    unknown = instructions - VALID_INSTRUCTIONS
+    if unknown:
+        raise ValueError(f"Rule {rule['id']}: unknown instruction(s) {', '.join(sorted(unknown))}")
+    
+    pattern = match.get('pattern')
+    if pattern is not None:
+        try:
+            re.compile(pattern)
+        except re.error as e:
+            raise ValueError(f"Rule {rule['id']}: invalid pattern: {e}")
+    
+    count = match.get('count') or {'max': 0}
+    return PatternRule(
+        id=rule['id'],
+        name=rule.get('name', rule['id']),
+        severity=rule.get('severity', 'ERROR'),
+        instructions=instructions,
+        pattern=pattern,
+        ignore_case=bool(match.get('ignore_case', False)),
+        min_count=count.get('min'),
+        max_count=count.get('max'),
+        message=rule.get('message') or rule.get('description') or rule.get('name', rule['id']),
+        pass_message=rule.get('pass_message') or f"{rule.get('name', rule['id'])}: OK"
     )
 
 
-def validate_dockerfile(content: str, rules: List[dict] = None) -> ValidationResult:
-    """Validate Dockerfile against all rules."""
-    if rules is None:
-        rules = load_rules()
-    
-    # Map rule IDs to validator functions
-    validators = {
-        'SEC-001': check_non_root_user,
-        'SEC-002': check_minimal_image,
-        'SEC-003': check_exposed_ports,
-        'SEC-004': check_no_secrets,
-        'SEC-005': check_multi_stage,
-        'SEC-006': check_healthcheck
-    }
+# Escapes standing for one literal character
+LITERAL_ESCAPES = frozenset('.^$*+?{}[]()|\\/-:#=@%&~"\' ')
+QUANTIFIER = re.compile(r'\{\d*(,\d*)?\}')
+# Characters that match only themselves
+LITERAL_CHARS = frozenset('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_-:/=@%&~,;<>!"\' ')
+
+
+def required_literals(pattern: str) -> Optional[Tuple[str, ...]]:
+    """
+    Literals one of which every match of the pattern contains.
     
-    results = []
+    Conservative: only top-level text outside groups and classes counts,
+    and each top-level alternative contributes its longest literal run.
+    
+    Args:
+        pattern: Regular expression
+        
+    Returns:
+        Casefolded literals (one per alternative), or None when some
+        alternative has no literal or the pattern sets inline flags
+    """
+    branches = [[]]
+    run = ''
+    depth = 0
+    i = 0
+    
+    def close_run():
+        nonlocal run
+        if run:
+            branches[-1].append(run)
+        run = ''
+    
+    while i < len(pattern):
+        char = pattern[i]
+        literal = None
+        if char == '\\' and i + 1 < len(pattern):
+            escaped = pattern[i + 1]
+            i += 2
+            if depth == 0 and escaped in LITERAL_ESCAPES:
+                literal = escaped
+        elif char == '[':
+            # Skip the class; ']' right after '[' or '[^' is literal
+            i += 2 if pattern.startswith('[^', i) else 1
+            if i < len(pattern) and pattern[i] == ']':
+                i += 1
+            while i < len(pattern) and pattern[i] != ']':
+                i += 2 if pattern[i] == '\\' else 1
+            i += 1
+        elif char == '(':
+            if depth == 0 and pattern.startswith('(?', i) and not pattern.startswith(('(?:', '(?P', '(?=', '(?!', '(?<'), i):
+                return None  # inline flags such as (?x) change what the text means
+            depth += 1
+            i += 1
+        elif char == ')':
+            depth -= 1
+            i += 1
+        elif char == '{' and QUANTIFIER.match(pattern, i):
+            i = QUANTIFIER.match(pattern, i).end()
+        elif char == '|' and depth == 0:
+            close_run()
+            branches.append([])
+            i += 1
+            continue
+        else:
+            i += 1
+            if depth == 0 and char in LITERAL_CHARS:
+                literal = char
+        
+        if literal is None:
+            close_run()
+            continue
+        quantifier = pattern[i:i + 1]
+        if quantifier in ('?', '*') or QUANTIFIER.match(pattern, i):
+            close_run()  # the character is optional
+        elif quantifier == '+':
+            run += literal
+            close_run()
+        else:
+            run += literal
+    close_run()
+    
+    literals = []
+    for runs in branches:
+        if not runs:
+            return None
+        literals.append(max(runs, key=len).casefold())
+    return tuple(literals)
+
+
+class PatternMatcher:
+    """
+    All declarative rules indexed by instruction type.
+    
+    Each pattern is searched only when a literal it requires occurs in the
+    arguments; the substring tests are far cheaper than regex searches,
+    so most instructions are rejected without running any pattern.
+    """
+    
+    def __init__(self, rules: List[PatternRule]):
+        self.rules = rules
+        self.instructions = frozenset().union(*(rule.instructions for rule in rules)) if rules else frozenset()
+        # instruction -> ([rule index without pattern], [(rule index, regex, required literals or None)])
+        self.dispatch = {}
+        for name in self.instructions:
+            plain = []
+            patterns = []
+            for index, rule in enumerate(rules):
+                if name not in rule.instructions:
+                    continue
+                if rule.pattern is None:
+                    plain.append(index)
+                    continue
+                regex = re.compile(rule.pattern, re.IGNORECASE if rule.ignore_case else 0)
+                patterns.append((index, regex, required_literals(rule.pattern)))
+            self.dispatch[name] = (plain, patterns)
+    
+    def matching_rules(self, instruction: Instruction) -> List[int]:
+        """Indexes of the rules whose pattern matches the instruction."""
+        plain, patterns = self.dispatch[instruction.instruction]
+        arguments = instruction.arguments
+        # Casefolding keeps the test valid for case-insensitive rules
+        folded = arguments.casefold()
+        return plain + [
+            index for index, regex, literals in patterns
+            if (literals is None or any(literal in folded for literal in literals)) and regex.search(arguments)
+        ]
+    
+    def visitor(self) -> 'PatternMatchVisitor':
+        """Create per-validation matching state."""
+        return PatternMatchVisitor(self)
+
+
+class PatternMatchVisitor(RuleVisitor):
+    """Counts matches for every declarative rule in a single pass."""
+    
+    def __init__(self, matcher: PatternMatcher):
+        self.matcher = matcher
+        self.instructions = matcher.instructions
+        self.counts = [0] * len(matcher.rules)
+        self.first_line = [None] * len(matcher.rules)
+    
+    def _hit(self, index: int, line_number: int):
+        self.counts[index] += 1
+        if self.first_line[index] is None:
+            self.first_line[index] = line_number
+    
+    def analyze(self, instruction: Instruction) -> List[int]:
+        return self.matcher.matching_rules(instruction)
+    
+    def visit(self, instruction: Instruction):
+        for index in self.facts(instruction):
+            self._hit(index, instruction.line_number)
+    
+    def results(self) -> List[RuleResult]:
+        results = []
+        for index, rule in enumerate(self.matcher.rules):
+            count = self.counts[index]
+            too_few = rule.min_count is not None and count < rule.min_count
+            too_many = rule.max_count is not None and count > rule.max_count
+            if too_many:
+                results.append(RuleResult(
+                    rule.id, False, f"{rule.message} (line {self.first_line[index]})",
+                    rule.severity, self.first_line[index]
+                ))
+            elif too_few:
+                results.append(RuleResult(rule.id, False, rule.message, rule.severity))
+            else:
+                results.append(RuleResult(rule.id, True, rule.pass_message, rule.severity))
+        return results
+
+
+@dataclass(frozen=True)
+class CompiledRuleSet:
+    """Rule metadata from YAML paired with validator callables."""
+    rules: Tuple[Rule, ...]
+    source: str
+    mtime: float
+    version: str
+    matcher: Optional[PatternMatcher] = None
+    
+    def visitor_factories(self) -> List[Callable[[], RuleVisitor]]:
+        """Factories for fresh visitors covering every rule in this set."""
+        factories = [rule.validator for rule in self.rules if rule.validator is not None]
+        if self.matcher is not None:
+            factories.append(self.matcher.visitor)
+        return factories
+    
+    def collect(self, results: List[RuleResult]) -> ValidationResult:
+        """Order rule results as in rules.yaml and summarize them."""
+        order = {rule.id: index for index, rule in enumerate(self.rules)}
+        results = sorted(results, key=lambda r: order.get(r.rule_id, len(order)))
+        return summarize_results(results)
+    
+    def validate(self, content: str, parsed: ParsedDockerfile = None, timed: bool = None) -> ValidationResult:
+        """
+        Validate Dockerfile against every compiled rule in a single pass.
+        
+        Args:
+            content: Dockerfile content
+            parsed: Already parsed content (parsed here if omitted)
+            timed: Time each rule; by default a sample of validations is
+                timed and every validation is recorded in the rule metrics
+            
+        Returns:
+            ValidationResult
+        """
+        metrics = get_rule_metrics()
+        record = timed is None and metrics.enabled
+        if record:
+            timed = metrics.sample()
+        started = time.perf_counter() if timed else 0.0
+        if parsed is None:
+            parsed = parse_dockerfile(content)
+        visitors = [factory() for factory in self.visitor_factories()]
+        result = self.collect(run_visitors(parsed, visitors, timed))
+        if timed:
+            result.duration = time.perf_counter() - started
+        if record:
+            metrics.record(result)
+            collector = get_metrics_collector()
+            if collector.enabled:
+                collector.record_rules(result)  # aggregated across workers
+        return result
+
+
+def compile_rules(rules: List[dict], source: str = '<inline>', mtime: float = 0.0) -> CompiledRuleSet:
+    """
+    Compile rule metadata into a rule set with bound validators.
+    
+    Rules with a `match` block are compiled into a shared PatternMatcher,
+    rules with a `plugin` are imported, and the remaining rules are bound
+    to registered Python validators. An `options` block is bound to the
+    validator with RuleVisitor.configure. Rules with `enabled: false` are
+    skipped.
+    
+    Args:
+        rules: Rule dictionaries as loaded from rules.yaml
+        source: Where the rules came from
+        mtime: Modification time of the source file
+        
+    Returns:
+        CompiledRuleSet; rules without a known validator are skipped
+    """
+    compiled = []
+    pattern_rules = []
+    options = []
     for rule in rules:
+        if not rule.get('enabled', True):
+            continue
         rule_id = rule['id']
-        if rule_id in validators:
-            result = validators[rule_id](content)
-            results.append(result)
+        meta = dict(
+            id=rule_id,
+            name=rule.get('name', rule_id),
+            severity=rule.get('severity', 'ERROR')
+        )
+        if 'match' in rule:
+            pattern_rules.append(compile_pattern_rule(rule))
+            compiled.append(Rule(validator=None, **meta))
+            continue
+        if 'plugin' in rule:
+            visitor_class = _load_plugin(rule_id, rule['plugin'])
+        elif rule_id in VALIDATORS:
+            visitor_class = VALIDATORS[rule_id]
+        else:
+            continue
+        validator = visitor_class
+        if 'options' in rule:
+            validator = visitor_class.configure(rule['options'] or {})
+            options.append((rule_id, visitor_class.__qualname__, rule['options']))
+        compiled.append(Rule(validator=validator, **meta))
     
+    digest = hashlib.sha256(repr([
+        (r.id, r.name, r.severity, getattr(r.validator, '__qualname__', None)) for r in compiled
+    ] + pattern_rules + options).encode('utf-8'))
+    matcher = PatternMatcher(pattern_rules) if pattern_rules else None
+    return CompiledRuleSet(tuple(compiled), source, mtime, digest.hexdigest()[:16], matcher)
+
+
+def _default_rules_file() -> str:
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    project_root = os.path.dirname(current_dir)
+    return os.path.join(project_root, 'config', 'rules.yaml')
+
+
+_rule_sets: Dict[str, CompiledRuleSet] = {}
+_rule_sets_lock = threading.Lock()
+# Rules file -> mtime of a change that failed to load (not retried until the file changes again)
+_failed_mtimes: Dict[str, float] = {}
+
+
+def get_rule_set(rules_file: str = None) -> CompiledRuleSet:
+    """
+    Get the shared compiled rule set, rebuilding it when the file changes.
+    
+    When a changed file cannot be loaded (removed, YAML syntax error,
+    invalid rule), the last good rule set stays in use and the error is
+    logged; the file is tried again once it changes.
+    
+    Args:
+        rules_file: Path to rules YAML (defaults to config/rules.yaml)
+        
+    Returns:
+        CompiledRuleSet, shared across threads
+        
+    Raises:
+        Exception: If the first load of the file fails
+    """
+    rules_file = os.path.abspath(rules_file or _default_rules_file())
+    rule_set = _rule_sets.get(rules_file)
+    try:
+        mtime = os.stat(rules_file).st_mtime
+    except OSError:
+        if rule_set is None:
+            raise
+        return rule_set
+    
+    if rule_set is not None and mtime in (rule_set.mtime, _failed_mtimes.get(rules_file)):
+        return rule_set
+    
+    with _rule_sets_lock:
+        previous = _rule_sets.get(rules_file)
+        if previous is not None and mtime in (previous.mtime, _failed_mtimes.get(rules_file)):
+            return previous
+        
+        started = time.perf_counter()
+        try:
+            rule_set = compile_rules(load_rules(rules_file), rules_file, mtime)
+        except Exception as e:
+            if previous is None:
+                raise
+            _failed_mtimes[rules_file] = mtime
+            logger.error("Reloading %s failed, keeping rule set version %s: %s", rules_file, previous.version, e)
+            return previous
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        
+        _failed_mtimes.pop(rules_file, None)
+        _rule_sets[rules_file] = rule_set
+        logger.info(
+            "%s rule set %s (%d rules, version %s) in %.2f ms",
+            'Reloaded' if previous is not None else 'Loaded',
+            rules_file, len(rule_set.rules), rule_set.version, elapsed_ms
+        )
+        return rule_set
+
+
+def summarize_results(results: List[RuleResult]) -> ValidationResult:
+    """Build ValidationResult from individual rule results."""
     # Check if all ERROR rules passed
     error_results = [r for r in results if r.severity == 'ERROR']
     all_errors_passed = all(r.passed for r in error_results)
@@ -174,3 +873,25 @@ def validate_dockerfile(content: str, rules: List[dict] = None) -> ValidationRes
         results=results,
         summary=summary
     )
+
+
+def validate_dockerfile(content: str, rules=None, parsed: ParsedDockerfile = None) -> ValidationResult:
+    """
+    Validate Dockerfile against all rules.
+    
+    Args:
+        content: Dockerfile content
+        rules: Rule dictionaries or CompiledRuleSet (defaults to shared rule set)
+        parsed: Already parsed Dockerfile to reuse instead of parsing again
+        
+    Returns:
+        ValidationResult
+    """
+    if rules is None:
+        rule_set = get_rule_set()
+    elif isinstance(rules, CompiledRuleSet):
+        rule_set = rules
+    else:
+        rule_set = compile_rules(rules)
+    
+    return rule_set.validate(content, parsed)
@@ -0,0 +1,178 @@
+"""
+Rule Metrics Module
+Aggregates per-rule pass/fail counts and latency histograms in memory.
+"""
+
+import threading
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+from src.config_loader import load_config
+
+
+# Upper bounds in milliseconds; one overflow bucket follows the last bound
+LATENCY_BUCKETS_MS: Tuple[float, ...] = (
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 25.0, 50.0, 100.0
+)
+
+
+@dataclass
+class LatencyHistogram:
+    """Fixed-bucket latency histogram."""
+    bounds: Tuple[float, ...] = LATENCY_BUCKETS_MS
+    counts: List[int] = field(default_factory=list)
+    count: int = 0
+    total_ms: float = 0.0
+
+    def __post_init__(self):
+        if not self.counts:
+            self.counts = [0] * (len(self.bounds) + 1)
+
+    def observe(self, ms: float):
+        self.counts[bisect_left(self.bounds, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+
+    def _bucket(self, q: float) -> int:
+        rank = q * self.count
+        seen = 0
+        for index, bucket in enumerate(self.counts):
+            seen += bucket
+            if seen >= rank:
+                return index
+        return len(self.counts) - 1
+
+    def percentile(self, q: float) -> float:
+        """
+        Upper bound of the bucket holding the q-th quantile (0 < q <= 1).
+
+        A quantile in the overflow bucket is reported as the last finite
+        bound (a lower bound on the true value, see `overflowed`), so the
+        figure always serializes as JSON.
+        """
+        if not self.count:
+            return 0.0
+        return self.bounds[min(self._bucket(q), len(self.bounds) - 1)]
+
+    def overflowed(self, q: float) -> bool:
+        """Whether the q-th quantile lies above the last bucket bound."""
+        return bool(self.count) and self._bucket(q) >= len(self.bounds)
+
+    def percentiles(self) -> Dict:
+        """p50/p95/p99 in milliseconds; `overflow` names those above the last bound."""
+        quantiles = (('p50_ms', 0.50), ('p95_ms', 0.95), ('p99_ms', 0.99))
+        return {
+            **{name: self.percentile(q) for name, q in quantiles},
+            'overflow': [name for name, q in quantiles if self.overflowed(q)]
+        }
+
+    def to_dict(self) -> Dict:
+        return {
+            'count': self.count,
+            'avg_ms': self.total_ms / self.count if self.count else 0.0,
+            **self.percentiles(),
+            'buckets': {
+                (f"le_{bound:g}" if index < len(self.bounds) else 'inf'): bucket
+                for index, (bound, bucket) in enumerate(zip(self.bounds + (None,), self.counts))
+            }
+        }
+
+
+@dataclass
+class RuleStats:
+    """Outcome counts and latency for one rule id."""
+    passed: int = 0
+    failed: int = 0
+    latency: LatencyHistogram = field(default_factory=LatencyHistogram)
+
+    def to_dict(self) -> Dict:
+        evaluations = self.passed + self.failed
+        return {
+            'evaluations': evaluations,
+            'passed': self.passed,
+            'failed': self.failed,
+            'hit_rate': self.failed / evaluations if evaluations else 0.0,
+            'latency': self.latency.to_dict()
+        }
+
+
+class RuleMetrics:
+    """Thread-safe in-memory aggregate of timed validations."""
+
+    def __init__(self, enabled: bool = True, sample_every: int = 10):
+        """
+        Initialize rule metrics.
+
+        Args:
+            enabled: Whether validations are recorded; when False the rule
+                engine skips all timing and recording
+            sample_every: Time one validation in this many (pass/fail
+                counts are recorded for every validation)
+        """
+        self.enabled = enabled
+        self.sample_every = max(1, sample_every)
+        self._calls = 0
+        self._lock = threading.Lock()
+        self._rules: Dict[str, RuleStats] = {}
+        self._validations = LatencyHistogram()
+
+    def sample(self) -> bool:
+        """Whether the next validation should be timed."""
+        # Unlocked: a lost increment only shifts which validation is sampled
+        self._calls += 1
+        return self._calls % self.sample_every == 0
+
+    def record(self, validation_result):
+        """
+        Add one ValidationResult to the aggregates.
+
+        Args:
+            validation_result: ValidationResult; latency is only recorded
+                when its duration fields are set
+        """
+        with self._lock:
+            if validation_result.duration is not None:
+                self._validations.observe(validation_result.duration * 1000)
+            for result in validation_result.results:
+                stats = self._rules.get(result.rule_id)
+                if stats is None:
+                    stats = self._rules[result.rule_id] = RuleStats()
+                if result.passed:
+                    stats.passed += 1
+                else:
+                    stats.failed += 1
+                if result.duration is not None:
+                    stats.latency.observe(result.duration * 1000)
+
+    def snapshot(self) -> Dict:
+        """Get aggregated validation and per-rule statistics."""
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'sample_every': self.sample_every,
+                'validations': self._validations.to_dict(),
+                'rules': {rule_id: stats.to_dict() for rule_id, stats in sorted(self._rules.items())}
+            }
+
+    def reset(self):
+        """Drop all aggregates."""
+        with self._lock:
+            self._rules.clear()
+            self._validations = LatencyHistogram()
+
+
+# Global rule metrics
+_rule_metrics = None
+
+
+def get_rule_metrics() -> RuleMetrics:
+    """Get global rule metrics."""
+    global _rule_metrics
+    if _rule_metrics is None:
+        settings = load_config().get('rule_metrics', {})
+        _rule_metrics = RuleMetrics(
+            enabled=settings.get('enabled', True),
+            sample_every=settings.get('sample_every', 10)
+        )
+    return _rule_metrics
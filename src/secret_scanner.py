@@ -0,0 +1,235 @@
+"""
+Secret Scanner Module
+Finds hardcoded secrets in Dockerfiles with one combined pattern pass and entropy scoring.
+"""
+
+import math
+import re
+import string
+from collections import Counter
+from dataclasses import dataclass
+from typing import Iterator, List, Optional, Tuple
+
+
+@dataclass
+class SecretFinding:
+    """One potential secret."""
+    rule: str
+    line: int
+    column: int
+    message: str
+    snippet: str
+
+
+# (rule name, regex over lowercased text, message). Each regex starts with a
+# literal so the combined alternation keeps the regex engine's fast
+# first-character scan, and none has nested quantifiers.
+SECRET_PATTERNS: List[Tuple[str, str, str]] = [
+    ('password-assignment', r'password\s*=\s*["\']', 'Password assigned a literal value'),
+    ('api-key-assignment', r'api[_-]?key\s*=\s*["\']', 'API key assigned a literal value'),
+    ('secret-assignment', r'secret\s*=\s*["\']', 'Secret assigned a literal value'),
+    ('token-assignment', r'token\s*=\s*["\']', 'Token assigned a literal value'),
+    ('aws-secret', r'aws_secret', 'AWS secret referenced'),
+    ('private-key', r'private_key', 'Private key referenced'),
+    ('private-key-block', r'-----begin (?:rsa |ec |dsa |openssh |pgp )?private key', 'Private key material'),
+    ('aws-access-key-id', r'(?:akia|asia)[0-9a-z]{16}', 'AWS access key id'),
+    ('github-token', r'gh[pousr]_[0-9a-z]{36}', 'GitHub token'),
+    ('slack-token', r'xox[abprs]-[0-9a-z-]{10,}', 'Slack token'),
+    ('url-credentials', r'://[^\s/:@]+:[^\s/@]+@', 'Credentials embedded in URL'),
+]
+
+# ASCII-only lowercasing keeps offsets valid in the original text
+# (str.lower can change the length, e.g. 'İ' becomes two characters)
+ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+# Unnamed groups: named groups would disable the fast prefix scan
+COMBINED_PATTERN = re.compile('|'.join(pattern for _, pattern, _ in SECRET_PATTERNS))
+
+COMPILED_PATTERNS = [re.compile(pattern) for _, pattern, _ in SECRET_PATTERNS]
+
+# Token formats that are case-sensitive and must stand alone as words
+CASE_SENSITIVE = {
+    'aws-access-key-id': re.compile(r'(?:AKIA|ASIA)[0-9A-Z]{16}'),
+    'github-token': re.compile(r'gh[pousr]_[A-Za-z0-9]{36}'),
+}
+
+ENTROPY_INSTRUCTIONS = {'ENV', 'ARG', 'RUN'}
+
+# Only values long enough to score are candidates. Matching starts at the
+# literal '=' (fast scan); the variable name is read backwards from there.
+ASSIGNED_VALUE = re.compile(r'=("[^"\n]{20,}"|\'[^\'\n]{20,}\'|[^\s"\']{20,})')
+
+NAME_CHARS = frozenset('ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789_.-')
+
+# Legacy `ENV KEY value` form
+LEGACY_ENV = re.compile(r'^[ \t]*ENV[ \t]+([^\s=]+)[ \t]+(\S.{19,}?)[ \t]*$', re.IGNORECASE | re.MULTILINE)
+
+HEX_CHARS = set('0123456789abcdefABCDEF')
+
+# Checksums and version pins are high entropy by design
+BENIGN_NAMES = re.compile(r'sha\d*|checksum|hash|digest|version|md5|crc', re.IGNORECASE)
+
+# Paths are structured, not secrets; base64 values may still contain '/'
+PATH_SHAPED = re.compile(r'^(?:\.{0,2}/|~/)|^[a-z0-9._-]+(?:/[a-z0-9._-]+)+/?$')
+
+BASE64_THRESHOLD = 4.5
+HEX_THRESHOLD = 3.5
+MIN_ENTROPY_LENGTH = 20
+# n characters score at most log2(n) bits, so values shorter than about 32
+# characters are held to log2(n) minus this margin (random 20-character
+# tokens score about 4.0 bits, identifiers and dotted names below 3.9)
+SHORT_VALUE_MARGIN = 0.7
+
+
+def shannon_entropy(value: str) -> float:
+    """
+    Shannon entropy of a string in bits per character.
+
+    Args:
+        value: String to score
+
+    Returns:
+        Entropy (0.0 for empty strings)
+    """
+    if not value:
+        return 0.0
+    length = len(value)
+    return -sum(count / length * math.log2(count / length) for count in Counter(value).values())
+
+
+def is_high_entropy(name: str, value: str) -> bool:
+    """Check whether an assigned value looks like a random secret."""
+    if len(value) < MIN_ENTROPY_LENGTH or '$' in value or '://' in value or PATH_SHAPED.search(value):
+        return False
+    if BENIGN_NAMES.search(name):
+        return False
+    if set(value) <= HEX_CHARS:
+        return len(value) >= 32 and shannon_entropy(value) >= HEX_THRESHOLD
+    threshold = min(BASE64_THRESHOLD, math.log2(len(value)) - SHORT_VALUE_MARGIN)
+    return shannon_entropy(value) >= threshold
+
+
+def _redact(value: str) -> str:
+    return value[:4] + '…' if len(value) > 8 else '…'
+
+
+def _pattern_findings(content: str) -> Iterator[SecretFinding]:
+    """One combined regex pass over the whole (lowercased) text."""
+    lowered = content.translate(ASCII_LOWER)
+    line = 1
+    line_start = 0
+    position = 0
+    for match in COMBINED_PATTERN.finditer(lowered):
+        start = match.start()
+        newlines = lowered.count('\n', position, start)
+        if newlines:
+            line += newlines
+            line_start = lowered.rfind('\n', position, start) + 1
+        position = start
+
+        # The first alternative matching here is the one the combined regex took
+        index = next(i for i, pattern in enumerate(COMPILED_PATTERNS) if pattern.match(lowered, start))
+        rule, _, message = SECRET_PATTERNS[index]
+        text = content[start:match.end()]
+        if rule in CASE_SENSITIVE:
+            before = content[start - 1] if start else ' '
+            after = content[match.end()] if match.end() < len(content) else ' '
+            if (not CASE_SENSITIVE[rule].fullmatch(text) or before.isalnum() or after.isalnum()):
+                continue
+        yield SecretFinding(rule, line, start - line_start + 1, message, _redact(text))
+
+
+def _name_before(content: str, end: int) -> str:
+    """Variable name ending at offset end (empty if none)."""
+    start = end
+    while start > 0 and content[start - 1] in NAME_CHARS:
+        start -= 1
+    return content[start:end].lstrip('0123456789.-')
+
+
+def _line_instructions(content: str) -> Iterator[Tuple[int, Optional[str], bool]]:
+    """
+    Instruction owning each line, in one forward pass.
+
+    Yields:
+        (line start offset, instruction keyword, whether the line is a continuation)
+    """
+    owner = None
+    continued = False
+    start = 0
+    while start <= len(content):
+        end = content.find('\n', start)
+        if end < 0:
+            end = len(content)
+        line = content[start:end].strip()
+        if continued:
+            yield start, owner, True
+        else:
+            words = line.split(None, 1)
+            yield start, (words[0].upper() if words else None), False
+            if line and not line.startswith('#'):
+                owner = words[0].upper()
+        # Comment and blank lines do not end a continuation
+        if line and not line.startswith('#'):
+            continued = line.endswith('\\')
+        start = end + 1
+
+
+def _entropy_findings(content: str) -> Iterator[SecretFinding]:
+    """Score assigned values in ENV, ARG and RUN instructions."""
+    candidates = []
+    for match in ASSIGNED_VALUE.finditer(content):
+        name = _name_before(content, match.start())
+        if name:
+            candidates.append((match.start(1), name, match.group(1), False))
+    candidates.extend(
+        (m.start(2), m.group(1), m.group(2), True) for m in LEGACY_ENV.finditer(content)
+        if not m.group(2).endswith('\\')
+    )
+    candidates.sort()
+
+    # Candidates are sorted, so the line walk only moves forward
+    lines = _line_instructions(content)
+    upcoming = next(lines, None)
+    line = 0
+    line_start, instruction, continuation = 0, None, False
+    for start, name, value, legacy in candidates:
+        while upcoming is not None and upcoming[0] <= start:
+            line += 1
+            line_start, instruction, continuation = upcoming
+            upcoming = next(lines, None)
+
+        value = value.strip('"\'')
+        if not is_high_entropy(name, value):
+            continue
+        if instruction not in ENTROPY_INSTRUCTIONS or (legacy and continuation):
+            continue
+        yield SecretFinding(
+            'high-entropy-value', line, start - line_start + 1,
+            f'High-entropy value assigned to {name} in {instruction}', _redact(value)
+        )
+
+
+def scan_secrets(content: str) -> List[SecretFinding]:
+    """
+    Scan text for hardcoded secrets.
+
+    Runs all patterns as one combined regex and scores ENV/ARG/RUN
+    assignments by Shannon entropy; both passes are linear in the input.
+
+    Args:
+        content: Dockerfile (or any text) content
+
+    Returns:
+        Findings ordered by line and column
+    """
+    findings = list(_pattern_findings(content))
+    findings.extend(_entropy_findings(content))
+    findings.sort(key=lambda f: (f.line, f.column))
+    return findings
+
+
+def scan_file(path: str) -> List[SecretFinding]:
+    """Scan a file on disk for hardcoded secrets."""
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        return scan_secrets(f.read())
@@ -0,0 +1,274 @@
+"""
+Server Module
+Production serving: pre-forked gunicorn workers and an admission queue
+that bounds concurrent generation requests.
+"""
+
+import functools
+import math
+import multiprocessing
+import select
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, fields
+from typing import Any, Dict, Iterator, Optional
+
+from src.config_loader import load_config
+from src.tracing import span
+
+
+class AdmissionRejected(Exception):
+    """Raised when the admission queue is full or the wait timed out."""
+
+    def __init__(self, estimated_wait: float):
+        self.estimated_wait = estimated_wait
+        self.retry_after = max(1, math.ceil(estimated_wait))
+        super().__init__(f"Server busy, retry in {self.retry_after}s")
+
+
+class AdmissionQueue:
+    """
+    Bounded admission for expensive requests in one worker process.
+
+    Up to max_concurrent requests run at once; up to max_queue more wait
+    (at most queue_timeout seconds) for a slot. Anything beyond that is
+    rejected straight away with an estimated wait based on a moving
+    average of recent request durations.
+    """
+
+    def __init__(self, max_concurrent: int = 2, max_queue: int = 4,
+                 queue_timeout: float = 30.0, initial_estimate: float = 10.0):
+        """
+        Initialize the queue.
+
+        Args:
+            max_concurrent: Requests served at the same time
+            max_queue: Requests allowed to wait for a slot
+            queue_timeout: Longest wait for a slot in seconds
+            initial_estimate: Assumed request duration before any completed
+        """
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self.average_duration = initial_estimate
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self._condition = threading.Condition()
+
+    def estimated_wait(self) -> float:
+        """Seconds until a newly queued request would start."""
+        ahead = self.waiting + max(0, self.active - self.max_concurrent + 1)
+        return self.average_duration * ahead / self.max_concurrent
+
+    def _reject(self) -> AdmissionRejected:
+        self.rejected += 1
+        return AdmissionRejected(self.estimated_wait())
+
+    @contextmanager
+    def admit(self) -> Iterator[None]:
+        """
+        Hold a slot for the duration of the block.
+
+        Raises:
+            AdmissionRejected: If the queue is full or the wait timed out
+        """
+        with self._condition:
+            if self.active >= self.max_concurrent:
+                if self.waiting >= self.max_queue:
+                    raise self._reject()
+                deadline = time.monotonic() + self.queue_timeout
+                self.waiting += 1
+                try:
+                    with span('queue_wait'):
+                        while self.active >= self.max_concurrent:
+                            remaining = deadline - time.monotonic()
+                            if remaining <= 0:
+                                raise self._reject()
+                            self._condition.wait(remaining)
+                finally:
+                    self.waiting -= 1
+            self.active += 1
+            self.admitted += 1
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._condition:
+                self.active -= 1
+                self.average_duration = 0.8 * self.average_duration + 0.2 * elapsed
+                self._condition.notify()
+
+    def stats(self) -> Dict[str, Any]:
+        """Current queue state."""
+        with self._condition:
+            return {
+                'active': self.active,
+                'waiting': self.waiting,
+                'max_concurrent': self.max_concurrent,
+                'max_queue': self.max_queue,
+                'admitted': self.admitted,
+                'rejected': self.rejected,
+                'average_duration': round(self.average_duration, 3),
+                'estimated_wait': round(self.estimated_wait(), 3)
+            }
+
+
+# Global admission queue (one per worker process)
+_admission_queue: Optional[AdmissionQueue] = None
+_admission_lock = threading.Lock()
+
+
+def get_admission_queue() -> AdmissionQueue:
+    """Get global admission queue."""
+    global _admission_queue
+    if _admission_queue is None:
+        with _admission_lock:
+            if _admission_queue is None:
+                settings = load_config().get('server', {}).get('admission', {})
+                _admission_queue = AdmissionQueue(
+                    max_concurrent=settings.get('max_concurrent', 2),
+                    max_queue=settings.get('max_queue', 4),
+                    queue_timeout=settings.get('queue_timeout', 30),
+                    initial_estimate=settings.get('initial_estimate', 10)
+                )
+    return _admission_queue
+
+
+def admission_controlled(view):
+    """Decorator running a Flask view inside the admission queue."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        with get_admission_queue().admit():
+            return view(*args, **kwargs)
+    return wrapper
+
+
+def client_disconnected(environ: Dict[str, Any]) -> bool:
+    """
+    Whether the client of a gunicorn request has closed its connection.
+
+    Peeks at the request socket without blocking: readable with no data
+    means the peer sent FIN. Always False outside gunicorn.
+
+    Args:
+        environ: WSGI environ of the request
+    """
+    sock = environ.get('gunicorn.socket')
+    if sock is None:
+        return False
+    try:
+        readable, _, _ = select.select([sock], [], [], 0)
+        return bool(readable) and sock.recv(1, socket.MSG_PEEK) == b''
+    except (OSError, ValueError):
+        return True
+
+
+@dataclass
+class ServerOptions:
+    """Startup options for the production server."""
+    host: str = '0.0.0.0'
+    port: int = 5000
+    workers: int = 0  # 0 = 2 x CPU + 1
+    threads: int = 8
+    timeout: int = 300
+    graceful_timeout: int = 60
+    keepalive: int = 5
+    max_requests: int = 1000
+    max_requests_jitter: int = 100
+    preload: bool = False
+    access_log: bool = True
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any] = None, **overrides) -> 'ServerOptions':
+        """
+        Build options from the `server` config section.
+
+        Args:
+            config: Application config (loaded if omitted)
+            **overrides: Values that win over the config, None is ignored
+
+        Returns:
+            ServerOptions
+
+        Raises:
+            ValueError: If admitted and queued requests and job event
+                streams could take every thread of a worker
+        """
+        if config is None:
+            config = load_config()
+        settings = config.get('server', {})
+        known = {f.name for f in fields(cls)}
+        values = {k: v for k, v in settings.items() if k in known}
+        values.update({k: v for k, v in overrides.items() if v is not None})
+        options = cls(**values)
+
+        # Each admitted or queued request and each job event stream holds a gthread
+        # thread. The queue must be able to fill (so extra requests get a 429 instead
+        # of waiting in the socket backlog) with threads left for cheap endpoints
+        admission = settings.get('admission', {})
+        held = admission.get('max_concurrent', 2) + admission.get('max_queue', 4)
+        held += config.get('jobs', {}).get('max_subscribers', 1)
+        if held >= options.threads:
+            raise ValueError(
+                f"server.threads ({options.threads}) must exceed admission max_concurrent + max_queue "
+                f"+ jobs.max_subscribers ({held})"
+            )
+        return options
+
+    @property
+    def worker_count(self) -> int:
+        return self.workers or multiprocessing.cpu_count() * 2 + 1
+
+    def gunicorn_settings(self) -> Dict[str, Any]:
+        """Options in gunicorn's setting names."""
+        return {
+            'bind': f"{self.host}:{self.port}",
+            'workers': self.worker_count,
+            'worker_class': 'gthread',
+            'threads': self.threads,
+            'timeout': self.timeout,
+            'graceful_timeout': self.graceful_timeout,
+            'keepalive': self.keepalive,
+            'max_requests': self.max_requests,
+            'max_requests_jitter': self.max_requests_jitter,
+            'preload_app': self.preload,
+            'accesslog': '-' if self.access_log else None,
+            'errorlog': '-'
+        }
+
+
+def serve(options: ServerOptions = None, app_uri: str = 'web_ui:app'):
+    """
+    Run the web UI under gunicorn with pre-forked, threaded workers.
+
+    The master process handles SIGHUP (reload config and code, replacing
+    workers gracefully) and SIGTERM (stop accepting and drain in-flight
+    requests for up to graceful_timeout seconds). Unless preload is set,
+    the app is imported in each worker so a reload picks up new code.
+
+    Args:
+        options: Server options (from config if omitted)
+        app_uri: WSGI application as 'module:attribute'
+    """
+    from gunicorn.app.base import BaseApplication
+    from gunicorn.util import import_app
+
+    if options is None:
+        options = ServerOptions.from_config()
+
+    class Application(BaseApplication):
+        def load_config(self):
+            for key, value in options.gunicorn_settings().items():
+                if value is not None:
+                    self.cfg.set(key, value)
+
+        def load(self):
+            return import_app(app_uri)
+
+    Application().run()
@@ -0,0 +1,346 @@
+"""
+Shared Metrics Module
+Memory-mapped metrics file shared by all worker processes.
+
+Each process owns one slot and publishes its absolute totals there (it is
+the only writer, so no cross-process lock is needed on the update path; a
+per-slot sequence number lets readers skip torn reads). Readers sum every
+slot. When a worker dies, its totals are folded into the reserved slot 0
+and its slot is freed, so counters never go backwards. A slot records the
+owner's start time next to its pid: after a container restart the same
+pids come back, and only the start time tells the old owners are gone.
+
+File layout (little endian):
+    header   magic, version, slots, series per slot, buckets
+    slot     seq, pid, process start time, heartbeat, series used, then `series per slot` entries
+    entry    key (JSON [name, labels]), kind, count, sum, bucket counts
+"""
+
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+from src.rule_metrics import LatencyHistogram
+
+try:
+    import fcntl
+except ImportError:  # not on Windows; SharedMetrics.open() returns None
+    fcntl = None
+
+
+MAGIC = b'DIGMETR1'
+VERSION = 2
+
+HEADER = struct.Struct('<8sIIII')  # magic, version, slots, series, buckets
+HEADER_SIZE = 64
+SLOT_HEADER = struct.Struct('<qqqdI')  # seq, pid, start, heartbeat, used
+SLOT_HEADER_SIZE = 48
+KEY_SIZE = 112
+ENTRY_HEADER = struct.Struct(f'<{KEY_SIZE}sB7xqd')  # key, kind, count, sum
+
+COUNTER = 1
+HISTOGRAM = 2
+
+RETIRED_SLOT = 0
+
+# Same shape as the collector's (name, labels) keys
+MetricKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+def _encode_key(key: MetricKey) -> Optional[bytes]:
+    name, labels = key
+    data = json.dumps([name, [list(pair) for pair in labels]], separators=(',', ':')).encode('utf-8')
+    return data if len(data) <= KEY_SIZE else None
+
+
+def _decode_key(data: bytes) -> MetricKey:
+    name, labels = json.loads(data.rstrip(b'\0').decode('utf-8'))
+    return name, tuple(tuple(pair) for pair in labels)
+
+
+def _process_start(pid: int) -> int:
+    """Start time of a process in clock ticks since boot (0 where /proc is unavailable)."""
+    try:
+        with open(f'/proc/{pid}/stat', 'rb') as f:
+            stat = f.read()
+    except OSError:
+        return 0
+    # The command name may contain spaces or ')'; starttime is the 20th field after it
+    try:
+        return int(stat[stat.rindex(b')') + 2:].split()[19])
+    except (ValueError, IndexError):
+        return 0
+
+
+def _process_alive(pid: int, start: int) -> bool:
+    """Whether the process that claimed a slot still runs (not just a process with its pid)."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return not start or _process_start(pid) in (start, 0)
+
+
+class SharedMetrics:
+    """Per-process slots in a memory-mapped metrics file."""
+
+    def __init__(self, path: str, buffer: mmap.mmap, fd: int, slots: int, series: int,
+                 bounds: Tuple[float, ...]):
+        self.path = path
+        self.slots = slots
+        self.series = series
+        self.bounds = bounds
+        self.dropped = 0  # series that did not fit into the slot
+        self._buffer = buffer
+        self._fd = fd
+        self._fd_pid = os.getpid()
+        self._entry_size = ENTRY_HEADER.size + 8 * (len(bounds) + 1)
+        self._slot_size = SLOT_HEADER_SIZE + series * self._entry_size
+        self._lock = threading.Lock()
+        self._slot: Optional[int] = None
+        self._slot_pid: Optional[int] = None
+        self._start = 0  # this process's start time, recorded in its slot
+        self._entries: Dict[MetricKey, Tuple[int, bytes]] = {}  # series -> (entry index, encoded key)
+        self._seq = 0
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        self._lock = threading.Lock()  # may have been held by another thread of the parent
+
+    @classmethod
+    def open(cls, path: str, slots: int = 32, series: int = 256,
+             bounds: Tuple[float, ...] = ()) -> Optional['SharedMetrics']:
+        """
+        Open (creating or re-initializing on a layout change) the shared file.
+
+        Args:
+            path: Metrics file path
+            slots: Worker slots (slot 0 is reserved for dead workers' totals)
+            series: Series each slot can hold
+            bounds: Histogram bucket bounds shared by all histograms
+
+        Returns:
+            SharedMetrics, or None where fcntl/mmap sharing is unavailable
+        """
+        if fcntl is None:
+            return None
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        slots += 1
+        entry_size = ENTRY_HEADER.size + 8 * (len(bounds) + 1)
+        size = HEADER_SIZE + slots * (SLOT_HEADER_SIZE + series * entry_size)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                header = os.pread(fd, HEADER.size, 0)
+                expected = HEADER.pack(MAGIC, VERSION, slots, series, len(bounds))
+                if header != expected or os.fstat(fd).st_size != size:
+                    os.ftruncate(fd, 0)
+                    os.ftruncate(fd, size)
+                    os.pwrite(fd, expected, 0)
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            buffer = mmap.mmap(fd, size)
+        except OSError:
+            os.close(fd)
+            raise
+        return cls(path, buffer, fd, slots, series, bounds)
+
+    @contextmanager
+    def _file_lock(self):
+        """Exclusive lock for slot allocation and folding."""
+        if self._fd_pid != os.getpid():
+            # flock belongs to the open file description, which a forked worker shares with its parent
+            self._fd = os.open(self.path, os.O_RDWR)
+            self._fd_pid = os.getpid()
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _slot_offset(self, slot: int) -> int:
+        return HEADER_SIZE + slot * self._slot_size
+
+    def _entry_offset(self, slot: int, index: int) -> int:
+        return self._slot_offset(slot) + SLOT_HEADER_SIZE + index * self._entry_size
+
+    def _read_slot_header(self, slot: int) -> Tuple[int, int, int, float, int]:
+        return SLOT_HEADER.unpack_from(self._buffer, self._slot_offset(slot))
+
+    def _write_slot_header(self, slot: int, seq: int, pid: int, start: int, heartbeat: float, used: int):
+        SLOT_HEADER.pack_into(self._buffer, self._slot_offset(slot), seq, pid, start, heartbeat, used)
+
+    def _read_entries(self, slot: int, used: int) -> List[Tuple[bytes, int, int, float, Tuple[int, ...]]]:
+        buckets = struct.Struct(f'<{len(self.bounds) + 1}q')
+        entries = []
+        for index in range(min(used, self.series)):
+            offset = self._entry_offset(slot, index)
+            key, kind, count, total = ENTRY_HEADER.unpack_from(self._buffer, offset)
+            counts = buckets.unpack_from(self._buffer, offset + ENTRY_HEADER.size) if kind == HISTOGRAM else ()
+            entries.append((key, kind, count, total, counts))
+        return entries
+
+    def _write_entry(self, slot: int, index: int, key: bytes, kind: int, count: int,
+                     total: float = 0.0, counts: Tuple[int, ...] = ()):
+        offset = self._entry_offset(slot, index)
+        ENTRY_HEADER.pack_into(self._buffer, offset, key, kind, count, total)
+        if kind == HISTOGRAM:
+            struct.pack_into(f'<{len(counts)}q', self._buffer, offset + ENTRY_HEADER.size, *counts)
+
+    def _fold(self, slot: int):
+        """Add a dead slot's totals to the retired slot and free it (file lock held)."""
+        used = self._read_slot_header(slot)[4]
+        retired_seq, _, _, _, retired_used = self._read_slot_header(RETIRED_SLOT)
+        retired = self._read_entries(RETIRED_SLOT, retired_used)
+        index = {entry[0]: i for i, entry in enumerate(retired)}
+
+        self._write_slot_header(RETIRED_SLOT, retired_seq + 1, 0, 0, time.time(), retired_used)
+        for key, kind, count, total, counts in self._read_entries(slot, used):
+            if key in index:
+                _, _, old_count, old_total, old_counts = retired[index[key]]
+                counts = tuple(a + b for a, b in zip(old_counts, counts)) if kind == HISTOGRAM else ()
+                self._write_entry(RETIRED_SLOT, index[key], key, kind, old_count + count, old_total + total, counts)
+            elif retired_used < self.series:
+                self._write_entry(RETIRED_SLOT, retired_used, key, kind, count, total, counts)
+                index[key] = retired_used
+                retired_used += 1
+            else:
+                self.dropped += 1
+        # Freed while the retired slot is odd, so a reader that saw the folded totals
+        # cannot also count the old slot (see read)
+        self._write_slot_header(slot, 0, 0, 0, 0.0, 0)
+        self._write_slot_header(RETIRED_SLOT, retired_seq + 2, 0, 0, time.time(), retired_used)
+
+    def cleanup(self) -> int:
+        """
+        Fold and free the slots of workers that are no longer running.
+
+        Returns:
+            Number of slots freed
+        """
+        owners = [self._read_slot_header(slot)[1:3] for slot in range(1, self.slots)]
+        if all(not pid or _process_alive(pid, start) for pid, start in owners):
+            return 0
+        freed = 0
+        with self._file_lock():
+            for slot in range(1, self.slots):
+                _, pid, start, _, _ = self._read_slot_header(slot)
+                if pid and not _process_alive(pid, start):  # re-check under the lock
+                    self._fold(slot)
+                    freed += 1
+        return freed
+
+    def _own_slot(self) -> Optional[int]:
+        """This process's slot, claimed on first use (after any fork)."""
+        pid = os.getpid()
+        if self._slot_pid == pid:
+            return self._slot
+        self._slot, self._slot_pid, self._entries, self._seq = None, pid, {}, 0
+        self._start = _process_start(pid)
+        self.cleanup()
+        with self._file_lock():
+            for slot in range(1, self.slots):
+                if self._read_slot_header(slot)[1] == 0:
+                    self._write_slot_header(slot, 0, pid, self._start, time.time(), 0)
+                    self._slot = slot
+                    break
+        return self._slot
+
+    def publish(self, counters: Dict[MetricKey, int], histograms: Dict[MetricKey, LatencyHistogram]) -> bool:
+        """
+        Write this process's totals into its slot.
+
+        Args:
+            counters: Absolute counter values
+            histograms: Absolute histograms (with the shared bounds)
+
+        Returns:
+            False if no slot is free (the process then only sees itself)
+        """
+        with self._lock:
+            slot = self._own_slot()
+            if slot is None:
+                return False
+            pid = os.getpid()
+            used = len(self._entries)
+            self._seq += 1
+            self._write_slot_header(slot, self._seq, pid, self._start, time.time(), used)  # odd: writing
+            series = [(key, COUNTER, value, 0.0, ()) for key, value in counters.items()]
+            series += [
+                (key, HISTOGRAM, h.count, h.total_ms, tuple(h.counts))
+                for key, h in histograms.items() if tuple(h.bounds) == tuple(self.bounds)
+            ]
+            for key, kind, count, total, counts in series:
+                entry = self._entries.get(key)
+                if entry is None:
+                    encoded = _encode_key(key)
+                    if encoded is None or used >= self.series:
+                        self.dropped += 1
+                        continue
+                    entry = self._entries[key] = (used, encoded)
+                    used += 1
+                self._write_entry(slot, entry[0], entry[1], kind, count, total, counts)
+            self._seq += 1
+            self._write_slot_header(slot, self._seq, pid, self._start, time.time(), used)  # even: consistent
+            return True
+
+    def read(self) -> Tuple[Dict[MetricKey, int], Dict[MetricKey, LatencyHistogram], Dict]:
+        """
+        Sum all slots, folding those of dead workers first.
+
+        Returns:
+            (counters, histograms, info) where info lists the live workers
+        """
+        self.cleanup()
+        for _ in range(10):
+            retired_seq = self._read_slot_header(RETIRED_SLOT)[0]
+            totals = self._sum_slots()
+            # A fold during the sum could have moved a worker's totals past us
+            # (counted twice or not at all); it always changes the retired seq
+            if retired_seq % 2 == 0 and self._read_slot_header(RETIRED_SLOT)[0] == retired_seq:
+                return totals
+            time.sleep(0.0001)
+        with self._file_lock():
+            return self._sum_slots()
+
+    def _sum_slots(self) -> Tuple[Dict[MetricKey, int], Dict[MetricKey, LatencyHistogram], Dict]:
+        counters: Dict[MetricKey, int] = {}
+        histograms: Dict[MetricKey, LatencyHistogram] = {}
+        workers = []
+        for slot in range(self.slots):
+            entries = None
+            for _ in range(10):
+                seq, pid, _, heartbeat, used = self._read_slot_header(slot)
+                if seq % 2:
+                    time.sleep(0.0001)
+                    continue
+                entries = self._read_entries(slot, used)
+                if self._read_slot_header(slot)[0] == seq:
+                    break
+                entries = None
+            if not entries:
+                continue
+            if slot != RETIRED_SLOT:
+                workers.append({'pid': pid, 'slot': slot, 'heartbeat': heartbeat, 'series': used})
+            for key, kind, count, total, counts in entries:
+                metric = _decode_key(key)
+                if kind == COUNTER:
+                    counters[metric] = counters.get(metric, 0) + count
+                elif kind == HISTOGRAM:
+                    histogram = histograms.get(metric)
+                    if histogram is None:
+                        histogram = histograms[metric] = LatencyHistogram(bounds=self.bounds)
+                    for index, bucket in enumerate(counts):
+                        histogram.counts[index] += bucket
+                    histogram.count += count
+                    histogram.total_ms += total
+        return counters, histograms, {'workers': workers, 'dropped_series': self.dropped}
@@ -0,0 +1,240 @@
+"""
+Stage Graph Module
+Builds the multi-stage build DAG and finds unused stages, the critical path and parallel stages.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from src.syntax_validator import Instruction
+
+
+# Relative build cost per instruction; RUN steps dominate real build time
+INSTRUCTION_COST = {'RUN': 10, 'ADD': 3, 'COPY': 2}
+DEFAULT_COST = 1
+
+# A critical-path stage with at least this many RUN steps and this share
+# of the path cost is a candidate for splitting
+MONOLITH_MIN_RUNS = 3
+MONOLITH_MIN_SHARE = 0.5
+
+COPY_FROM = re.compile(r'(?:^|\s)--from=(\S+)')
+MOUNT_FROM = re.compile(r'(?:^|\s)--mount=\S*?\bfrom=([^,\s]+)')
+
+
+@dataclass
+class Stage:
+    """One FROM block."""
+    index: int
+    name: Optional[str]
+    base: str
+    line_number: int
+    end_line: int
+    parent: Optional[int] = None  # stage this one is built FROM
+    copies_from: List[int] = field(default_factory=list)
+    external_copies: List[str] = field(default_factory=list)
+    runs: int = 0
+    cost: int = DEFAULT_COST
+
+    @property
+    def label(self) -> str:
+        return self.name or f"#{self.index}"
+
+    @property
+    def dependencies(self) -> List[int]:
+        deps = [self.parent] if self.parent is not None else []
+        return deps + [d for d in self.copies_from if d not in deps]
+
+
+@dataclass
+class StageGraph:
+    """Multi-stage build analysis."""
+    stages: List[Stage]
+    target: Optional[int]
+    unreachable: List[int]
+    critical_path: List[int]
+    critical_cost: int
+    parallel_groups: List[List[int]]
+    suggestions: List[str]
+
+    def to_dict(self) -> Dict:
+        """Serialize for API responses."""
+        label = lambda index: self.stages[index].label
+        return {
+            'stages': [
+                {
+                    'index': s.index,
+                    'name': s.name,
+                    'base': s.base,
+                    'line': s.line_number,
+                    'end_line': s.end_line,
+                    'depends_on': [label(d) for d in s.dependencies],
+                    'cost': s.cost
+                }
+                for s in self.stages
+            ],
+            'target': label(self.target) if self.target is not None else None,
+            'unreachable': [label(i) for i in self.unreachable],
+            'critical_path': [label(i) for i in self.critical_path],
+            'critical_cost': self.critical_cost,
+            'parallel_groups': [[label(i) for i in group] for group in self.parallel_groups],
+            'suggestions': self.suggestions
+        }
+
+
+def _from_parts(arguments: str):
+    """(image, alias) of a FROM instruction, ignoring --platform and other flags."""
+    words = [w for w in arguments.split() if not w.startswith('--')]
+    image = words[0] if words else ''
+    alias = words[2] if len(words) >= 3 and words[1].upper() == 'AS' else None
+    return image, alias
+
+
+def _resolve(reference: str, names: Dict[str, int], count: int) -> Optional[int]:
+    """Earlier stage referenced by name or index, else None (an external image)."""
+    reference = reference.lower()
+    if reference in names:
+        return names[reference]
+    if reference.isdigit() and int(reference) < count:
+        return int(reference)
+    return None
+
+
+def build_stages(instructions: List[Instruction]) -> List[Stage]:
+    """
+    Split instructions into stages and resolve stage references.
+
+    Args:
+        instructions: Parsed instructions
+
+    Returns:
+        Stages in file order
+    """
+    stages: List[Stage] = []
+    names: Dict[str, int] = {}
+    for instruction in instructions:
+        name = instruction.instruction
+        if name == 'FROM':
+            image, alias = _from_parts(instruction.arguments)
+            stage = Stage(len(stages), alias, image, instruction.line_number, instruction.end_line)
+            stage.parent = _resolve(image, names, len(stages))
+            if alias:
+                names[alias.lower()] = stage.index
+            stages.append(stage)
+            continue
+        if not stages:
+            continue  # global ARGs before the first FROM
+
+        stage = stages[-1]
+        stage.end_line = instruction.end_line
+        stage.cost += INSTRUCTION_COST.get(name, DEFAULT_COST)
+        if name == 'RUN':
+            stage.runs += 1
+            references = MOUNT_FROM.findall(instruction.arguments)
+        elif name in ('COPY', 'ADD'):
+            references = COPY_FROM.findall(instruction.arguments)
+        else:
+            continue
+        for reference in references:
+            source = _resolve(reference, names, stage.index)
+            if source == stage.index:
+                source = None  # a stage cannot copy from itself; keep the cycle out of the DAG
+            if source is None:
+                stage.external_copies.append(reference)
+            elif source not in stage.copies_from:
+                stage.copies_from.append(source)
+    return stages
+
+
+def analyze_stages(instructions: List[Instruction], target: str = None) -> StageGraph:
+    """
+    Analyze the stage DAG of a Dockerfile in one pass over its instructions.
+
+    Args:
+        instructions: Parsed instructions
+        target: Build target stage name (defaults to the last stage)
+
+    Returns:
+        StageGraph with unreachable stages, the critical path, stages that
+        BuildKit can build in parallel and splitting suggestions
+    """
+    stages = build_stages(instructions)
+    if not stages:
+        return StageGraph(stages, None, [], [], 0, [], [])
+
+    names = {s.name.lower(): s.index for s in stages if s.name}
+    target_index = names.get(target.lower(), len(stages) - 1) if target else len(stages) - 1
+
+    # Dependencies always point to earlier stages, so index order is topological
+    reachable = {target_index}
+    for stage in reversed(stages[:target_index + 1]):
+        if stage.index in reachable:
+            reachable.update(stage.dependencies)
+    unreachable = [s.index for s in stages if s.index not in reachable]
+
+    finish: Dict[int, int] = {}
+    via: Dict[int, Optional[int]] = {}
+    level: Dict[int, int] = {}
+    for stage in stages:
+        if stage.index not in reachable:
+            continue
+        deps = stage.dependencies
+        slowest = max(deps, key=lambda d: finish[d], default=None)
+        finish[stage.index] = stage.cost + (finish[slowest] if slowest is not None else 0)
+        via[stage.index] = slowest
+        level[stage.index] = 1 + max((level[d] for d in deps), default=-1)
+
+    path = []
+    node = target_index
+    while node is not None:
+        path.append(node)
+        node = via[node]
+    path.reverse()
+
+    groups: Dict[int, List[int]] = {}
+    for index in sorted(reachable):
+        groups.setdefault(level[index], []).append(index)
+    parallel = [group for _, group in sorted(groups.items()) if len(group) > 1]
+
+    critical_cost = finish[target_index]
+    suggestions = []
+    for index in unreachable:
+        stage = stages[index]
+        suggestions.append(
+            f"Stage '{stage.label}' (line {stage.line_number}) is not used by target "
+            f"'{stages[target_index].label}'; BuildKit skips it but the legacy builder still builds it"
+        )
+    for group in parallel:
+        labels = ', '.join(f"'{stages[i].label}'" for i in group)
+        suggestions.append(f"Stages {labels} are independent and build in parallel with BuildKit")
+    for index in path:
+        stage = stages[index]
+        share = stage.cost / critical_cost
+        if stage.runs >= MONOLITH_MIN_RUNS and share >= MONOLITH_MIN_SHARE:
+            # Two independent halves built in parallel save about half the stage
+            saving = stage.cost // 2
+            suggestions.append(
+                f"Stage '{stage.label}' (lines {stage.line_number}-{stage.end_line}) is {share:.0%} of the "
+                f"critical path with {stage.runs} RUN steps; splitting independent steps into parallel "
+                f"stages joined with COPY --from could cut the path from {critical_cost} to about "
+                f"{critical_cost - saving} cost units"
+            )
+
+    return StageGraph(stages, target_index, unreachable, path, critical_cost, parallel, suggestions)
+
+
+def format_stage_report(graph: StageGraph) -> str:
+    """Format stage analysis for the CLI validation report."""
+    if len(graph.stages) < 2 and not graph.suggestions:
+        return ''
+    label = lambda index: graph.stages[index].label
+    report = "\n--- BUILD STAGES ---\n"
+    for stage in graph.stages:
+        deps = ', '.join(label(d) for d in stage.dependencies) or stage.base
+        marker = ' (unused)' if stage.index in graph.unreachable else ''
+        report += f"  {stage.label}: line {stage.line_number}, cost {stage.cost}, from {deps}{marker}\n"
+    report += f"Critical path: {' -> '.join(label(i) for i in graph.critical_path)} ({graph.critical_cost} units)\n"
+    for suggestion in graph.suggestions:
+        report += f"• {suggestion}\n"
+    return report
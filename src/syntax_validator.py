@@ -3,16 +3,42 @@ Syntax Validator Module
 Parses and validates Dockerfile syntax.
 """
 
-from dataclasses import dataclass
-from typing import List
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
 
-@dataclass
+@dataclass(slots=True)
+class Heredoc:
+    """Here-document body attached to an instruction."""
+    delimiter: str
+    content: str
+    line_number: int  # line of the first body line
+    end_line: int  # line of the terminating delimiter
+    terminated: bool = True
+
+
+@dataclass(slots=True)
 class Instruction:
-    """Dockerfile instruction."""
+    """Dockerfile instruction spanning lines line_number..end_line."""
     line_number: int
     instruction: str
     arguments: str
+    end_line: int = 0
+    heredocs: Tuple[Heredoc, ...] = ()
+    json_args: Optional[Tuple[str, ...]] = None  # exec (JSON array) form
+
+    def shifted(self, delta: int) -> 'Instruction':
+        """Copy with every line number moved by delta."""
+        return Instruction(
+            self.line_number + delta, self.instruction, self.arguments, self.end_line + delta,
+            tuple(
+                Heredoc(h.delimiter, h.content, h.line_number + delta, h.end_line + delta, h.terminated)
+                for h in self.heredocs
+            ),
+            self.json_args
+        )
 
 
 @dataclass
@@ -21,6 +47,7 @@ class ParsedDockerfile:
     instructions: List[Instruction]
     valid: bool
     errors: List[str]
+    directives: Dict[str, str] = field(default_factory=dict)
 
 
 @dataclass
@@ -37,60 +64,275 @@ VALID_INSTRUCTIONS = {
     'VOLUME', 'ONBUILD', 'STOPSIGNAL', 'SHELL'
 }
 
+# Parser directives are only honoured before the first comment, blank line or instruction
+DIRECTIVE = re.compile(r'^#\s*(syntax|escape|check)\s*=\s*(\S*)\s*$', re.IGNORECASE)
+
+ESCAPE_CHARS = {'\\', '`'}
+
+HEREDOC_INSTRUCTIONS = {'RUN', 'COPY', 'ADD'}
+
+HEREDOC_MARKER = re.compile(r'(?<!<)<<(-?)(["\']?)([A-Za-z_][A-Za-z0-9_.-]*)\2')
+
+LEADING_FLAGS = re.compile(r'^(?:--\S+\s+)*')
+
+
+def _json_args(arguments: str) -> Optional[Tuple[str, ...]]:
+    """Exec-form arguments, or None for shell form."""
+    rest = arguments[LEADING_FLAGS.match(arguments).end():]
+    if not rest.startswith('['):
+        return None
+    try:
+        value = json.loads(rest)
+    except ValueError:
+        return None
+    if isinstance(value, list) and all(isinstance(item, str) for item in value):
+        return tuple(value)
+    return None
+
+
+class DockerfileTokenizer:
+    """
+    Single-pass, line-at-a-time Dockerfile tokenizer.
+
+    Feed physical lines in order with `feed` and call `close` at the end;
+    each returns the instruction it completed, if any (a line completes at
+    most one). Handles parser directives, the escape character, line
+    continuations (comment and blank lines inside a continuation are
+    skipped, as in BuildKit), heredocs and exec form.
+    """
+
+    def __init__(self, escape: str = '\\', directives: bool = True):
+        """
+        Initialize tokenizer.
+
+        Args:
+            escape: Escape character used when no `# escape=` directive is present
+            directives: Whether leading comments may be parser directives
+                (False when tokenizing from the middle of a file)
+        """
+        self.escape = escape
+        self.directives: Dict[str, str] = {}
+        self.errors: List[str] = []
+        self.directive_errors: List[str] = []
+        self.line_number = 0
+        self._directives_open = directives
+        self._start = 0
+        self._last = 0
+        self._parts: Optional[List[str]] = None
+        self._pending: Optional[Instruction] = None
+        self._heredocs: List[Tuple[str, bool, List[str], int]] = []
+        self._done: List[Heredoc] = []
+
+    @property
+    def pending(self) -> bool:
+        """Whether an instruction is still open (continuation or heredoc)."""
+        return self._parts is not None or self._pending is not None
+
+    def feed(self, line: str) -> Optional[Instruction]:
+        """
+        Consume one physical line.
+
+        Args:
+            line: Line with or without its trailing newline
+
+        Returns:
+            The instruction completed by this line, if any
+        """
+        self.line_number += 1
+
+        if self._pending is not None:
+            return self._heredoc_line(line.rstrip('\r\n'))
+
+        stripped = line.strip()
+        if self._parts is None:
+            if self._directives_open:
+                match = DIRECTIVE.match(stripped)
+                if match and match.group(1).lower() not in self.directives:
+                    self._directive(match.group(1).lower(), match.group(2))
+                    return None
+                self._directives_open = False
+            if not stripped or stripped[0] == '#':
+                return None
+            self._last = self._start = self.line_number
+            if stripped.endswith(self.escape):
+                self._parts = [stripped[:-1].strip()]
+                return None
+            return self._instruction(stripped)
+        if not stripped or stripped[0] == '#':
+            return None
+
+        self._last = self.line_number
+        if stripped.endswith(self.escape):
+            self._parts.append(stripped[:-1].strip())
+            return None
+        self._parts.append(stripped)
+        return self._finish_line()
+
+    def feed_lines(self, lines: Iterable[str]) -> List[Instruction]:
+        """Consume many lines; returns the instructions they completed."""
+        return [instruction for instruction in map(self.feed, lines) if instruction is not None]
+
+    def close(self) -> Optional[Instruction]:
+        """
+        Flush an instruction left open at end of input.
+
+        Returns:
+            The unfinished instruction, if any
+        """
+        instruction = self._finish_line() if self._parts is not None else None
+        if self._pending is None:
+            return instruction
+        end_line = self._pending.line_number
+        for delimiter, _, body, start in self._heredocs:
+            # Trailing blank lines at end of input are not part of the body
+            while body and not body[-1].strip():
+                body.pop()
+            end_line = max(end_line, start + len(body) - 1)
+            self._done.append(Heredoc(delimiter, _join_body(body), start, start + len(body) - 1, False))
+        self._heredocs = []
+        return self._emit(end_line)
+
+    def _directive(self, name: str, value: str):
+        self.directives[name] = value
+        if name == 'escape':
+            if value in ESCAPE_CHARS:
+                self.escape = value
+            else:
+                error = f"Line {self.line_number}: Invalid escape character '{value}'"
+                self.directive_errors.append(error)
+                self.errors.append(error)
+
+    def _finish_line(self) -> Optional[Instruction]:
+        text = ' '.join([part for part in self._parts if part])
+        self._parts = None
+        return self._instruction(text) if text else None
+
+    def _instruction(self, text: str) -> Optional[Instruction]:
+        words = text.split(None, 1)
+        name = words[0].upper()
+        arguments = words[1] if len(words) > 1 else ''
+
+        self._pending = Instruction(
+            self._start, name, arguments, self._last, (),
+            _json_args(arguments) if '[' in arguments else None
+        )
+        if name in HEREDOC_INSTRUCTIONS and '<<' in arguments:
+            for strip_tabs, _, delimiter in HEREDOC_MARKER.findall(arguments):
+                self._heredocs.append((delimiter, bool(strip_tabs), [], self._last + 1))
+        if self._heredocs:
+            return None
+        return self._emit(self._last)
+
+    def _heredoc_line(self, raw: str) -> Optional[Instruction]:
+        delimiter, strip_tabs, body, start = self._heredocs[0]
+        if strip_tabs:
+            raw = raw.lstrip('\t')
+        if raw != delimiter:
+            body.append(raw)
+            return None
+        self._done.append(Heredoc(delimiter, _join_body(body), start, self.line_number))
+        self._heredocs.pop(0)
+        if self._heredocs:
+            # The next body starts after this terminator
+            next_delimiter, next_strip, next_body, _ = self._heredocs[0]
+            self._heredocs[0] = (next_delimiter, next_strip, next_body, self.line_number + 1)
+            return None
+        return self._emit(self.line_number)
+
+    def _emit(self, end_line: int) -> Instruction:
+        instruction = self._pending
+        instruction.end_line = end_line
+        if self._done:
+            instruction.heredocs = tuple(self._done)
+            self._done = []
+        self._pending = None
+        if instruction.heredocs or instruction.instruction not in VALID_INSTRUCTIONS:
+            self.errors.extend(instruction_errors(instruction))
+        return instruction
+
+
+def instruction_errors(instruction: Instruction) -> List[str]:
+    """Syntax errors of a single instruction."""
+    errors = []
+    if instruction.instruction not in VALID_INSTRUCTIONS:
+        errors.append(f"Line {instruction.line_number}: Invalid instruction '{instruction.instruction}'")
+    for heredoc in instruction.heredocs:
+        if not heredoc.terminated:
+            errors.append(f"Line {instruction.line_number}: Unterminated heredoc '{heredoc.delimiter}'")
+    return errors
+
+
+def _join_body(lines: List[str]) -> str:
+    return '\n'.join(lines) + '\n' if lines else ''
+
+
+def iter_instructions(lines: Iterable[str], escape: str = '\\') -> Iterator[Instruction]:
+    """
+    Stream instructions from any iterable of lines, e.g. an open file.
+
+    Args:
+        lines: Physical lines in order
+        escape: Escape character when the input has no escape directive
+
+    Yields:
+        Instructions as soon as each one is complete
+    """
+    tokenizer = DockerfileTokenizer(escape)
+    feed = tokenizer.feed
+    for line in lines:
+        instruction = feed(line)
+        if instruction is not None:
+            yield instruction
+    instruction = tokenizer.close()
+    if instruction is not None:
+        yield instruction
+
+
+def parse_lines(lines: Iterable[str], escape: str = '\\') -> ParsedDockerfile:
+    """
+    Parse a Dockerfile from an iterable of lines in a single pass.
+
+    Args:
+        lines: Physical lines in order (a file object works)
+        escape: Escape character when the input has no escape directive
+
+    Returns:
+        ParsedDockerfile object
+    """
+    tokenizer = DockerfileTokenizer(escape)
+    instructions = tokenizer.feed_lines(lines)
+    instruction = tokenizer.close()
+    if instruction is not None:
+        instructions.append(instruction)
+    return ParsedDockerfile(
+        instructions=instructions,
+        valid=len(tokenizer.errors) == 0,
+        errors=tokenizer.errors,
+        directives=tokenizer.directives
+    )
+
 
-def parse_dockerfile(content: str) -> ParsedDockerfile:
+def parse_dockerfile(content: str, escape: str = '\\') -> ParsedDockerfile:
     """
     Parse Dockerfile content.
     
     Args:
         content: Dockerfile content as string
+        escape: Escape character when the content has no escape directive
         
     Returns:
         ParsedDockerfile object
     """
-    instructions = []
-    errors = []
-    lines = content.split('\n')
-    
-    for i, line in enumerate(lines, 1):
-        line = line.strip()
-        
-        # Skip empty lines and comments
-        if not line or line.startswith('#'):
-            continue
-        
-        # Handle line continuations
-        while line.endswith('\\'):
-            if i < len(lines):
-                line = line[:-1] + ' ' + lines[i].strip()
-                i += 1
-        
-        # Parse instruction
-        parts = line.split(None, 1)
-        if not parts:
-            continue
-        
-        instruction = parts[0].upper()
-        arguments = parts[1] if len(parts) > 1 else ''
-        
-        if instruction not in VALID_INSTRUCTIONS:
-            errors.append(f"Line {i}: Invalid instruction '{instruction}'")
-        
-        instructions.append(Instruction(i, instruction, arguments))
-    
-    return ParsedDockerfile(
-        instructions=instructions,
-        valid=len(errors) == 0,
-        errors=errors
-    )
+    return parse_lines(content.split('\n'), escape)
 
 
-def validate_syntax(content: str) -> SyntaxResult:
+def validate_syntax(content: str, parsed: ParsedDockerfile = None) -> SyntaxResult:
     """
     Validate Dockerfile syntax.
     
     Args:
         content: Dockerfile content
+        parsed: Already parsed Dockerfile to reuse instead of parsing again
         
     Returns:
         SyntaxResult with validation details
@@ -98,7 +340,8 @@ def validate_syntax(content: str) -> SyntaxResult:
     errors = []
     warnings = []
     
-    parsed = parse_dockerfile(content)
+    if parsed is None:
+        parsed = parse_dockerfile(content)
     errors.extend(parsed.errors)
     
     if not parsed.instructions:
@@ -0,0 +1,175 @@
+"""
+Template Registry Module
+Preloads prompt templates into memory and hot-reloads them on change.
+"""
+
+import hashlib
+import logging
+import os
+import string
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    """Prompt template loaded into memory."""
+    name: str
+    path: str
+    content: str
+    content_hash: str
+    mtime: float
+
+
+def _default_prompts_dir() -> str:
+    """Get default prompts directory."""
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    project_root = os.path.dirname(current_dir)
+    return os.path.join(project_root, 'config', 'prompts')
+
+
+class TemplateRegistry:
+    """In-memory registry of prompt templates under config/prompts."""
+
+    def __init__(self, prompts_dir: str = None, poll_interval: float = 2.0):
+        """
+        Initialize template registry.
+
+        Args:
+            prompts_dir: Directory containing prompt templates
+            poll_interval: Minimum seconds between mtime checks
+        """
+        self.prompts_dir = prompts_dir or _default_prompts_dir()
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._templates: Dict[str, PromptTemplate] = {}
+        self._signature = ()
+        self._last_check = 0.0
+        self.reload()
+
+    def _scan(self) -> List[tuple]:
+        """Return (name, path, mtime) for every template file."""
+        entries = []
+        for root, dirs, files in os.walk(self.prompts_dir):
+            dirs.sort()
+            for file in sorted(files):
+                if not file.endswith('.txt'):
+                    continue
+                path = os.path.join(root, file)
+                name = os.path.relpath(path, self.prompts_dir)[:-len('.txt')]
+                try:
+                    mtime = os.stat(path).st_mtime
+                except FileNotFoundError:
+                    continue  # deleted while scanning
+                entries.append((name.replace(os.sep, '/'), path, mtime))
+        return entries
+
+    @staticmethod
+    def _read(name: str, path: str, mtime: float) -> PromptTemplate:
+        """
+        Read and check one template.
+
+        Raises:
+            OSError: If the file cannot be read
+            ValueError: If it is not UTF-8 or not a valid format string
+        """
+        with open(path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        list(string.Formatter().parse(content))  # unbalanced braces would fail in build_prompt
+        return PromptTemplate(
+            name=name,
+            path=path,
+            content=content,
+            content_hash=hashlib.sha256(content.encode('utf-8')).hexdigest()[:16],
+            mtime=mtime
+        )
+
+    def reload(self) -> bool:
+        """
+        Reload templates if any file was added, removed or modified.
+
+        A template that was deleted, or that cannot be read or parsed, keeps
+        its previously loaded version (a failed file is retried once it
+        changes again), so a bad edit never breaks prompt building.
+
+        Returns:
+            True if the template set was swapped
+        """
+        entries = self._scan()
+        signature = tuple((name, mtime) for name, _, mtime in entries)
+
+        with self._lock:
+            self._last_check = time.monotonic()
+            if signature == self._signature:
+                return False
+
+            previous = self._templates
+            templates = {}
+            for name, path, mtime in entries:
+                current = previous.get(name)
+                if current is not None and current.mtime == mtime:
+                    templates[name] = current
+                    continue
+                try:
+                    templates[name] = self._read(name, path, mtime)
+                except (OSError, ValueError) as e:
+                    logger.warning("Cannot load prompt template %s (keeping any loaded version): %s", name, e)
+                    if current is not None:
+                        templates[name] = current
+            for name, template in previous.items():
+                if name not in templates:
+                    logger.warning("Prompt template %s was removed; keeping the loaded copy", name)
+                    templates[name] = template
+
+            # Swap the whole mapping so readers never see a partial reload
+            self._templates = templates
+            self._signature = signature
+            return True
+
+    def _maybe_reload(self):
+        """Poll for changes at most once per poll interval."""
+        if time.monotonic() - self._last_check >= self.poll_interval:
+            self.reload()
+
+    def get(self, name: str) -> Optional[PromptTemplate]:
+        """
+        Get template by name (path relative to prompts dir, without .txt).
+
+        Args:
+            name: Template name, e.g. 'python_template'
+
+        Returns:
+            PromptTemplate or None if not found
+        """
+        self._maybe_reload()
+        return self._templates.get(name)
+
+    def names(self) -> List[str]:
+        """Get names of all loaded templates."""
+        self._maybe_reload()
+        return sorted(self._templates)
+
+    def version(self) -> str:
+        """Get combined hash of all loaded templates."""
+        self._maybe_reload()
+        templates = self._templates
+        digest = hashlib.sha256()
+        for name in sorted(templates):
+            digest.update(f"{name}:{templates[name].content_hash}\n".encode('utf-8'))
+        return digest.hexdigest()[:16]
+
+
+# Global template registry
+_template_registry = None
+
+
+def get_template_registry() -> TemplateRegistry:
+    """Get global template registry."""
+    global _template_registry
+    if _template_registry is None:
+        _template_registry = TemplateRegistry()
+    return _template_registry
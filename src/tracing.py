@@ -0,0 +1,230 @@
+"""
+Tracing Module
+Per-request span timings for the generation pipeline.
+
+Code marks stages with `span(name)`; the spans are recorded only while a
+trace is active in the current context (a web request or a CLI run), so
+instrumented code costs one context-variable lookup when tracing is off.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional
+from src.config_loader import load_config
+
+
+REQUEST_ID = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+_current: ContextVar[Optional['Trace']] = ContextVar('trace', default=None)
+_depth: ContextVar[int] = ContextVar('trace_depth', default=0)
+
+
+@dataclass
+class Span:
+    """One timed stage, relative to the start of its trace."""
+    name: str
+    start: float
+    duration: float = 0.0
+    depth: int = 0
+
+
+class _SpanContext:
+    __slots__ = ('trace', 'name', 'span', 'token')
+
+    def __init__(self, trace: 'Trace', name: str):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self) -> Span:
+        trace = self.trace
+        depth = _depth.get()
+        self.span = Span(self.name, time.perf_counter() - trace.started, depth=depth)
+        self.token = _depth.set(depth + 1)
+        trace.spans.append(self.span)
+        return self.span
+
+    def __exit__(self, *exc_info) -> bool:
+        _depth.reset(self.token)
+        self.span.duration = time.perf_counter() - self.trace.started - self.span.start
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc_info) -> bool:
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Trace:
+    """Spans recorded for one request or CLI run (stages may run concurrently)."""
+
+    def __init__(self, name: str, request_id: str = None):
+        """
+        Start a trace.
+
+        Args:
+            name: What is traced, e.g. 'POST /api/generate'
+            request_id: Caller-supplied id (a new one is generated if missing or invalid)
+        """
+        if not request_id or not REQUEST_ID.match(request_id):
+            request_id = uuid.uuid4().hex[:16]
+        self.request_id = request_id
+        self.name = name
+        self.timestamp = time.time()
+        self.started = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.spans: List[Span] = []
+        self.attributes: Dict[str, Any] = {}
+
+    def span(self, name: str) -> _SpanContext:
+        """Context manager timing one stage."""
+        return _SpanContext(self, name)
+
+    def finish(self):
+        """Stop the trace clock (idempotent)."""
+        if self.duration is None:
+            self.duration = time.perf_counter() - self.started
+
+    @property
+    def elapsed(self) -> float:
+        return self.duration if self.duration is not None else time.perf_counter() - self.started
+
+    def server_timing(self) -> str:
+        """Server-Timing header value, one metric per span plus the total."""
+        metrics = [f"{span.name};dur={span.duration * 1000:.1f}" for span in self.spans]
+        metrics.append(f"total;dur={self.elapsed * 1000:.1f}")
+        return ', '.join(metrics)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize for the trace log."""
+        return {
+            'request_id': self.request_id,
+            'name': self.name,
+            'timestamp': self.timestamp,
+            'duration_ms': round(self.elapsed * 1000, 3),
+            'attributes': self.attributes,
+            'spans': [
+                {
+                    'name': span.name,
+                    'start_ms': round(span.start * 1000, 3),
+                    'duration_ms': round(span.duration * 1000, 3),
+                    'depth': span.depth
+                }
+                for span in self.spans
+            ]
+        }
+
+    def format_table(self) -> str:
+        """Stage timings for terminal output."""
+        total = self.elapsed
+        text = f"\n--- TIMINGS ({self.request_id}) ---\n"
+        for span in self.spans:
+            share = span.duration / total if total else 0.0
+            name = '  ' * span.depth + span.name
+            text += f"  {name:<24} {span.duration * 1000:>10.1f} ms  {share:>4.0%}\n"
+        text += f"  {'total':<24} {total * 1000:>10.1f} ms\n"
+        return text
+
+
+def span(name: str):
+    """
+    Time a stage of the current trace.
+
+    Args:
+        name: Stage name (a Server-Timing token: letters, digits, '_', '-', '.')
+
+    Returns:
+        Context manager; a shared no-op when no trace is active
+    """
+    trace = _current.get()
+    if trace is None:
+        return _NOOP_SPAN
+    return _SpanContext(trace, name)
+
+
+def current_trace() -> Optional[Trace]:
+    """Trace active in this context, or None."""
+    return _current.get()
+
+
+def activate(trace: Trace) -> Token:
+    """Make trace current; pass the token to deactivate()."""
+    return _current.set(trace)
+
+
+def deactivate(token: Token):
+    """Restore the trace that was current before activate()."""
+    _current.reset(token)
+
+
+@contextmanager
+def start_trace(name: str, request_id: str = None) -> Iterator[Trace]:
+    """
+    Record spans for the duration of the block.
+
+    Args:
+        name: What is traced
+        request_id: Optional caller-supplied request id
+
+    Yields:
+        The active Trace
+    """
+    trace = Trace(name, request_id)
+    token = activate(trace)
+    try:
+        yield trace
+    finally:
+        trace.finish()
+        deactivate(token)
+
+
+class TraceLog:
+    """Append-only JSON lines file of finished traces."""
+
+    def __init__(self, log_file: str):
+        """
+        Initialize the log.
+
+        Args:
+            log_file: Path of the JSON lines file
+        """
+        self.log_file = log_file
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(log_file) or '.', exist_ok=True)
+
+    def write(self, trace: Trace):
+        """Append one finished trace."""
+        line = json.dumps(trace.to_dict()) + '\n'
+        with self._lock:
+            with open(self.log_file, 'a', encoding='utf-8') as f:
+                f.write(line)
+
+
+# Global trace log (None when no log file is configured)
+_trace_log: Optional[TraceLog] = None
+_trace_log_loaded = False
+
+
+def get_trace_log() -> Optional[TraceLog]:
+    """Get global trace log, or None if tracing.log_file is not set."""
+    global _trace_log, _trace_log_loaded
+    if not _trace_log_loaded:
+        settings = load_config().get('tracing', {})
+        if settings.get('enabled', True) and settings.get('log_file'):
+            _trace_log = TraceLog(settings['log_file'])
+        _trace_log_loaded = True
+    return _trace_log
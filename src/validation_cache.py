@@ -0,0 +1,287 @@
+"""
+Validation Cache Module
+LRU cache of validation results keyed on normalized Dockerfile content.
+"""
+
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from typing import Dict, Optional, Tuple
+
+from src.config_loader import load_config
+from src.image_size import SizeEstimate, estimate_image_size, get_size_table
+from src.rule_engine import CompiledRuleSet, ValidationResult, get_rule_set
+from src.metrics_collector import get_metrics_collector
+from src.rule_metrics import get_rule_metrics
+from src.stage_graph import StageGraph, analyze_stages
+from src.syntax_validator import DIRECTIVE, SyntaxResult, parse_dockerfile, validate_syntax
+
+
+WHITESPACE = re.compile(r'\s+')
+
+# Line references in messages: "line 3", "Line 3:", "lines 3-9", "(line 3, 7)"
+LINE_REFERENCE = re.compile(r'\b([Ll]ines? )(\d+(?:-\d+)?(?:, \d+(?:-\d+)?(?=[,)]))*)')
+NUMBER = re.compile(r'\d+')
+
+
+@dataclass
+class CacheEntry:
+    """Cached validation of one normalized Dockerfile."""
+    etag: str
+    line_map: Tuple[int, ...]
+    syntax_result: SyntaxResult
+    validation_result: ValidationResult
+    stage_graph: StageGraph
+    image_size: SizeEstimate
+    size: int
+
+
+def normalize_dockerfile(content: str) -> Tuple[str, Tuple[int, ...]]:
+    """
+    Normalize whitespace and drop comments and blank lines.
+
+    Parser directives change how the file is read, so the leading directive
+    block is kept; as in the tokenizer it ends at the first blank line,
+    comment, instruction or repeated directive, and directive-like comments
+    after it are dropped like any comment. From the first heredoc marker
+    on, lines are kept verbatim: comments, blank lines and whitespace
+    inside a heredoc body are content.
+
+    Args:
+        content: Dockerfile content
+
+    Returns:
+        (normalized text, original line number of each normalized line)
+    """
+    lines = []
+    line_map = []
+    verbatim = False
+    directives = set()
+    for number, line in enumerate(content.splitlines(), 1):
+        stripped = line.strip()
+        if directives is not None:
+            match = DIRECTIVE.match(stripped)
+            if match and match.group(1).lower() not in directives:
+                directives.add(match.group(1).lower())
+                lines.append(stripped)
+                line_map.append(number)
+                continue
+            directives = None
+        if verbatim or '<<' in line:
+            verbatim = True
+            lines.append(line)
+            line_map.append(number)
+            continue
+        if not stripped or stripped.startswith('#'):
+            continue
+        lines.append(WHITESPACE.sub(' ', stripped))
+        line_map.append(number)
+    return '\n'.join(lines), tuple(line_map)
+
+
+def _remap_entry(entry: CacheEntry, line_map: Tuple[int, ...], etag: str) -> Optional[CacheEntry]:
+    """
+    Copy of an entry with its line numbers moved to another file's line map.
+
+    Both files normalize to the same text, so their line maps pair up line
+    by line; line numbers in results, stages, size items and messages are
+    translated through that pairing.
+
+    Args:
+        entry: Cached entry
+        line_map: Line map of the file being validated
+        etag: ETag for the copy
+
+    Returns:
+        Remapped entry, or None if the entry mentions a line outside its line map
+    """
+    lines = dict(zip(entry.line_map, line_map))
+
+    def number(match: re.Match) -> str:
+        return str(lines[int(match.group())])
+
+    def text(value: str) -> str:
+        return LINE_REFERENCE.sub(lambda m: m.group(1) + NUMBER.sub(number, m.group(2)), value)
+
+    try:
+        syntax = entry.syntax_result
+        validation = entry.validation_result
+        graph = entry.stage_graph
+        size = entry.image_size
+        return replace(
+            entry,
+            etag=etag,
+            line_map=line_map,
+            syntax_result=replace(syntax, errors=[text(e) for e in syntax.errors],
+                                  warnings=[text(w) for w in syntax.warnings]),
+            validation_result=replace(validation, results=[
+                replace(r, message=text(r.message), line=r.line and lines[r.line],
+                        hint=r.hint and text(r.hint))
+                for r in validation.results
+            ]),
+            stage_graph=replace(
+                graph,
+                stages=[replace(s, line_number=lines[s.line_number], end_line=lines[s.end_line])
+                        for s in graph.stages],
+                suggestions=[text(suggestion) for suggestion in graph.suggestions]
+            ),
+            image_size=replace(size, stages=[
+                replace(stage, items=[replace(item, line=lines[item.line]) for item in stage.items])
+                for stage in size.stages
+            ])
+        )
+    except KeyError:
+        return None
+
+
+def _record_hit(validation_result: ValidationResult):
+    """Count a cached validation's outcomes in the rule metrics (its timings were already recorded)."""
+    metrics = get_rule_metrics()
+    if metrics.enabled:
+        untimed = replace(validation_result, duration=None, results=[
+            replace(r, duration=None) for r in validation_result.results
+        ])
+        metrics.record(untimed)
+        collector = get_metrics_collector()
+        if collector.enabled:
+            collector.record_rules(untimed)
+
+
+def _estimate_size(
+    content: str,
+    syntax_result: SyntaxResult,
+    validation_result: ValidationResult,
+    stage_graph: StageGraph,
+    image_size: SizeEstimate
+) -> int:
+    """Rough memory footprint of an entry in bytes."""
+    size = 512 + len(content)
+    size += sum(len(e) + 64 for e in syntax_result.errors + syntax_result.warnings)
+    size += sum(len(r.message) + 200 for r in validation_result.results)
+    size += 300 * len(stage_graph.stages) + sum(len(s) + 64 for s in stage_graph.suggestions)
+    size += sum(200 + 150 * len(s.items) for s in image_size.stages)
+    return size
+
+
+class ValidationCache:
+    """Thread-safe, memory-capped LRU cache of validation results."""
+
+    def __init__(self, max_bytes: int = 16 * 1024 * 1024):
+        """
+        Initialize validation cache.
+
+        Args:
+            max_bytes: Approximate memory cap for cached entries
+        """
+        self.max_bytes = max_bytes
+        self._entries: 'OrderedDict[str, CacheEntry]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def validate(self, content: str, rule_set: CompiledRuleSet = None) -> Tuple[CacheEntry, bool]:
+        """
+        Validate content, serving repeated submissions from the cache.
+
+        Entries are keyed on normalized content plus the rule set and size
+        table versions. A file that differs from the cached one only in
+        comments, blank lines or whitespace reuses the entry with its line
+        numbers remapped, so reported lines are always the file's own.
+        Hits are counted in the rule metrics like fresh validations.
+
+        Args:
+            content: Dockerfile content
+            rule_set: Compiled rule set (defaults to the shared one)
+
+        Returns:
+            (CacheEntry, True on cache hit)
+        """
+        rule_set = rule_set or get_rule_set()
+        normalized, line_map = normalize_dockerfile(content)
+        size_table = get_size_table()
+        key = hashlib.sha256(
+            f"{rule_set.version}\0{size_table.version}\0{normalized}".encode('utf-8')
+        ).hexdigest()
+
+        etag = hashlib.sha256(f"{key}\0{line_map}".encode('utf-8')).hexdigest()[:32]
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.line_map != line_map:
+                entry = _remap_entry(entry, line_map, etag)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+        if entry is not None:
+            _record_hit(entry.validation_result)
+            return entry, True
+
+        parsed = parse_dockerfile(content)
+        syntax_result = validate_syntax(content, parsed)
+        validation_result = rule_set.validate(content, parsed)
+        stage_graph = analyze_stages(parsed.instructions)
+        image_size = estimate_image_size(parsed.instructions, size_table)
+        entry = CacheEntry(
+            etag=etag,
+            line_map=line_map,
+            syntax_result=syntax_result,
+            validation_result=validation_result,
+            stage_graph=stage_graph,
+            image_size=image_size,
+            size=_estimate_size(normalized, syntax_result, validation_result, stage_graph, image_size)
+        )
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.size
+            if entry.size <= self.max_bytes:
+                self._entries[key] = entry
+                self._bytes += entry.size
+                while self._bytes > self.max_bytes:
+                    _, evicted = self._entries.popitem(last=False)
+                    self._bytes -= evicted.size
+
+        return entry, False
+
+    def stats(self) -> Dict:
+        """Get cache statistics including hit ratio."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0
+            }
+
+    def clear(self):
+        """Drop all entries and reset statistics."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+
+# Global validation cache
+_validation_cache = None
+
+
+def get_validation_cache() -> ValidationCache:
+    """Get global validation cache."""
+    global _validation_cache
+    if _validation_cache is None:
+        settings = load_config().get('validation_cache', {})
+        _validation_cache = ValidationCache(max_bytes=settings.get('max_bytes', 16 * 1024 * 1024))
+    return _validation_cache
@@ -3,21 +3,64 @@ Web UI Module
 Simple Flask-based web interface.
 """
 
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, g, render_template, request, jsonify, make_response
+import json
 import os
 import sys
+import threading
+import time
 
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.input_processor import normalize_input
-from src.stack_detector import detect_stack
-from src.prompt_builder import build_prompt
-from src.ollama_client import OllamaClient
-from src.rule_engine import validate_dockerfile
-from src.syntax_validator import validate_syntax
+from src.config_loader import load_config
+from src.validation_cache import get_validation_cache
+from src.metrics_collector import get_metrics_collector
+from src.rule_engine import get_rule_set
+from src.incremental_validator import TextEdit, UnknownDocumentError, get_incremental_validator
+from src.job_queue import QueueFullError, get_job_queue
+from src.tracing import Trace, activate, deactivate, get_trace_log
+from src.generation import GenerationError, GenerationResult, check_token_budget, run_generation
+from src.pipeline import CancelToken, PipelineCancelled, progress_hook
+from src.server import AdmissionRejected, admission_controlled, client_disconnected, get_admission_queue, serve
 
 app = Flask(__name__)
+config = load_config()
+tracing_config = config.get('tracing', {})
+pipeline_config = config.get('pipeline', {})
+jobs_config = config.get('jobs', {})
+# Each open event stream holds a worker thread; more subscribers get a 429
+event_subscribers = threading.BoundedSemaphore(max(1, jobs_config.get('max_subscribers', 1)))
+
+
+def _validation_json(validation_result) -> dict:
+    """Serialize ValidationResult for API responses."""
+    return {
+        'passed': validation_result.passed,
+        'summary': validation_result.summary,
+        'results': [
+            {
+                'rule_id': r.rule_id,
+                'passed': r.passed,
+                'message': r.message,
+                'severity': r.severity,
+                'line': r.line,
+                'hint': r.hint
+            }
+            for r in validation_result.results
+        ]
+    }
+
+
+def _timings_json(validation_result) -> dict:
+    """Serialize per-rule wall times of a timed ValidationResult."""
+    rules = {}
+    for r in validation_result.results:
+        rules[r.rule_id] = rules.get(r.rule_id, 0.0) + (r.duration or 0.0) * 1000
+    return {
+        'total_ms': validation_result.duration * 1000,
+        'rules_ms': rules
+    }
 
 
 @app.route('/')
@@ -26,7 +69,87 @@ def index():
     return render_template('index.html')
 
 
+@app.errorhandler(AdmissionRejected)
+def admission_rejected(error):
+    """Queue full: tell the client when to come back."""
+    response = jsonify({
+        'error': str(error),
+        'retry_after': error.retry_after,
+        'estimated_wait': round(error.estimated_wait, 1)
+    })
+    response.status_code = 429
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+
+def _generation_json(result: GenerationResult) -> dict:
+    """Serialize GenerationResult for API responses."""
+    return {
+        'success': True,
+        'dockerfile': result.dockerfile,
+        'stack': result.stack_info.name,
+        'prompt': {
+            'tokens': result.assembled.prompt_tokens,
+            'budget': result.assembled.token_budget
+        },
+        'validation': _validation_json(result.validation.validation_result),
+        'stages': result.validation.stage_graph.to_dict(),
+        'image_size': result.image_size.to_dict(),
+        'optimizations': result.optimizations
+    }
+
+
+def _run_job(data: dict, progress) -> dict:
+    """Job handler: run the shared pipeline, reporting stages as progress."""
+    result = run_generation(
+        data['prompt'], 'text', data.get('token_budget'), data.get('optimize'),
+        hooks=[progress_hook(progress)], config=config
+    )
+    return _generation_json(result)
+
+
+@app.before_request
+def start_request_trace():
+    """Trace the request when tracing is enabled."""
+    if not tracing_config.get('enabled', True):
+        return
+    g.trace = Trace(f"{request.method} {request.path}", request.headers.get('X-Request-ID'))
+    g.trace_token = activate(g.trace)
+
+
+@app.after_request
+def finish_request_trace(response):
+    """Send the request id and stage timings; append the trace to the log."""
+    trace = g.pop('trace', None)
+    if trace is None:
+        return response
+    trace.finish()
+    trace.attributes['status'] = response.status_code
+    response.headers['X-Request-ID'] = trace.request_id
+    if tracing_config.get('server_timing', True):
+        response.headers['Server-Timing'] = trace.server_timing()
+    trace_log = get_trace_log()
+    if trace_log is not None:
+        trace_log.write(trace)
+    return response
+
+
+@app.teardown_request
+def reset_request_trace(error=None):
+    token = g.pop('trace_token', None)
+    if token is not None:
+        deactivate(token)
+
+
+@app.before_request
+def start_job_workers():
+    """Start this worker process's job threads (after any fork)."""
+    if config.get('jobs', {}).get('enabled', True):
+        get_job_queue(_run_job).ensure_started()
+
+
 @app.route('/api/generate', methods=['POST'])
+@admission_controlled
 def generate():
     """Generate Dockerfile API endpoint."""
     try:
@@ -35,51 +158,119 @@ def generate():
         
         if not prompt_text:
             return jsonify({'error': 'Prompt is required'}), 400
+        check_token_budget(data.get('token_budget'))
         
-        # Process input
-        input_data = normalize_input(prompt_text, source_type='text')
-        
-        # Detect stack
-        stack_info = detect_stack(input_data)
-        
-        # Build prompt
-        prompt = build_prompt(stack_info, input_data)
-        
-        # Generate with Ollama
-        client = OllamaClient()
-        
-        if not client.health_check():
-            return jsonify({'error': 'Ollama not available'}), 503
-        
-        dockerfile = client.generate(prompt)
-        
-        # Validate
-        syntax_result = validate_syntax(dockerfile)
-        validation_result = validate_dockerfile(dockerfile)
-        
-        return jsonify({
-            'success': True,
-            'dockerfile': dockerfile,
-            'stack': stack_info.name,
-            'validation': {
-                'passed': validation_result.passed,
-                'summary': validation_result.summary,
-                'results': [
-                    {
-                        'rule_id': r.rule_id,
-                        'passed': r.passed,
-                        'message': r.message,
-                        'severity': r.severity
-                    }
-                    for r in validation_result.results
-                ]
-            }
-        })
+        # Stop working on the request if the client hangs up
+        environ = request.environ
+        cancel = CancelToken(lambda: client_disconnected(environ), pipeline_config.get('cancel_poll_interval', 0.5))
+        result = run_generation(
+            prompt_text, 'text', data.get('token_budget'), data.get('optimize'),
+            cancel=cancel, config=config
+        )
+        return jsonify(_generation_json(result))
         
+    except GenerationError as e:
+        return jsonify({'error': str(e)}), e.status
+    except PipelineCancelled:
+        return jsonify({'error': 'Client closed request'}), 499
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+def _job_request(data: dict) -> dict:
+    """Fields of a job request that affect its result (the dedup key)."""
+    return {key: data[key] for key in ('prompt', 'token_budget', 'optimize') if data.get(key) is not None}
+
+
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    """Queue a generation and return its job id straight away."""
+    if not config.get('jobs', {}).get('enabled', True):
+        return jsonify({'error': 'Job queue disabled'}), 404
+    data = request.json or {}
+    if not data.get('prompt'):
+        return jsonify({'error': 'Prompt is required'}), 400
+    try:
+        check_token_budget(data.get('token_budget'))
+    except GenerationError as e:
+        return jsonify({'error': str(e)}), e.status
+    
+    try:
+        job, created = get_job_queue().submit(_job_request(data))
+    except QueueFullError as e:
+        response = jsonify({
+            'error': f'Job queue full ({e})',
+            'retry_after': e.retry_after,
+            'estimated_wait': round(e.estimated_wait, 1)
+        })
+        response.status_code = 429
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response
+    
+    response = jsonify(dict(job.to_dict(), deduplicated=not created))
+    response.status_code = 202
+    response.headers['Location'] = f"/api/jobs/{job.id}"
+    return response
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Job status, with the generation result once done."""
+    job = get_job_queue().get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(job.to_dict())
+
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """
+    Server-sent events: a `progress` event per stage, then `done` or `failed`.
+
+    A stream lasts at most `jobs.events_max_seconds` and then ends with a
+    `retry:` hint, so a long job does not hold a worker thread throughout;
+    clients reconnect and get the current state first.
+    """
+    queue = get_job_queue()
+    if queue.get(job_id) is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    interval = jobs_config.get('poll_interval', 1.0) / 2
+    if not event_subscribers.acquire(blocking=False):
+        response = jsonify({'error': 'Too many event streams, poll /api/jobs/<id> or retry'})
+        response.status_code = 429
+        response.headers['Retry-After'] = str(max(1, round(interval * 2)))
+        return response
+    deadline = time.monotonic() + jobs_config.get('events_max_seconds', 30)
+    
+    def stream():
+        last = None
+        while True:
+            if time.monotonic() >= deadline:
+                yield f"retry: {int(interval * 2000)}\n: reconnect for more events\n\n"
+                return
+            job = queue.get(job_id)
+            if job is None:
+                yield 'event: failed\ndata: {"error": "Job expired"}\n\n'
+                return
+            state = (job.status, job.stage)
+            if job.finished:
+                yield f"event: {job.status}\ndata: {json.dumps(job.to_dict())}\n\n"
+                return
+            if state != last:
+                yield f"event: progress\ndata: {json.dumps(job.to_dict(include_result=False))}\n\n"
+                last = state
+            else:
+                yield ': keep-alive\n\n'
+            time.sleep(interval)
+    
+    response = Response(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    response.call_on_close(event_subscribers.release)
+    return response
+
+
 @app.route('/api/validate', methods=['POST'])
 def validate():
     """Validate Dockerfile API endpoint."""
@@ -90,30 +281,101 @@ def validate():
         if not dockerfile:
             return jsonify({'error': 'Dockerfile content is required'}), 400
         
-        # Validate
-        syntax_result = validate_syntax(dockerfile)
-        validation_result = validate_dockerfile(dockerfile)
+        # Validate (repeated submissions are served from the cache)
+        entry, hit = get_validation_cache().validate(dockerfile)
+        metrics = get_metrics_collector()
+        if metrics.enabled:
+            metrics.record_validation(entry.validation_result.passed)
+        
+        if request.if_none_match.contains(entry.etag):
+            response = make_response('', 304)
+        else:
+            payload = {
+                'success': True,
+                'validation': _validation_json(entry.validation_result),
+                'stages': entry.stage_graph.to_dict(),
+                'image_size': entry.image_size.to_dict()
+            }
+            if data.get('timings') or request.args.get('timings'):
+                timed = entry.validation_result
+                if hit or timed.duration is None:
+                    # Cached or untimed results carry no fresh timings
+                    timed = get_rule_set().validate(dockerfile, timed=True)
+                payload['timings'] = _timings_json(timed)
+            response = jsonify(payload)
+        response.set_etag(entry.etag)
+        response.headers['X-Cache'] = 'HIT' if hit else 'MISS'
+        return response
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/validate/cache', methods=['GET'])
+def validate_cache_stats():
+    """Validation cache statistics endpoint."""
+    return jsonify(get_validation_cache().stats())
+
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    """Usage metrics with per-rule pass/fail counts and latency."""
+    summary = get_metrics_collector().get_summary()
+    summary['admission'] = get_admission_queue().stats()
+    if config.get('jobs', {}).get('enabled', True):
+        summary['jobs'] = get_job_queue().store.stats()
+    return jsonify(summary)
+
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Metrics in the Prometheus text exposition format."""
+    return Response(get_metrics_collector().prometheus(), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/api/validate/incremental', methods=['POST'])
+def validate_incremental():
+    """Incremental validation API endpoint for editors.
+    
+    Send {document_id, dockerfile} to open a document, then
+    {document_id, edits: [{start_line, end_line, lines}]} for each change.
+    """
+    try:
+        data = request.json
+        document_id = data.get('document_id')
+        
+        if not document_id:
+            return jsonify({'error': 'document_id is required'}), 400
+        
+        validator = get_incremental_validator()
+        if 'dockerfile' in data:
+            results = validator.open(document_id, data['dockerfile'])
+        else:
+            edits = [
+                TextEdit(int(e['start_line']), int(e['end_line']), list(e.get('lines', [])))
+                for e in data.get('edits', [])
+            ]
+            try:
+                results = validator.update(document_id, edits)
+            except UnknownDocumentError:
+                return jsonify({'error': 'Unknown document_id, send full dockerfile'}), 409
         
         return jsonify({
             'success': True,
-            'validation': {
-                'passed': validation_result.passed,
-                'summary': validation_result.summary,
-                'results': [
-                    {
-                        'rule_id': r.rule_id,
-                        'passed': r.passed,
-                        'message': r.message,
-                        'severity': r.severity
-                    }
-                    for r in validation_result.results
-                ]
-            }
+            'document_id': document_id,
+            'syntax': {
+                'valid': results.syntax.valid,
+                'errors': results.syntax.errors,
+                'warnings': results.syntax.warnings
+            },
+            'validation': _validation_json(results.validation)
         })
         
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid edit: {e}'}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    serve()